@@ -0,0 +1,305 @@
+# 假的 Google Sheets 後端（SHEETS_BACKEND=fake）：實作 api/sheets.py 用到的 gspread 介面（batch_update / values_batch_update 與個別分頁操作），
+# 模擬每次 API 呼叫的延遲、每分鐘配額（超過回 429）與單次請求大小上限，API 壓測不必連到真的試算表
+#
+# 環境變數：
+#   FAKE_SHEETS_LATENCY          每次呼叫的固定延遲（秒，預設 0.15）
+#   FAKE_SHEETS_SECONDS_PER_MB   依請求大小增加的延遲（預設 0.5）
+#   FAKE_SHEETS_QUOTA_PER_MINUTE 每分鐘可用的呼叫數（預設 60，與 Sheets API 每位使用者的寫入配額相同）
+#   FAKE_SHEETS_MAX_PAYLOAD_MB   單次請求大小上限（預設 10）
+#   FAKE_SHEETS_KEEP_VALUES      1 = 保留寫入的儲存格內容（預設只記錄列數，避免佔用 API 的記憶體）
+#
+# 也可以獨立成本機 stub server，讓 api/sheets_async.py 以 HTTP 呼叫（延遲發生在另一個行程，較接近真實情況）：
+#   python -m api.fake_sheets --port 8765
+#   SHEETS_API_URL=http://127.0.0.1:8765/v4 DRIVE_API_URL=http://127.0.0.1:8765/drive/v3 SHEETS_ACCESS_TOKEN=stub
+import os, json, time, argparse, threading
+from collections import Counter, deque
+from gspread.exceptions import APIError, WorksheetNotFound
+
+# APIError 需要一個有 json() / text 的回應物件
+class _ErrorResponse:
+    def __init__(self, code, status, message):
+        self.status_code = code
+        self.text = message
+        self.error = {"code": code, "status": status, "message": message}
+
+    def json(self):
+        return {"error": self.error}
+
+def _error(code, status, message):
+    return APIError(_ErrorResponse(code, status, message))
+
+class FakeBackend:
+    def __init__(self, latency=0.15, seconds_per_mb=0.5, quota_per_minute=60, max_payload_mb=10, keep_values=False):
+        self.latency = latency
+        self.seconds_per_mb = seconds_per_mb
+        self.quota_per_minute = quota_per_minute
+        self.max_payload_bytes = int(max_payload_mb * 1024 * 1024)
+        self.keep_values = keep_values
+        self.calls = deque() # 最近一分鐘的呼叫時間
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("FAKE_SHEETS_LATENCY", "0.15")),
+            seconds_per_mb=float(os.getenv("FAKE_SHEETS_SECONDS_PER_MB", "0.5")),
+            quota_per_minute=int(os.getenv("FAKE_SHEETS_QUOTA_PER_MINUTE", "60")),
+            max_payload_mb=float(os.getenv("FAKE_SHEETS_MAX_PAYLOAD_MB", "10")),
+            keep_values=os.getenv("FAKE_SHEETS_KEEP_VALUES") == "1",
+        )
+
+    def call(self, operation, payload=None):
+        """每次 API 呼叫：檢查配額與請求大小，再依大小模擬延遲"""
+        size = len(json.dumps(payload, ensure_ascii=False).encode("utf-8")) if payload is not None else 0
+        now = time.monotonic()
+        with self.lock:
+            while self.calls and now - self.calls[0] >= 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.quota_per_minute:
+                self.stats["quota_exceeded"] += 1
+                raise _error(429, "RESOURCE_EXHAUSTED", f"Quota exceeded: {operation}")
+            self.calls.append(now)
+            self.stats[operation] += 1
+            self.stats["bytes"] += size
+
+        if size > self.max_payload_bytes:
+            self.stats["payload_too_large"] += 1
+            raise _error(400, "INVALID_ARGUMENT", f"Request payload size {size} exceeds the limit: {self.max_payload_bytes} bytes.")
+        time.sleep(self.latency + size / 1024 / 1024 * self.seconds_per_mb)
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, sheet_id, title, rows=0, values=None, grid_rows=1000):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows # 已寫入的列數（含標頭）
+        self.grid_rows = grid_rows # 分頁的格線列數（values API 寫入時會自動擴充）
+        self.values = values
+
+    def properties(self, index):
+        return {
+            "sheetId": self.id,
+            "title": self.title,
+            "index": index,
+            "gridProperties": {"rowCount": self.grid_rows, "columnCount": 26},
+        }
+
+    def update_title(self, title):
+        self.spreadsheet.backend.call("update_title")
+        self.title = title
+
+    def clear(self):
+        self.spreadsheet.backend.call("clear")
+        self.row_count = 0
+        self.values = [] if self.spreadsheet.backend.keep_values else None
+
+    # gspread 6 的參數順序是 (values, range_name)，舊寫法 (range_name, values) 也接受
+    def update(self, values=None, range_name=None, **kwargs):
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self.spreadsheet.backend.call("update", values)
+        return self.write(range_name, values)
+
+    def write(self, range_name, values):
+        start_row = int("".join(c for c in range_name.split(":")[0] if c.isdigit()) or 1)
+        self.row_count = max(self.row_count, start_row - 1 + len(values))
+        self.grid_rows = max(self.grid_rows, self.row_count) # values API 會自動擴充格線
+        if self.values is not None:
+            del self.values[start_row - 1:]
+            self.values.extend(list(row) for row in values)
+        return {"updatedRows": len(values)}
+
+    def get_all_values(self):
+        self.spreadsheet.backend.call("get_all_values")
+        return [list(row) for row in self.values or []]
+
+class FakeSpreadsheet:
+    def __init__(self, backend, title="movies"):
+        self.backend = backend
+        self.id = "fake-spreadsheet"
+        self.title = title
+        self.sheets = []
+        self.next_id = 0
+        self._add("movies")
+
+    def _add(self, title, rows=0, values=None, grid_rows=1000):
+        sheet = FakeWorksheet(self, self.next_id, title, rows, values, grid_rows)
+        self.next_id += 1
+        self.sheets.append(sheet)
+        return sheet
+
+    def _sheet(self, sheet_id):
+        for sheet in self.sheets:
+            if sheet.id == sheet_id:
+                return sheet
+        raise _error(400, "INVALID_ARGUMENT", f"No grid with id: {sheet_id}")
+
+    def fetch_sheet_metadata(self, params=None):
+        self.backend.call("fetch_sheet_metadata")
+        return {"sheets": [{"properties": sheet.properties(i)} for i, sheet in enumerate(self.sheets)]}
+
+    def worksheets(self):
+        self.backend.call("worksheets")
+        return list(self.sheets)
+
+    def worksheet(self, title):
+        self.backend.call("worksheet")
+        try:
+            return self.worksheet_by_title(title)
+        except APIError:
+            raise WorksheetNotFound(title)
+
+    def del_worksheet(self, worksheet):
+        self.backend.call("del_worksheet")
+        self.sheets = [sheet for sheet in self.sheets if sheet.id != worksheet.id]
+
+    def duplicate_sheet(self, source_sheet_id, insert_sheet_index=None, new_sheet_id=None, new_sheet_name=None):
+        self.backend.call("duplicate_sheet")
+        return self._duplicate(self._sheet(source_sheet_id), new_sheet_name)
+
+    def _duplicate(self, source, title=None):
+        title = title or f"{source.title} 的副本"
+        if any(sheet.title == title for sheet in self.sheets):
+            raise _error(400, "INVALID_ARGUMENT", f"A sheet with the name \"{title}\" already exists.")
+        values = [list(row) for row in source.values] if source.values is not None else None
+        return self._add(title, source.row_count, values, source.grid_rows)
+
+    # spreadsheets.values.batchUpdate：一次呼叫寫入多個範圍（range 格式為 "分頁!A1"）
+    def values_batch_update(self, body):
+        self.backend.call("values_batch_update", body)
+        for data in body["data"]:
+            title, cell = data["range"].split("!")
+            self.worksheet_by_title(title).write(cell, data["values"])
+        return {"spreadsheetId": self.id, "totalUpdatedRows": sum(len(data["values"]) for data in body["data"])}
+
+    def worksheet_by_title(self, title):
+        for sheet in self.sheets:
+            if sheet.title == title:
+                return sheet
+        raise _error(400, "INVALID_ARGUMENT", f"Unable to parse range: {title}")
+
+    # spreadsheets.batchUpdate：一次呼叫（一次配額、一次延遲），任何一個請求失敗就全部不套用
+    def batch_update(self, body):
+        self.backend.call("batch_update", body)
+        saved = [
+            (sheet, sheet.title, sheet.row_count, sheet.grid_rows, None if sheet.values is None else list(sheet.values))
+            for sheet in self.sheets
+        ]
+        saved_next_id = self.next_id
+        try:
+            return {"spreadsheetId": self.id, "replies": [self._apply(request) for request in body["requests"]]}
+        except Exception:
+            self.sheets = [sheet for sheet, *_ in saved]
+            for sheet, title, row_count, grid_rows, values in saved:
+                sheet.title, sheet.row_count, sheet.grid_rows, sheet.values = title, row_count, grid_rows, values
+            self.next_id = saved_next_id
+            raise
+
+    def _apply(self, request):
+        (kind, args), = request.items()
+        if kind == "deleteSheet":
+            sheet = self._sheet(args["sheetId"])
+            self.sheets.remove(sheet)
+            return {}
+
+        if kind == "duplicateSheet":
+            sheet = self._duplicate(self._sheet(args["sourceSheetId"]), args.get("newSheetName"))
+            return {"duplicateSheet": {"properties": sheet.properties(self.sheets.index(sheet))}}
+
+        if kind == "updateSheetProperties":
+            properties = args["properties"]
+            sheet = self._sheet(properties["sheetId"])
+            if "title" in properties:
+                sheet.title = properties["title"]
+            rows = properties.get("gridProperties", {}).get("rowCount")
+            if rows is not None:
+                sheet.grid_rows = rows
+                sheet.row_count = min(sheet.row_count, rows)
+                if sheet.values is not None:
+                    del sheet.values[rows:]
+            return {}
+
+        if kind == "updateCells" and "range" in args and "rows" not in args:
+            sheet = self._sheet(args["range"]["sheetId"]) # 沒有 rows → 清空範圍（此處只支援整個分頁）
+            sheet.row_count = 0
+            sheet.values = [] if self.backend.keep_values else None
+            return {}
+
+        if kind == "updateCells":
+            start = args["start"]
+            sheet = self._sheet(start["sheetId"])
+            end_row = start.get("rowIndex", 0) + len(args["rows"])
+            if end_row > sheet.grid_rows:
+                raise _error(400, "INVALID_ARGUMENT", f"Range exceeds grid limits. Max rows: {sheet.grid_rows}")
+            sheet.row_count = max(sheet.row_count, end_row)
+            if sheet.values is not None:
+                del sheet.values[start.get("rowIndex", 0):]
+                sheet.values.extend(
+                    [cell["userEnteredValue"]["stringValue"] for cell in row["values"]] for row in args["rows"]
+                )
+            return {}
+
+        raise _error(400, "INVALID_ARGUMENT", f"Unsupported request: {kind}")
+
+# 同一個 process（API worker）共用一份試算表，狀態跨請求保留
+_spreadsheet = None
+_spreadsheet_lock = threading.Lock()
+
+def get_spreadsheet():
+    global _spreadsheet
+    with _spreadsheet_lock:
+        if _spreadsheet is None:
+            _spreadsheet = FakeSpreadsheet(FakeBackend.from_env())
+        return _spreadsheet
+
+# -------------------------------------------------------------
+# 本機 stub server：Sheets v4 / Drive v3 中 api/sheets_async.py 會用到的端點
+# -------------------------------------------------------------
+def create_stub_app():
+    from fastapi import Body, FastAPI, HTTPException
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+
+    @app.exception_handler(APIError)
+    def api_error(request, e):
+        return JSONResponse({"error": e.error}, status_code=e.code)
+
+    def spreadsheet(spreadsheet_id):
+        sheet = get_spreadsheet()
+        if spreadsheet_id != sheet.id:
+            raise HTTPException(status_code=404, detail=f"Requested entity was not found: {spreadsheet_id}")
+        return sheet
+
+    @app.get("/drive/v3/files")
+    def list_files():
+        sheet = get_spreadsheet()
+        return {"files": [{"id": sheet.id, "name": sheet.title}]}
+
+    @app.get("/v4/spreadsheets/{spreadsheet_id}")
+    def fetch_sheet_metadata(spreadsheet_id: str):
+        return spreadsheet(spreadsheet_id).fetch_sheet_metadata()
+
+    @app.post("/v4/spreadsheets/{spreadsheet_id}:batchUpdate")
+    def batch_update(spreadsheet_id: str, body: dict = Body(...)):
+        return spreadsheet(spreadsheet_id).batch_update(body)
+
+    @app.post("/v4/spreadsheets/{spreadsheet_id}/values:batchUpdate")
+    def values_batch_update(spreadsheet_id: str, body: dict = Body(...)):
+        return spreadsheet(spreadsheet_id).values_batch_update(body)
+
+    @app.get("/stats")
+    def stats():
+        return dict(get_spreadsheet().backend.stats)
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本機假的 Google Sheets API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(), host=args.host, port=args.port, log_level="warning")
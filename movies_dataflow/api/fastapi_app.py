@@ -1,27 +1,83 @@
 from dotenv import load_dotenv
-import datetime, os, gspread, logging
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
-from pydantic import BaseModel
-from typing import List, Optional
-from oauth2client.service_account import ServiceAccountCredentials
+import datetime, os, re, zlib, json, shutil, logging
+from pathlib import Path
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Any, Dict, List, Optional, Union
 from subprocess import PIPE
-from auto_updater import main as run_auto_updater
+import run_store
+from moviescraper.utils.title_cluster import canonicalize_titles
+from moviescraper.utils.columnar import decode_columns
+from api.snapshot import SnapshotHandle, write_snapshot
+from api.search import TitleIndex
+from api.intervals import MINUTES_PER_DAY, format_minute, next_showings, parse_clock, window
+from api.geo import CinemaLocator
+from api.sheets import prepare_rows
+from api.sheets_async import close_client, replace_movies
 
 logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
-CREDENTIALS_PATH = os.getenv("CREDENTIALS_PATH", "/etc/secrets/credentials.json")
-SPREADSHEET_NAME = os.getenv("SPREADSHEET_NAME")
+STAGING_DIR = Path(os.getenv("STAGING_DIR", "staging")) # 分批上傳的暫存目錄（多個 worker 共用）
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "snapshots")) # 唯讀快照（多個 worker 以 mmap 共用）
+MAX_UNZIPPED_BYTES = int(float(os.getenv("UPLOAD_MAX_UNZIPPED_MB", "256")) * 1024 * 1024) # gzip 解壓後的上限
 
-app = FastAPI()
+# 支援 Content-Encoding: gzip 的請求（分批上傳會壓縮）
+# 解壓在執行緒裡逐段進行並限制輸出大小：超過上限回 413（防 gzip bomb），格式錯誤回 400
+class GzipRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                body = await run_in_threadpool(gunzip_limited, body, MAX_UNZIPPED_BYTES)
+            self._body = body
+        return self._body
 
-def get_spreadsheet():
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_PATH, scope)
-    return gspread.authorize(creds).open(SPREADSHEET_NAME)
+def gunzip_limited(body: bytes, limit: int) -> bytes:
+    chunks, size = [], 0
+    try:
+        while body:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # 16 + → gzip 標頭
+            while True:
+                chunk = decompressor.decompress(body, 1 << 20)
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(status_code=413, detail=f"Decompressed body exceeds {limit} bytes")
+                chunks.append(chunk)
+                body = decompressor.unconsumed_tail
+                if decompressor.eof or not body:
+                    break
+            if not decompressor.eof:
+                raise HTTPException(status_code=400, detail="Truncated gzip body")
+            body = decompressor.unused_data # 多個 gzip member 串接（與 gzip.decompress 相同）
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+    return b"".join(chunks)
+
+class GzipRoute(APIRoute):
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request):
+            return await original_route_handler(GzipRequest(request.scope, request.receive))
+
+        return custom_route_handler
+
+# 關閉時釋放 Sheets 的連線池
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_client()
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = GzipRoute
+snapshot_handle = SnapshotHandle(SNAPSHOT_DIR) # 每個 worker 各自映射 snapshots/CURRENT 指向的快照
+title_index = TitleIndex() # 快照換版時只增刪有變動的片名
+cinema_locator = CinemaLocator()
 
 class MovieItem(BaseModel):
     電影名稱: str
@@ -33,14 +89,32 @@ class MovieItem(BaseModel):
     cinema: str
     網址: str
     地址: str
+    stale: Optional[bool] = False # 爬蟲失敗時沿用的舊資料
 
     class Config:
         extra = "forbid"  # 🚫 禁止出現未定義欄位
 
+# all_cleaned.columnar.json（見 moviescraper/utils/columnar.py）
+class ColumnarSnapshot(BaseModel):
+    format: str
+    version: int
+    rows: int
+    columns: Dict[str, Dict[str, Any]]
+
+upload_payload = TypeAdapter(Union[List[MovieItem], ColumnarSnapshot])
+
+class CommitPayload(BaseModel):
+    session: str
+
 class TriggerPayload(BaseModel):
     mode: Optional[str] = "cli"
     env: Optional[str] = "prod"
     targets: Optional[List[str]] = None
+    days: Optional[int] = 1
+    incremental: Optional[bool] = False
+    retry_failed: Optional[bool] = False
+    max_age: Optional[Union[int, Dict[str, int]]] = None # 秒；{"vs": 1800, "*": 3600}
+    stream: Optional[bool] = False
 
 @app.get("/")
 def home():
@@ -48,18 +122,234 @@ def home():
 
 # 確認服務是否在線
 @app.get("/healthz")
-def health_check():
+async def health_check():
     return {"status": "ok", "timestamp": datetime.datetime.now().isoformat()}
 
-# 傳送資料到 google sheet 儲存
+# 傳送資料到 google sheet 儲存（接受 all_cleaned.json 陣列或欄式快照）
+# async def：等待 Sheets API 時不佔用 threadpool
+# 上萬筆的 JSON 解析與驗證要數百毫秒，不交給 FastAPI 在事件迴圈上做，改在執行緒裡驗證（422 格式不變）
 @app.post("/upload")
-def upload_data(items: List[MovieItem]):
-    spreadsheet = get_spreadsheet()
-    worksheet = rotate_movies_worksheet(spreadsheet)  # 每次重命名、刪除、建立分頁
-    rows = prepare_rows(items)
-    result = write_rows(rows, worksheet)
+async def upload_data(request: Request):
+    body = await request.body()
+    items = await run_in_threadpool(parse_upload, body)
+    return await write_items(items)
+
+def parse_upload(body: bytes) -> List[MovieItem]:
+    try:
+        payload = upload_payload.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+    if isinstance(payload, ColumnarSnapshot):
+        return decode_snapshot(payload)
+    return payload
+
+def decode_snapshot(payload: ColumnarSnapshot) -> List[MovieItem]:
+    try:
+        return [MovieItem(**item) for item in decode_columns(payload.model_dump())]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid columnar snapshot: {e}")
+
+# 寫入 google sheet 失敗 → 502，呼叫端（auto_updater）不會把沒寫進去的資料當成已送達
+# 快照在寫入成功後才發布：查詢 API 與 sheet 看到的是同一份資料，重送也不會多發布一次
+async def write_items(items: List[MovieItem]) -> dict:
+    rows = await run_in_threadpool(prepare_rows, items)
+    result = await replace_movies(rows) # 分頁輪替一個 batchUpdate + 寫入一個 values.batchUpdate
+    if result.get("status") != "success":
+        raise HTTPException(status_code=502, detail=f"Google Sheets write failed: {result.get('message')}")
+    await run_in_threadpool(publish_snapshot, items)
     return result
 
+# 分批上傳：每批以 Idempotency-Key（source:seq）存到暫存目錄，重送的批次直接略過
+@app.post("/upload/batch")
+def upload_batch(
+    items: List[MovieItem],
+    x_upload_session: str = Header(...),
+    idempotency_key: str = Header(...),
+    replace: bool = False
+):
+    source, seq = parse_batch_key(idempotency_key)
+    folder = staging_path(x_upload_session) / source
+
+    if replace and folder.exists():
+        shutil.rmtree(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    path = folder / f"{int(seq):06d}.json"
+    if path.exists():
+        return {"status": "duplicate", "key": idempotency_key}
+
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump([item.model_dump() for item in items], f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return {"status": "accepted", "key": idempotency_key, "count": len(items)}
+
+# 各來源已暫存的筆數（供 auto_updater 比對後補送）
+@app.get("/upload/batch/{session}")
+def upload_batch_status(session: str):
+    counts = {}
+    for source, items in load_staged_items(session).items():
+        counts[source] = len(items)
+    return {"session": session, "sources": counts}
+
+# 全部批次到齊 → 跨影城片名歸併後一次寫入 google sheet
+@app.post("/upload/commit")
+async def upload_commit(payload: CommitPayload):
+    items = await run_in_threadpool(merge_staged_items, payload.session)
+    result = await write_items(items)
+    shutil.rmtree(staging_path(payload.session), ignore_errors=True)
+    return result
+
+def merge_staged_items(session: str) -> List[MovieItem]:
+    staged = load_staged_items(session)
+    if not staged:
+        raise HTTPException(status_code=404, detail="No staged batches for this session")
+
+    merged = [item for source in sorted(staged) for item in staged[source]]
+    canonicalize_titles(merged)
+    return [MovieItem(**item) for item in merged]
+
+# 查詢最新快照（依維度篩選，直接讀 mmap，不經 google sheet）
+@app.get("/showtimes")
+def list_showtimes(
+    city: Optional[str] = None,
+    cinema: Optional[str] = None,
+    theater: Optional[str] = None,
+    date: Optional[str] = None,
+    title: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000)
+):
+    snapshot = current_snapshot()
+    rows = snapshot.find(city=city, cinema=cinema, 影院=theater, 日期=date, 電影名稱=title)
+    return {
+        "snapshot": snapshot.name,
+        "count": len(rows),
+        "items": [snapshot.row(row) for row in rows[:limit]],
+    }
+
+# 某城市某天在時段內開演的場次（end 早於 start 視為跨午夜，例如 22:00~01:00）
+@app.get("/showtimes/window")
+def showtimes_in_window(
+    city: str,
+    date: str,
+    start: str = "00:00",
+    end: str = "29:59",
+    title: Optional[str] = None,
+    cinema: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000)
+):
+    try:
+        start_minute, end_minute = parse_clock(start), parse_clock(end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if end_minute < start_minute:
+        end_minute += MINUTES_PER_DAY
+
+    snapshot = current_showtime_index()
+    found = window(snapshot, city, date, start_minute, end_minute, limit=limit, 電影名稱=title, cinema=cinema)
+    return {"snapshot": snapshot.name, "count": len(found), "items": showing_rows(snapshot, found)}
+
+# 指定時間（預設現在）之後最近的場次，可跨日
+@app.get("/showtimes/next")
+def showtimes_next(
+    city: str,
+    after: Optional[datetime.datetime] = None,
+    title: Optional[str] = None,
+    cinema: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500)
+):
+    after = after or datetime.datetime.now()
+    snapshot = current_showtime_index()
+    found = next_showings(snapshot, city, after, limit=limit, 電影名稱=title, cinema=cinema)
+    return {"snapshot": snapshot.name, "after": after.isoformat(), "items": showing_rows(snapshot, found)}
+
+# 附近有放映的影城（預設今天），由近到遠
+@app.get("/nearby")
+def nearby_cinemas(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5, gt=0, le=100),
+    title: Optional[str] = None,
+    date: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    snapshot = current_snapshot()
+    if not snapshot.has_section("idx:地址:keys"):
+        raise HTTPException(status_code=503, detail="Snapshot has no address index, re-upload to rebuild")
+    date = date or datetime.date.today().isoformat()
+
+    cinemas = []
+    for address, distance in cinema_locator.nearby(lat, lon, radius_km):
+        theaters = {}
+        for row in snapshot.find(地址=address, 日期=date, 電影名稱=title):
+            item = snapshot.row(row)
+            theater = theaters.setdefault(item["影院"], {
+                "影院": item["影院"],
+                "cinema": item["cinema"],
+                "地址": address,
+                "distance_km": distance,
+                "showings": [],
+            })
+            theater["showings"].append({k: item[k] for k in ("電影名稱", "放映版本", "時刻表")})
+        cinemas.extend(theaters.values())
+        if len(cinemas) >= limit:
+            break
+
+    return {"snapshot": snapshot.name, "date": date, "cinemas": cinemas[:limit]}
+
+# 片名搜尋（容許全形、標點差異、前綴與錯字）
+@app.get("/search")
+def search_titles(
+    q: str = Query(..., min_length=1, max_length=100),
+    city: Optional[str] = None,
+    date: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    snapshot = current_snapshot()
+    if title_index.version != snapshot.name:
+        title_index.update(snapshot.values("電影名稱"), version=snapshot.name)
+
+    results = []
+    for title, score in title_index.search(q, limit=limit):
+        showtimes = len(snapshot.find(電影名稱=title, city=city, 日期=date))
+        if showtimes:
+            results.append({"title": title, "score": score, "showtimes": showtimes})
+    return {"snapshot": snapshot.name, "query": q, "results": results}
+
+# 爬蟲執行報告：最近幾次執行（指定 spider 時只回傳該爬蟲的趨勢）
+@app.get("/reports")
+def list_reports(limit: int = Query(20, ge=1, le=500), spider: Optional[str] = None):
+    runs = run_store.load_history(limit=limit)
+    if spider is None:
+        return {"runs": runs}
+
+    trend = []
+    for run in runs:
+        report = run.get("spiders", {}).get(spider)
+        if report:
+            trend.append({"run_id": run.get("run_id"), **report})
+    return {"spider": spider, "runs": trend}
+
+# 單次執行的報告與 manifest（run_id 為 latest 時取 runs/CURRENT）
+@app.get("/reports/{run_id}")
+def get_report(run_id: str):
+    if run_id == "latest":
+        run_dir = run_store.current_run_dir()
+    elif SAFE_NAME.match(run_id):
+        run_dir = run_store.RUNS_DIR / run_id
+    else:
+        raise HTTPException(status_code=400, detail="Invalid run id")
+
+    report = run_store.load_run_report(run_dir) if run_dir else None
+    if report is None:
+        raise HTTPException(status_code=404, detail="Run report not found")
+    return {**report, "manifest": run_store.load_manifest(run_dir)}
+
+# auto_updater 會匯入全部爬蟲（含 Selenium），只在真的觸發更新時才載入
+def _run_updater(**kwargs):
+    from auto_updater import main
+    return main(**kwargs)
+
 # webhook 入口
 @app.post("/trigger-update")
 def trigger_direct_update(payload: TriggerPayload, request: Request, background_tasks: BackgroundTasks):
@@ -68,10 +358,15 @@ def trigger_direct_update(payload: TriggerPayload, request: Request, background_
         raise HTTPException(status_code=403, detail="Invalid API key")
 
     # ✅ 直接執行 auto_updater.py，不啟用 ping loop
-    background_tasks.add_task(lambda: run_auto_updater(
+    background_tasks.add_task(lambda: _run_updater(
         mode=payload.mode,
         env=payload.env,
-        targets=payload.targets
+        targets=payload.targets,
+        days=payload.days,
+        incremental=payload.incremental,
+        retry_failed=payload.retry_failed,
+        max_age=payload.max_age,
+        stream=payload.stream
     ))
 
     return {
@@ -81,66 +376,62 @@ def trigger_direct_update(payload: TriggerPayload, request: Request, background_
     }
 
 # -------------------------------------------------------------
-# google sheet
+# 分批上傳暫存
 # -------------------------------------------------------------
-def prepare_rows(items: list) -> list[list[str]]:
-    rows = []
-    for item in items:
-        try:
-            row = [
-                item.city.strip(),
-                item.cinema.strip(),
-                item.影院.strip(),
-                item.日期.strip(),
-                item.電影名稱.strip(),
-                item.放映版本.strip(),
-                ", ".join([t.strip() for t in item.時刻表]),
-                item.網址.strip(),
-                item.地址.strip()
-            ]
-            rows.append(row)
-        except Exception as e:
-            print(f'❌ 清洗失敗：{e}')
-    return rows
-
-def write_rows(rows: list[list[str]], worksheet) -> dict:
-    try:
-        # 🧩 定義欄位標頭
-        header = ["地區", "cinema", "影院", "日期", "電影名稱", "放映版本", "時刻表", "網址", "地址"]
-        worksheet.update("A1:I1", [header])
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
 
-        # 📦 寫入資料從第 2 列開始（根據 rows 長度計算）
-        worksheet.update(f"A2:I{len(rows)+1}", rows)
+def staging_path(session: str) -> Path:
+    if not SAFE_NAME.match(session):
+        raise HTTPException(status_code=400, detail="Invalid upload session")
+    return STAGING_DIR / session
 
-        return {"status": "success", "count": len(rows)}
+def parse_batch_key(key: str) -> tuple[str, str]:
+    source, _, seq = key.rpartition(":")
+    if not SAFE_NAME.match(source) or not seq.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key, expected <source>:<seq>")
+    return source, seq
 
-    except Exception as e:
-        print(f"❌ 寫入失敗：{e}")
-        return {"status": "error", "message": str(e)}
-
-
-# 分頁複製、重命名、清空movies
-def rotate_movies_worksheet(spreadsheet):
-    try:
-        try:
-            old_backup = spreadsheet.worksheet("pre_movies")
-            logging.info("🧹 移除 pre_movies 分頁")
-            spreadsheet.del_worksheet(old_backup)
-        except Exception as e:
-            pass
+def load_staged_items(session: str) -> dict:
+    staged = {}
+    folder = staging_path(session)
+    if not folder.exists():
+        return staged
+    for source_dir in sorted(p for p in folder.iterdir() if p.is_dir()):
+        items = []
+        for path in sorted(source_dir.glob("*.json")):
+            with open(path, encoding="utf-8") as f:
+                items.extend(json.load(f))
+        staged[source_dir.name] = items
+    return staged
 
-        movies_ws = spreadsheet.worksheet("movies")
-
-        logging.info("📦 將 movies 分頁複製並命名為 pre_movies")
-        backup_ws = spreadsheet.duplicate_sheet(movies_ws.id)
-        backup_ws.update_title("pre_movies")
+# -------------------------------------------------------------
+# 唯讀快照
+# -------------------------------------------------------------
+def current_snapshot():
+    snapshot = snapshot_handle.get()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="No snapshot published yet")
+    return snapshot
 
-        logging.info("✅ movies 清空")
-        movies_ws.clear()
+def current_showtime_index():
+    snapshot = current_snapshot()
+    if not snapshot.has_section("when:keys"):
+        raise HTTPException(status_code=503, detail="Snapshot has no showtime index, re-upload to rebuild")
+    return snapshot
 
-        return movies_ws
+def showing_rows(snapshot, found) -> list:
+    rows = []
+    for date, minute, row in found:
+        item = snapshot.row(row)
+        item.pop("時刻表")
+        item.update(日期=date, 時間=format_minute(minute), 跨午夜=minute >= MINUTES_PER_DAY)
+        rows.append(item)
+    return rows
 
+def publish_snapshot(items: List[MovieItem]):
+    try:
+        path = write_snapshot([item.model_dump() for item in items], SNAPSHOT_DIR)
+        logging.info(f"📸 已發布快照 {path.name}（{len(items)} 筆）")
     except Exception as e:
-        print(f"❌ 分頁備份與清空失敗：{e}")
-        raise
+        logging.warning(f"⚠️ 快照寫入失敗：{e}")
 
@@ -0,0 +1,48 @@
+# 影城空間索引：以固定大小的經緯度網格分桶，查詢時只看半徑涵蓋的格子再算實際距離；
+# 快照列以 地址 與影城座標對應（多家影城可能共用同一地址）
+import math
+from moviescraper.utils.cinema_info import cinema_address_map, load_cinema_coordinates
+
+CELL_DEGREES = 0.05 # 約 5 公里
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _cell(lat, lon):
+    return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+class CinemaLocator:
+    def __init__(self, records=None):
+        records = load_cinema_coordinates() if records is None else records
+        self.locations = {} # 地址 → (lat, lon)
+        self.grid = {}      # 格子 → [地址]
+        for record in records:
+            address = record["地址"]
+            if address in self.locations:
+                continue
+            self.locations[address] = (record["lat"], record["lon"])
+            self.grid.setdefault(_cell(record["lat"], record["lon"]), []).append(address)
+
+        missing = set(cinema_address_map.values()) - set(self.locations)
+        if missing:
+            print(f"⚠️ {len(missing)} 個影城地址缺少座標：{sorted(missing)}")
+
+    def nearby(self, lat, lon, radius_km):
+        """半徑內的 (地址, 距離 km)，由近到遠"""
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = _cell(lat - lat_span, lon - lon_span)
+        max_row, max_col = _cell(lat + lat_span, lon + lon_span)
+
+        found = []
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for address in self.grid.get((row, col), ()):
+                    distance = haversine_km(lat, lon, *self.locations[address])
+                    if distance <= radius_km:
+                        found.append((address, round(distance, 2)))
+        found.sort(key=lambda f: f[1])
+        return found
@@ -0,0 +1,157 @@
+# 場次時間索引：上傳時把時刻表的 "HH:MM" 解析成一天中的分鐘數（只解析一次），
+# 依 (city, 日期) 分組排序後寫進快照，時段查詢與「下一場」都用二分搜尋，不必逐列解析字串
+#
+# 跨午夜：影城把凌晨場列在前一天（例如 23:40 之後的 00:30），這些場次記為 1440 + 分鐘數，
+# 仍屬於原本的日期；查詢「隔天 00:10 之後」時也會一併看前一天的跨午夜場次
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+
+MINUTES_PER_DAY = 1440
+OVERNIGHT_BEFORE = 5 * 60 # 05:00 以前的場次視為前一天的深夜場
+TIME_PATTERN = re.compile(r"^\s*(\d{1,2})[:：](\d{2})")
+
+def parse_minutes(times):
+    """["21:30", "23:40", "00:30"] → [1290, 1420, 1470]；無法解析的時間為 None"""
+    minutes = []
+    previous = -1
+    for t in times:
+        match = TIME_PATTERN.match(t)
+        if not match:
+            minutes.append(None)
+            continue
+        minute = int(match.group(1)) * 60 + int(match.group(2)) # 部分影城寫成 25:10
+        if minute < OVERNIGHT_BEFORE or minute < previous - MINUTES_PER_DAY // 2:
+            minute += MINUTES_PER_DAY
+        minutes.append(minute)
+        previous = minute
+    return minutes
+
+# 查詢參數 "19:00" → 1140
+def parse_clock(value):
+    match = TIME_PATTERN.match(value)
+    if not match or int(match.group(2)) >= 60:
+        raise ValueError(f"時間格式錯誤：{value}")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+def format_minute(minute):
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def interval_key(city_code, date_code):
+    return city_code << 32 | date_code
+
+def build_interval_sections(city_codes, date_codes, times_per_row):
+    """times_per_row：每列的分鐘數列表（parse_minutes 的結果）"""
+    groups = {}
+    row_minutes = array("I")
+    for row, minutes in enumerate(times_per_row):
+        key = interval_key(city_codes[row], date_codes[row])
+        group = groups.setdefault(key, [])
+        for minute in minutes:
+            # 解析失敗的時間在 row 層級以 0xFFFFFFFF 標記，不進索引
+            row_minutes.append(0xFFFFFFFF if minute is None else minute)
+            if minute is not None:
+                group.append((minute, row))
+
+    keys = array("Q", sorted(groups))
+    offsets = array("I", [0])
+    minutes = array("I")
+    rows = array("I")
+    for key in keys:
+        for minute, row in sorted(groups[key]):
+            minutes.append(minute)
+            rows.append(row)
+        offsets.append(len(minutes))
+
+    return {
+        "times:minutes": row_minutes,
+        "when:keys": keys,
+        "when:offsets": offsets,
+        "when:minutes": minutes,
+        "when:rows": rows,
+    }
+
+# -------------------------------------------------------------
+# 查詢（snapshot 為 api.snapshot.Snapshot）
+# -------------------------------------------------------------
+def _group(snapshot, key):
+    keys = snapshot.section("when:keys")
+    i = bisect_left(keys, key)
+    if i == len(keys) or keys[i] != key:
+        return None, None
+    offsets = snapshot.section("when:offsets")
+    start, end = offsets[i], offsets[i + 1]
+    return snapshot.section("when:minutes")[start:end], snapshot.section("when:rows")[start:end]
+
+def _matches(snapshot, row, filters):
+    return all(snapshot.section(f"col:{dim}")[row] == code for dim, code in filters)
+
+def _filter_codes(snapshot, filters):
+    """{維度: 值} → [(維度, 字串 id)]；任一值不存在時回傳 None（必定無結果）"""
+    codes = []
+    for dim, value in filters.items():
+        if value is None:
+            continue
+        code = snapshot.string_id(value)
+        if code is None:
+            return None
+        codes.append((dim, code))
+    return codes
+
+def window(snapshot, city, date, start, end, limit=500, **filters):
+    """city 在 date 當天 start~end 分鐘之間開演的場次（end 可超過 1440 以涵蓋跨午夜場）"""
+    city_code, date_code = snapshot.string_id(city), snapshot.string_id(date)
+    codes = _filter_codes(snapshot, filters)
+    if city_code is None or date_code is None or codes is None:
+        return []
+
+    minutes, rows = _group(snapshot, interval_key(city_code, date_code))
+    if minutes is None:
+        return []
+
+    results = []
+    for i in range(bisect_left(minutes, start), bisect_right(minutes, end)):
+        if _matches(snapshot, rows[i], codes):
+            results.append((date, minutes[i], rows[i]))
+            if len(results) >= limit:
+                break
+    return results
+
+def next_showings(snapshot, city, after, limit=20, **filters):
+    """after（datetime）之後最近的場次，依序跨越多天"""
+    city_code = snapshot.string_id(city)
+    codes = _filter_codes(snapshot, filters)
+    if city_code is None or codes is None:
+        return []
+
+    today = after.date()
+    now = after.hour * 60 + after.minute
+    keys = snapshot.section("when:keys")
+    lo = bisect_left(keys, interval_key(city_code, 0))
+    hi = bisect_left(keys, interval_key(city_code + 1, 0))
+
+    found = []
+    for i in range(lo, hi):
+        date = snapshot.string(keys[i] & 0xFFFFFFFF)
+        try:
+            day_offset = (Date.fromisoformat(date) - today).days
+        except ValueError:
+            continue
+        if day_offset < -1:
+            continue
+        # 日期依序處理；今天以後的場次必定晚於先前收集的，夠了就停（前一天的跨午夜場最後一起排序）
+        if day_offset > 0 and len(found) >= limit:
+            break
+
+        minutes, rows = _group(snapshot, keys[i])
+        threshold = max(now - day_offset * MINUTES_PER_DAY, 0)
+        for j in range(bisect_left(minutes, threshold), len(minutes)):
+            if _matches(snapshot, rows[j], codes):
+                found.append((day_offset * MINUTES_PER_DAY + minutes[j], date, minutes[j], rows[j]))
+                if day_offset >= 0 and len(found) >= limit:
+                    break
+
+    found.sort()
+    return [(date, minute, row) for _, date, minute, row in found[:limit]]
@@ -0,0 +1,85 @@
+# 片名搜尋：標準片名的字元 1~3-gram 反向索引（中英混合、不需斷詞），
+# 先以 n-gram 命中數挑出候選，再用 rapidfuzz 排序；前綴命中優先，bigram 重疊讓錯字仍能找到
+import threading
+from collections import Counter
+from rapidfuzz import fuzz
+from moviescraper.utils.text import clean_title
+
+MAX_GRAM = 3
+MAX_CANDIDATES = 50
+
+# 與 pipeline 相同的清洗，再忽略大小寫與空白：「ｆ１ 電影」→「f1電影」
+def search_key(text):
+    return clean_title(text).lower().replace(" ", "")
+
+def grams(key, n):
+    if len(key) <= n:
+        return {key} if key else set()
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+class TitleIndex:
+    def __init__(self, titles=()):
+        self.version = None
+        self.keys = {}     # 片名 → search key
+        self.postings = {} # gram → {片名}
+        self.lock = threading.Lock() # API 的同步端點在執行緒池中執行
+        self.update(titles)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # 只處理新增與移除的片名，未變動的 posting 保留
+    def update(self, titles, version=None):
+        titles = set(titles)
+        with self.lock:
+            for title in set(self.keys) - titles:
+                self._remove(title)
+            for title in titles - set(self.keys):
+                self._add(title)
+            self.version = version
+
+    def _add(self, title):
+        key = search_key(title)
+        self.keys[title] = key
+        for n in range(1, MAX_GRAM + 1):
+            for gram in grams(key, n):
+                self.postings.setdefault(gram, set()).add(title)
+
+    def _remove(self, title):
+        key = self.keys.pop(title)
+        for n in range(1, MAX_GRAM + 1):
+            for gram in grams(key, n):
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.discard(title)
+                    if not posting:
+                        del self.postings[gram]
+
+    def candidates(self, key):
+        # 查詢越長用越長的 gram（posting 較短）；單一錯字只影響少數幾個 gram，都沒命中再退回較短的 gram
+        for n in range(min(len(key), MAX_GRAM), 0, -1):
+            hits = Counter()
+            for gram in grams(key, n):
+                hits.update(self.postings.get(gram, ()))
+            if hits:
+                return [title for title, _ in hits.most_common(MAX_CANDIDATES)]
+        return []
+
+    def search(self, query, limit=10, score_cutoff=60):
+        key = search_key(query)
+        if not key:
+            return []
+
+        results = []
+        with self.lock:
+            candidates = [(title, self.keys[title]) for title in self.candidates(key)]
+        for title, title_key in candidates:
+            if title_key.startswith(key):
+                score = 100.0
+            else:
+                score = max(fuzz.partial_ratio(key, title_key), fuzz.ratio(key, title_key))
+            if score >= score_cutoff:
+                results.append((title, round(score, 1)))
+
+        results.sort(key=lambda r: (-r[1], len(r[0]), r[0]))
+        return results[:limit]
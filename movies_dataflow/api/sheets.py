@@ -0,0 +1,145 @@
+# google sheet 寫入：從 fastapi_app 拆出，benchmark 與其他工具可以直接匯入，
+# 不必載入整個 API（及 auto_updater → 爬蟲的匯入鏈）
+import os, logging
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+
+HEADER = ["地區", "cinema", "影院", "日期", "電影名稱", "放映版本", "時刻表", "網址", "地址"]
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+_spreadsheet = None # 開啟一次後重複使用（open 會先查 Drive，每次上傳都查太慢）
+
+# 環境變數在呼叫時才讀取（fastapi_app 匯入本模組後才 load_dotenv）
+# SHEETS_BACKEND=fake → 使用 api/fake_sheets.py 的模擬後端（壓測用）
+def get_spreadsheet():
+    global _spreadsheet
+    if os.getenv("SHEETS_BACKEND") == "fake":
+        from api import fake_sheets
+        return fake_sheets.get_spreadsheet()
+
+    if _spreadsheet is None:
+        credentials_path = os.getenv("CREDENTIALS_PATH", "/etc/secrets/credentials.json")
+        creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, SCOPE)
+        _spreadsheet = gspread.authorize(creds).open(os.getenv("SPREADSHEET_NAME"))
+    return _spreadsheet
+
+def prepare_rows(items: list) -> list[list[str]]:
+    rows = []
+    for item in items:
+        try:
+            row = [
+                item.city.strip(),
+                item.cinema.strip(),
+                item.影院.strip(),
+                item.日期.strip(),
+                item.電影名稱.strip(),
+                item.放映版本.strip(),
+                ", ".join([t.strip() for t in item.時刻表]),
+                item.網址.strip(),
+                item.地址.strip()
+            ]
+            rows.append(row)
+        except Exception as e:
+            print(f'❌ 清洗失敗：{e}')
+    return rows
+
+# -------------------------------------------------------------
+# movies 分頁輪替 + 寫入：一次 spreadsheets.batchUpdate + 一次 values.batchUpdate
+#   1. batchUpdate（全有或全無）：刪除舊的 pre_movies → 複製 movies 為 pre_movies → 清空 movies、調整列數
+#   2. values.batchUpdate：寫入標頭與資料（RAW，與原本 worksheet.update 相同）
+# 第 2 步失敗時再送一次 batchUpdate 把 pre_movies 換回 movies，不會留下空白或只寫一半的 movies
+# 分頁 id 第一次查詢後快取，之後每次上傳只需兩個 API 呼叫
+# 請求內容由 build_* 組出，同步（gspread）與非同步（api/sheets_async.py）兩條路徑共用
+# -------------------------------------------------------------
+_sheet_ids = {} # spreadsheet id → {分頁名稱: sheetId}
+SHEET_IDS_FIELDS = "sheets.properties(sheetId,title)"
+
+def parse_sheet_ids(metadata):
+    return {sheet["properties"]["title"]: sheet["properties"]["sheetId"] for sheet in metadata["sheets"]}
+
+def load_sheet_ids(spreadsheet, refresh=False):
+    if refresh or spreadsheet.id not in _sheet_ids:
+        _sheet_ids[spreadsheet.id] = parse_sheet_ids(spreadsheet.fetch_sheet_metadata(params={"fields": SHEET_IDS_FIELDS}))
+    return _sheet_ids[spreadsheet.id]
+
+def build_rotate_requests(sheet_ids, row_count):
+    movies_id = sheet_ids["movies"]
+    requests = []
+    if "pre_movies" in sheet_ids:
+        requests.append({"deleteSheet": {"sheetId": sheet_ids["pre_movies"]}})
+    requests += [
+        {"duplicateSheet": {"sourceSheetId": movies_id, "newSheetName": "pre_movies"}},
+        # 清空所有值（保留格式，與 worksheet.clear() 相同），列數剛好容納這次的資料
+        {"updateCells": {"range": {"sheetId": movies_id}, "fields": "userEnteredValue"}},
+        {"updateSheetProperties": {
+            "properties": {"sheetId": movies_id, "gridProperties": {"rowCount": row_count}},
+            "fields": "gridProperties.rowCount",
+        }},
+    ]
+    return {"requests": requests}
+
+# 輪替成功：快取改記新的 pre_movies id
+def apply_rotate_reply(sheet_ids, response):
+    sheet_ids.pop("pre_movies", None)
+    for reply in response.get("replies", []):
+        if "duplicateSheet" in reply:
+            sheet_ids["pre_movies"] = reply["duplicateSheet"]["properties"]["sheetId"]
+    return sheet_ids
+
+# 寫入失敗：刪掉清空後的 movies，pre_movies 改名回 movies
+def build_restore_requests(sheet_ids):
+    return {"requests": [
+        {"deleteSheet": {"sheetId": sheet_ids["movies"]}},
+        {"updateSheetProperties": {
+            "properties": {"sheetId": sheet_ids["pre_movies"], "title": "movies"},
+            "fields": "title",
+        }},
+    ]}
+
+def apply_restore(sheet_ids):
+    sheet_ids["movies"] = sheet_ids.pop("pre_movies")
+    logging.info("↩️ 已將 pre_movies 還原為 movies")
+
+def build_values_body(rows):
+    return {"valueInputOption": "RAW", "data": [{"range": "movies!A1", "values": [HEADER] + rows}]}
+
+def rotate_movies_sheet(spreadsheet, row_count):
+    sheet_ids = load_sheet_ids(spreadsheet)
+    try:
+        response = spreadsheet.batch_update(build_rotate_requests(sheet_ids, row_count))
+    except gspread.exceptions.APIError as e:
+        # 400 且分頁 id 已變（有人手動改過分頁）→ 用新的 id 重試一次；id 沒變表示是請求本身的問題
+        if e.code != 400 or load_sheet_ids(spreadsheet, refresh=True) == sheet_ids:
+            raise
+        logging.warning(f"⚠️ 快取的分頁 id 已失效，重新查詢後重試：{e}")
+        sheet_ids = load_sheet_ids(spreadsheet)
+        response = spreadsheet.batch_update(build_rotate_requests(sheet_ids, row_count))
+    return apply_rotate_reply(sheet_ids, response)
+
+def restore_movies_sheet(spreadsheet, sheet_ids):
+    try:
+        spreadsheet.batch_update(build_restore_requests(sheet_ids))
+        apply_restore(sheet_ids)
+    except Exception as e:
+        _sheet_ids.pop(spreadsheet.id, None) # 狀態不明，下次重新查詢分頁 id
+        print(f"❌ 還原 movies 失敗：{e}")
+
+def replace_movies_sheet(spreadsheet, rows: list[list[str]]) -> dict:
+    try:
+        sheet_ids = rotate_movies_sheet(spreadsheet, len(rows) + 1)
+    except Exception as e:
+        print(f"❌ 分頁備份與清空失敗：{e}")
+        return {"status": "error", "message": str(e)}
+
+    try:
+        spreadsheet.values_batch_update(build_values_body(rows))
+    except Exception as e:
+        print(f"❌ 寫入失敗：{e}")
+        restore_movies_sheet(spreadsheet, sheet_ids)
+        return {"status": "error", "message": str(e)}
+
+    logging.info(f"✅ movies 已更新 {len(rows)} 筆（舊資料保留在 pre_movies）")
+    return {"status": "success", "count": len(rows)}
@@ -0,0 +1,188 @@
+# 非同步的 Google Sheets 存取層：/upload 以 async def 執行，等待 Sheets API 時不佔用 threadpool 的 worker
+#   - httpx.AsyncClient：整個 process 共用一個連線池，重複使用 keep-alive 的 TLS 連線
+#   - asyncio.Semaphore：限制同時送往 Sheets API 的請求數，多個上傳同時進來時排隊而不是一起撞配額
+#   - 大型請求的 JSON 編碼、token 更新（oauth2client 是同步的）丟到執行緒，不卡住事件迴圈
+# 請求內容與 api/sheets.py 共用（build_*）；SHEETS_BACKEND=fake 時改在執行緒裡呼叫同步的假後端
+#
+# 環境變數：
+#   SPREADSHEET_ID         試算表 id（未設定時以 SPREADSHEET_NAME 經 Drive API 查詢一次）
+#   SHEETS_API_URL         預設 https://sheets.googleapis.com/v4（本機 stub：python -m api.fake_sheets）
+#   DRIVE_API_URL          預設 https://www.googleapis.com/drive/v3
+#   SHEETS_ACCESS_TOKEN    固定的 bearer token（stub 用），未設定時以 CREDENTIALS_PATH 的服務帳戶取得
+#   SHEETS_MAX_CONCURRENCY 同時請求上限（預設 4）
+#   SHEETS_TIMEOUT         單一請求逾時秒數（預設 120）
+import os, json, time, asyncio, logging
+import httpx
+from gspread.exceptions import APIError, SpreadsheetNotFound
+from api.sheets import (
+    SCOPE, SHEET_IDS_FIELDS, _sheet_ids, get_spreadsheet, replace_movies_sheet, parse_sheet_ids,
+    build_rotate_requests, apply_rotate_reply, build_restore_requests, apply_restore, build_values_body,
+)
+
+class StaticToken:
+    def __init__(self, token):
+        self.token = token
+
+    async def get(self):
+        return self.token
+
+# 服務帳戶 token：快取到過期前一分鐘，同時只有一個協程去更新
+class ServiceAccountToken:
+    def __init__(self, credentials_path):
+        from oauth2client.service_account import ServiceAccountCredentials
+        self.credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, SCOPE)
+        self.token = None
+        self.expires_at = 0
+        self.lock = asyncio.Lock()
+
+    async def get(self):
+        async with self.lock:
+            if self.token is None or time.monotonic() > self.expires_at - 60:
+                info = await asyncio.to_thread(self.credentials.get_access_token)
+                self.token = info.access_token
+                self.expires_at = time.monotonic() + (info.expires_in or 3600)
+        return self.token
+
+class AsyncSheetsClient:
+    def __init__(self, token, spreadsheet_id=None, spreadsheet_name=None,
+                 sheets_url="https://sheets.googleapis.com/v4", drive_url="https://www.googleapis.com/drive/v3",
+                 max_concurrency=4, timeout=120):
+        self.token = token
+        self.spreadsheet_id = spreadsheet_id
+        self.spreadsheet_name = spreadsheet_name
+        self.sheets_url = sheets_url.rstrip("/")
+        self.drive_url = drive_url.rstrip("/")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    @classmethod
+    def from_env(cls):
+        if os.getenv("SHEETS_ACCESS_TOKEN"):
+            token = StaticToken(os.getenv("SHEETS_ACCESS_TOKEN"))
+        else:
+            token = ServiceAccountToken(os.getenv("CREDENTIALS_PATH", "/etc/secrets/credentials.json"))
+        return cls(
+            token,
+            spreadsheet_id=os.getenv("SPREADSHEET_ID"),
+            spreadsheet_name=os.getenv("SPREADSHEET_NAME"),
+            sheets_url=os.getenv("SHEETS_API_URL", "https://sheets.googleapis.com/v4"),
+            drive_url=os.getenv("DRIVE_API_URL", "https://www.googleapis.com/drive/v3"),
+            max_concurrency=int(os.getenv("SHEETS_MAX_CONCURRENCY", "4")),
+            timeout=float(os.getenv("SHEETS_TIMEOUT", "120")),
+        )
+
+    async def _request(self, method, url, body=None, params=None):
+        headers = {"Authorization": f"Bearer {await self.token.get()}"}
+        content = None
+        if body is not None:
+            # 上萬列的 values 請求編碼要幾十毫秒，放到執行緒
+            content = await asyncio.to_thread(lambda: json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            headers["Content-Type"] = "application/json"
+        async with self.semaphore:
+            response = await self.http.request(method, url, content=content, params=params, headers=headers)
+        if response.is_error:
+            raise APIError(response)
+        return response.json()
+
+    # 與 gspread.open(name) 相同：以 Drive API 依名稱查詢，只查一次
+    async def get_spreadsheet_id(self):
+        if self.spreadsheet_id is None:
+            result = await self._request("GET", f"{self.drive_url}/files", params={
+                "q": f'name = "{self.spreadsheet_name}" and mimeType = "application/vnd.google-apps.spreadsheet"',
+                "fields": "files(id,name)",
+                "supportsAllDrives": "true",
+                "includeItemsFromAllDrives": "true",
+            })
+            if not result.get("files"):
+                raise SpreadsheetNotFound(self.spreadsheet_name)
+            self.spreadsheet_id = result["files"][0]["id"]
+        return self.spreadsheet_id
+
+    async def fetch_sheet_metadata(self, params=None):
+        spreadsheet_id = await self.get_spreadsheet_id()
+        return await self._request("GET", f"{self.sheets_url}/spreadsheets/{spreadsheet_id}", params=params)
+
+    async def batch_update(self, body):
+        spreadsheet_id = await self.get_spreadsheet_id()
+        return await self._request("POST", f"{self.sheets_url}/spreadsheets/{spreadsheet_id}:batchUpdate", body)
+
+    async def values_batch_update(self, body):
+        spreadsheet_id = await self.get_spreadsheet_id()
+        return await self._request("POST", f"{self.sheets_url}/spreadsheets/{spreadsheet_id}/values:batchUpdate", body)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    # ---------------------------------------------------------
+    # movies 分頁輪替 + 寫入（流程同 api/sheets.py 的 replace_movies_sheet）
+    # ---------------------------------------------------------
+    async def load_sheet_ids(self, refresh=False):
+        spreadsheet_id = await self.get_spreadsheet_id()
+        if refresh or spreadsheet_id not in _sheet_ids:
+            _sheet_ids[spreadsheet_id] = parse_sheet_ids(await self.fetch_sheet_metadata({"fields": SHEET_IDS_FIELDS}))
+        return _sheet_ids[spreadsheet_id]
+
+    async def rotate_movies_sheet(self, row_count):
+        sheet_ids = await self.load_sheet_ids()
+        try:
+            response = await self.batch_update(build_rotate_requests(sheet_ids, row_count))
+        except APIError as e:
+            if e.code != 400 or await self.load_sheet_ids(refresh=True) == sheet_ids:
+                raise
+            logging.warning(f"⚠️ 快取的分頁 id 已失效，重新查詢後重試：{e}")
+            sheet_ids = await self.load_sheet_ids()
+            response = await self.batch_update(build_rotate_requests(sheet_ids, row_count))
+        return apply_rotate_reply(sheet_ids, response)
+
+    async def restore_movies_sheet(self, sheet_ids):
+        try:
+            await self.batch_update(build_restore_requests(sheet_ids))
+            apply_restore(sheet_ids)
+        except Exception as e:
+            _sheet_ids.pop(self.spreadsheet_id, None)
+            print(f"❌ 還原 movies 失敗：{e}")
+
+    async def replace_movies_sheet(self, rows: list[list[str]]) -> dict:
+        try:
+            sheet_ids = await self.rotate_movies_sheet(len(rows) + 1)
+        except Exception as e:
+            print(f"❌ 分頁備份與清空失敗：{e}")
+            return {"status": "error", "message": str(e)}
+
+        try:
+            await self.values_batch_update(build_values_body(rows))
+        except Exception as e:
+            print(f"❌ 寫入失敗：{e}")
+            await self.restore_movies_sheet(sheet_ids)
+            return {"status": "error", "message": str(e)}
+
+        logging.info(f"✅ movies 已更新 {len(rows)} 筆（舊資料保留在 pre_movies）")
+        return {"status": "success", "count": len(rows)}
+
+# 同一個 worker 共用一個 client（連線池與並行上限都是 per-process）
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = AsyncSheetsClient.from_env()
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# 同一批資料：輪替 movies / pre_movies 並寫入
+# 多個上傳同時進來時依序執行，避免兩次輪替交錯（後到的會把 pre_movies 換成前一次剛寫入的資料）
+_replace_lock = asyncio.Lock()
+
+async def replace_movies(rows: list[list[str]]) -> dict:
+    async with _replace_lock:
+        if os.getenv("SHEETS_BACKEND") == "fake":
+            return await asyncio.to_thread(replace_movies_sheet, get_spreadsheet(), rows)
+        return await get_client().replace_movies_sheet(rows)
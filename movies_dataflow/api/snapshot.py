@@ -0,0 +1,269 @@
+# 唯讀場次快照：上傳時寫一次不可變的二進位檔，各 API worker 以 mmap 共用（同一份 page cache，
+# worker 數增加不會多佔記憶體，啟動時也不需重建）；snapshots/CURRENT 指向最新版本，以 os.replace 原子切換
+#
+# 檔案格式：MAGIC | u32 header 長度 | header JSON（各區段的 offset/length/typecode）| 8 bytes 對齊的陣列區段
+#   strings:data / strings:offsets  排序後的字串表（utf-8），字串 id 即排序位置，可二分搜尋
+#   col:<欄位>                       每列的字串 id
+#   times:offsets / times:codes      時刻表（list 欄位）
+#   stale                            每列一個 byte
+#   times:minutes / when:*           時刻表的分鐘數與 (city, 日期) 時間索引（見 api/intervals.py）
+#   idx:<維度>:keys/offsets/rows     各維度的 CSR 索引：字串 id → 列號
+import os, sys, json, mmap, struct
+from array import array
+from datetime import datetime
+from pathlib import Path
+from moviescraper.utils.columnar import STRING_FIELDS, LIST_FIELD, ROW_ORDER
+from api.intervals import build_interval_sections, parse_minutes
+
+SNAPSHOT_DIR = Path("snapshots")
+POINTER_NAME = "CURRENT"
+KEEP_SNAPSHOTS = 3
+MAGIC = b"MVSNAP\x00\x01"
+FORMAT_VERSION = 1
+ALIGN = 8
+DIMENSIONS = ["city", "cinema", "影院", "日期", "電影名稱", "地址"]
+
+assert array("I").itemsize == 4
+
+# -------------------------------------------------------------
+# 寫入
+# -------------------------------------------------------------
+def build_sections(items):
+    strings = set()
+    for item in items:
+        strings.update(item.get(field, "") for field in STRING_FIELDS)
+        strings.update(item.get(LIST_FIELD, []))
+    strings = sorted(strings)
+    string_id = {value: i for i, value in enumerate(strings)}
+
+    data = bytearray()
+    offsets = array("I", [0])
+    for value in strings:
+        data += value.encode("utf-8")
+        offsets.append(len(data))
+
+    sections = {"strings:data": data, "strings:offsets": offsets}
+    for field in STRING_FIELDS:
+        sections[f"col:{field}"] = array("I", (string_id[item.get(field, "")] for item in items))
+
+    times_offsets = array("I", [0])
+    times_codes = array("I")
+    for item in items:
+        times_codes.extend(string_id[t] for t in item.get(LIST_FIELD, []))
+        times_offsets.append(len(times_codes))
+    sections["times:offsets"] = times_offsets
+    sections["times:codes"] = times_codes
+    sections["stale"] = array("B", (1 if item.get("stale") else 0 for item in items))
+    sections.update(build_interval_sections(
+        sections["col:city"],
+        sections["col:日期"],
+        [parse_minutes(item.get(LIST_FIELD, [])) for item in items],
+    ))
+
+    for dim in DIMENSIONS:
+        postings = {}
+        for row, code in enumerate(sections[f"col:{dim}"]):
+            postings.setdefault(code, []).append(row)
+        keys = array("I", sorted(postings))
+        index_offsets = array("I", [0])
+        rows = array("I")
+        for code in keys:
+            rows.extend(postings[code])
+            index_offsets.append(len(rows))
+        sections[f"idx:{dim}:keys"] = keys
+        sections[f"idx:{dim}:offsets"] = index_offsets
+        sections[f"idx:{dim}:rows"] = rows
+
+    return sections
+
+def _pad(size):
+    return -size % ALIGN
+
+def write_snapshot(items, folder=SNAPSHOT_DIR, source=None):
+    """寫入新快照並切換 CURRENT，回傳快照路徑"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    sections = build_sections(items)
+
+    # 先以最大位數的 offset 估出 header 長度（實際 offset 位數只會更少）
+    layout = {}
+    header = {
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "rows": len(items),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source": source,
+        "sections": layout,
+    }
+    for name, section in sections.items():
+        layout[name] = [2 ** 48, 2 ** 48, section.typecode if isinstance(section, array) else "B"]
+    header_size = len(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+
+    position = len(MAGIC) + 4 + header_size
+    position += _pad(position)
+    for name, section in sections.items():
+        length = len(section) * (section.itemsize if isinstance(section, array) else 1)
+        layout[name][0:2] = [position, length]
+        position += length + _pad(length)
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8").ljust(header_size)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.snap"
+    path = folder / name
+    tmp_path = folder / f"{name}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", header_size))
+        f.write(header_bytes)
+        f.write(b"\0" * _pad(f.tell()))
+        for section_name, section in sections.items():
+            assert f.tell() == layout[section_name][0]
+            f.write(section)
+            f.write(b"\0" * _pad(f.tell()))
+    os.replace(tmp_path, path)
+
+    tmp_pointer = folder / f"{POINTER_NAME}.{os.getpid()}.tmp"
+    tmp_pointer.write_text(name, encoding="utf-8")
+    os.replace(tmp_pointer, folder / POINTER_NAME)
+
+    prune_snapshots(folder)
+    return path
+
+# 已被 worker 映射的舊檔在 POSIX 上刪除後仍可讀；Windows 上刪不掉就留待下次
+def prune_snapshots(folder=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    snapshots = sorted(Path(folder).glob("*.snap"))
+    for path in snapshots[:-keep]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+# -------------------------------------------------------------
+# 讀取
+# -------------------------------------------------------------
+class Snapshot:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} 不是場次快照")
+        header_size = struct.unpack_from("<I", self._mmap, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(view[start:start + header_size]).decode("utf-8"))
+        if header["version"] != FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} 版本或位元組順序不符")
+
+        self.meta = {k: v for k, v in header.items() if k != "sections"}
+        self.rows = header["rows"]
+        self._sections = {
+            name: view[offset:offset + length].cast(typecode)
+            for name, (offset, length, typecode) in header["sections"].items()
+        }
+        self._strings = self._sections["strings:data"]
+        self._string_offsets = self._sections["strings:offsets"]
+
+    def section(self, name):
+        return self._sections[name]
+
+    def has_section(self, name):
+        return name in self._sections
+
+    def string(self, code):
+        return bytes(self._strings[self._string_offsets[code]:self._string_offsets[code + 1]]).decode("utf-8")
+
+    # 字串表已排序：二分搜尋字串 id，找不到回傳 None
+    def string_id(self, value):
+        target = value.encode("utf-8")
+        lo, hi = 0, len(self._string_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._strings[self._string_offsets[mid]:self._string_offsets[mid + 1]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._string_offsets) - 1 and self.string(lo) == value:
+            return lo
+        return None
+
+    def _posting(self, dim, code):
+        keys = self._sections[f"idx:{dim}:keys"]
+        lo, hi = 0, len(keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[mid] < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(keys) or keys[lo] != code:
+            return None
+        offsets = self._sections[f"idx:{dim}:offsets"]
+        return self._sections[f"idx:{dim}:rows"][offsets[lo]:offsets[lo + 1]]
+
+    def find(self, **filters):
+        """依維度篩選（例：city="台北", 日期="2025-07-01"），回傳列號"""
+        filters = {dim: value for dim, value in filters.items() if value is not None}
+        if not filters:
+            return range(self.rows)
+
+        codes = {}
+        postings = []
+        for dim, value in filters.items():
+            if dim not in DIMENSIONS:
+                raise KeyError(f"不支援的篩選維度：{dim}")
+            code = self.string_id(value)
+            posting = self._posting(dim, code) if code is not None else None
+            if posting is None:
+                return []
+            codes[dim] = code
+            postings.append((len(posting), dim, posting))
+
+        # 從最短的列表開始，其餘條件直接比對欄位
+        _, first_dim, rows = min(postings, key=lambda p: p[0])
+        rows = list(rows)
+        for dim, code in codes.items():
+            if dim != first_dim:
+                column = self._sections[f"col:{dim}"]
+                rows = [row for row in rows if column[row] == code]
+        return rows
+
+    def values(self, dim):
+        return [self.string(code) for code in self._sections[f"idx:{dim}:keys"]]
+
+    def row(self, row):
+        times_offsets = self._sections["times:offsets"]
+        times_codes = self._sections["times:codes"]
+        item = {}
+        for field in ROW_ORDER:
+            if field == LIST_FIELD:
+                item[field] = [self.string(c) for c in times_codes[times_offsets[row]:times_offsets[row + 1]]]
+            else:
+                item[field] = self.string(self._sections[f"col:{field}"][row])
+        if self._sections["stale"][row]:
+            item["stale"] = True
+        return item
+
+# 每個 worker 一個：每次取用時檢查 CURRENT，有新版本就換成新的映射（舊映射在無人引用後釋放）
+class SnapshotHandle:
+    def __init__(self, folder=SNAPSHOT_DIR):
+        self.folder = Path(folder)
+        self._pointer_stat = None
+        self._snapshot = None
+
+    def get(self):
+        pointer = self.folder / POINTER_NAME
+        try:
+            stat = pointer.stat()
+        except FileNotFoundError:
+            return self._snapshot
+
+        signature = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if signature != self._pointer_stat:
+            name = pointer.read_text(encoding="utf-8").strip()
+            if self._snapshot is None or self._snapshot.name != name:
+                self._snapshot = Snapshot(self.folder / name)
+            self._pointer_stat = signature
+        return self._snapshot
@@ -1,41 +1,120 @@
-import os, json, requests, shutil, asyncio, sys, argparse
-from spider_executor import SpiderExecutor
+import os, json, time, hashlib, asyncio, sys, argparse
+import run_store
+from spider_executor import SpiderExecutor, SPIDER_MAP
 from dotenv import load_dotenv
 from moviescraper.utils.data_merger import merge_cleaned_outputs
+from moviescraper.utils.batch_upload import BatchUploader, iter_json_array, iter_batches
 
 # ✅ Windows asyncio reactor 相容性處理
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-# ✅ 清除並建立 data 資料夾
-def clean_data_folder():
-    if os.path.exists("data"):
-        shutil.rmtree("data")
-    os.makedirs("data")
-
-# ✅ 上傳資料至 FastAPI
-def upload_to_fastapi(json_path="data/all_cleaned.json", upload_url=None):
-    if not upload_url:
-        print("❌ 未提供 upload_url，無法執行上傳")
+# ✅ 上傳資料至 FastAPI（預設為 runs/CURRENT 指向的 all_cleaned.json）
+# 逐批讀檔 → gzip → /upload/batch（同一個連線池），最後 /upload/commit；
+# session 由檔案內容雜湊而來，中斷後重跑會從 {json_path}.upload.json 記錄的下一批繼續
+def upload_to_fastapi(json_path=None, base_url=None, max_batch_bytes=1 << 20, max_batch_rows=5000):
+    if not base_url:
+        print("❌ 未提供 base_url，無法執行上傳")
         return
 
+    if json_path is None:
+        current = run_store.current_run_dir()
+        if current is None:
+            print("❌ 尚無已完成的執行（runs/CURRENT 不存在），無法執行上傳")
+            return
+        json_path = current / "all_cleaned.json"
+
+    session_id = file_digest(json_path)[:16]
+    checkpoint_path = f"{json_path}.upload.json"
+    acked = load_upload_checkpoint(checkpoint_path, session_id)
+    if acked >= 0:
+        print(f"⏩ 從第 {acked + 1} 批繼續上傳（session {session_id}）")
+
+    uploader = BatchUploader(base_url, session_id, compress=True, pool_size=1)
+    rows = 0
+    start = time.perf_counter()
+
+    try:
+        for seq, batch in enumerate(iter_batches(iter_json_array(json_path), max_batch_bytes, max_batch_rows)):
+            if seq <= acked:
+                continue
+            uploader.send("all", seq, batch)
+            rows += len(batch)
+            save_upload_checkpoint(checkpoint_path, session_id, seq)
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        print(
+            f"📈 傳送 {rows} 筆 / {uploader.raw_bytes_sent / 1024:.0f} KB（gzip 後 {uploader.bytes_sent / 1024:.0f} KB），"
+            f"{rows / elapsed:.0f} 筆/秒、{uploader.bytes_sent / 1024 / elapsed:.0f} KB/秒"
+        )
+
+        result = uploader.commit()
+        os.remove(checkpoint_path)
+        print(f'✅ 傳送成功 → {result}')
+
+    except Exception as e:
+        print(f'❌ 上傳中斷：{e}（已確認的批次已記錄，重新執行會接續上傳）')
+    finally:
+        uploader.close()
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_upload_checkpoint(path, session_id):
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return -1
+    return checkpoint["acked"] if checkpoint.get("session") == session_id else -1
+
+def save_upload_checkpoint(path, session_id, seq):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"session": session_id, "acked": seq}, f)
+    os.replace(tmp_path, path)
+
+# ✅ 串流上傳收尾：補送暫存筆數與輸出檔不一致的來源（沿用/stale/失敗批次），再提交
+# 沒有輸出檔（--no-export）時無從補送：有批次失敗或爬蟲沒有執行報告就不提交，
+# 否則 /upload/commit 會用不完整的資料覆蓋整張 sheet
+def finalize_stream(uploader, run_dir=None, manifest=None, batch_size=500, report=None):
+    if manifest is None and report is not None:
+        incomplete = stream_failures(report)
+        if incomplete:
+            print(f"❌ 串流上傳不完整，不提交（{incomplete}）；請不加 --no-export 重新執行，由輸出檔補送")
+            uploader.close()
+            return
+
+    if manifest is not None:
+        staged = uploader.staged_counts()
+        for name, info in manifest["spiders"].items():
+            if staged.get(name, 0) == info["items"]:
+                continue
+            with open(run_store.output_path(run_dir, name), encoding="utf-8") as f:
+                items = json.load(f)
+            print(f"📤 補送 {name}：暫存 {staged.get(name, 0)} 筆 / 輸出 {len(items)} 筆")
+            for seq, start in enumerate(range(0, len(items), batch_size)):
+                uploader.send(name, seq, items[start:start + batch_size], replace=(seq == 0))
+
     try:
-        with open(json_path, encoding="utf-8") as f:
-            payload = json.load(f)
-        res = requests.post(upload_url, json=payload, headers={"Content-Type": "application/json"})
-        res.raise_for_status()
-        try:
-            result = res.json()
-        except Exception:
-            print("⚠️ FastAPI 回傳非 JSON，原始內容：", res.text)
-            result = {"status": "error", "message": res.text.strip()}
-        print(f'✅ 傳送成功：{res.status_code} / 共 {len(payload)} 筆 → {result}')
-
-    except requests.exceptions.HTTPError as http_err:
-        print(f'❌ HTTP 錯誤：{http_err}')
-        print(f'📄 FastAPI 回傳內容：{res.text[:1000]}')
+        result = uploader.commit()
+        print(f"✅ 串流上傳提交完成 → {result}")
     except Exception as e:
-        print(f'❌ 其他錯誤：{e}')
+        print(f"❌ 串流上傳提交失敗：{e}")
+    finally:
+        uploader.close()
+
+# 各爬蟲未送達的串流批次數（沒有執行報告的爬蟲無法確認，一併列出）
+def stream_failures(report):
+    failures = {name: "沒有執行報告" for name in report.get("missing", [])}
+    for name, info in report.get("spiders", {}).items():
+        if info.get("stream_failed_batches", 0):
+            failures[name] = f"{info['stream_failed_batches']} 批失敗"
+    return failures
 
 # ✅ 主執行流程
 def main(
@@ -44,39 +123,107 @@ def main(
     no_upload=False,
     upload_only=False,
     dry_run=False,
-    env="prod"
+    env="prod",
+    days=1,
+    incremental=False,
+    retry_failed=False,
+    max_age=None,
+    stream=False,
+    stream_dir=None,
+    export=True,
+    profile=None
 ):
 
     load_dotenv()
     BASE_URL = "http://localhost:8000" if env == "local" else os.getenv("BASE_URL")
-    UPLOAD_URL = f"{BASE_URL}/upload"
 
     if upload_only:
         print("🚀 Upload-only 模式 → 直接傳送 all_cleaned.json 至 FastAPI")
-        upload_to_fastapi(upload_url=UPLOAD_URL)
+        upload_to_fastapi(base_url=BASE_URL)
         return
 
     spiders = targets.split(",") if isinstance(targets, str) else targets
+    carried = {}
+    previous = run_store.current_run_dir()
+    previous_manifest = run_store.load_manifest(previous) if previous else {"spiders": {}}
+
+    if retry_failed:
+        if previous is None:
+            print("⚠️ 沒有上一次的執行紀錄 → 改為完整執行")
+        else:
+            spiders = run_store.failed_spiders(previous_manifest)
+            if not spiders:
+                print(f"✅ 上一次執行（{previous.name}）沒有失敗的爬蟲，不需重跑")
+                return
+
+    reuse = []
+    if retry_failed and previous is not None:
+        reuse = [name for name in SPIDER_MAP if name not in spiders]
+
+    max_age = run_store.parse_max_age(max_age)
+    if max_age and previous is not None:
+        selected = spiders or list(SPIDER_MAP.keys())
+        fresh = run_store.fresh_spiders(previous_manifest, selected, max_age, days)
+        if fresh:
+            print(f"🕒 資料仍新鮮，略過：{fresh}")
+        spiders = [name for name in selected if name not in fresh]
+        reuse += fresh
+        if not spiders:
+            print(f"✅ 所有爬蟲資料都在 max_age 內，沿用目前執行（{previous.name}）")
+            return
+
+    run_dir = run_store.new_run_dir()
+    print(f"目前進度: 建立執行目錄 {run_dir}")
 
-    print("目前進度: 清除 data 資料夾")
-    clean_data_folder()
+    if reuse:
+        carried = run_store.carry_over(previous, run_dir, reuse, previous_manifest)
+        print(f"♻️ 重跑 {spiders}，沿用 {list(carried)}")
 
-    print(f"目前進度: 啟動 Scrapy → 模式: {mode} / {spiders or '全部'}")
-    SpiderExecutor().run(mode=mode, spiders=spiders)
+    stream_config = None
+    if stream and not (dry_run or no_upload):
+        stream_config = {"target": stream_dir or BASE_URL, "session": run_dir.name}
+        print(f"📤 串流上傳 → {stream_config['target']}（session {run_dir.name}）")
+
+    print(f"目前進度: 啟動 Scrapy → 模式: {mode} / {spiders or '全部'} / {days} 天")
+    executor = SpiderExecutor(
+        incremental=incremental,
+        data_dir=run_dir,
+        stream=stream_config,
+        export=export or not stream_config,
+        profile=profile
+    )
+    executor.run(mode=mode, spiders=spiders, days=days)
+
+    if stream_config and not export:
+        print("📦 未輸出檔案 → 直接提交串流上傳（不建立 manifest、不合併）")
+        finalize_stream(BatchUploader(stream_config["target"], run_dir.name), report=executor.report)
+        return
+
+    manifest = run_store.build_manifest(run_dir, spiders or list(SPIDER_MAP.keys()), carried, days)
+    run_store.write_manifest(run_dir, manifest)
+    for name, info in manifest["spiders"].items():
+        print(f"  - {name}: {info['status']} / {info['items']} 筆")
 
     if dry_run:
-        print("🧪 Dry-run 模式 → 跳過合併與上傳")
+        print("🧪 Dry-run 模式 → 跳過合併與上傳（不切換 runs/CURRENT）")
         return
 
     print("目前進度: 合併所有影城資料 → 匯出 all_cleaned.json")
-    merge_cleaned_outputs("data", "*_formated.json", "all_cleaned.json")
+    merge_cleaned_outputs(run_dir, "*_formated.json", "all_cleaned.json")
+    run_store.promote(run_dir)
+    run_store.prune_runs()
 
     if no_upload:
         print("📦 No-upload 模式 → 已完成合併，但不執行上傳")
         return
 
-    print('目前進度: 傳送資料給 FastAPI /upload...')
-    upload_to_fastapi(upload_url=UPLOAD_URL)
+    if stream_config:
+        print('目前進度: 補送並提交串流上傳 /upload/commit...')
+        finalize_stream(BatchUploader(stream_config["target"], run_dir.name), run_dir, manifest)
+        return
+
+    print('目前進度: 分批傳送資料給 FastAPI /upload/batch...')
+    upload_to_fastapi(base_url=BASE_URL)
 
 
 if __name__ == '__main__':
@@ -87,6 +234,15 @@ if __name__ == '__main__':
     parser.add_argument("--upload-only", action="store_true", help="只執行上傳 all_cleaned.json 至 FastAPI")
     parser.add_argument("--dry-run", action="store_true", help="僅執行爬蟲，不合併、不上傳")
     parser.add_argument("--env", choices=["local", "prod"], default="prod")
+    parser.add_argument("--days", type=int, default=1, help="擷取天數（同一頁面內的多日場次，不增加請求）")
+    parser.add_argument("--incremental", action="store_true", help="增量模式：略過未變動的詳細頁並重播上次結果")
+    parser.add_argument("--retry-failed", action="store_true", help="只重跑上一次失敗或無資料的爬蟲，其餘沿用")
+    parser.add_argument("--max-age", type=str, help="資料新鮮度上限（秒），如 3600 或 vs=1800,amba=7200；未過期的爬蟲直接沿用")
+    parser.add_argument("--stream", action="store_true", help="爬取時即分批上傳至 FastAPI /upload/batch")
+    parser.add_argument("--stream-dir", type=str, help="串流改寫入本機暫存目錄（不經 FastAPI）")
+    parser.add_argument("--no-export", action="store_true", help="搭配 --stream：不輸出 *_formated.json")
+    parser.add_argument("--profile", nargs="?", const="callbacks", choices=["callbacks", "sample"],
+                        help="callback 效能分析，報表輸出至執行目錄的 {spider}_profile.json；sample 另輸出 flamegraph 堆疊")
 
     args = parser.parse_args()
     main(
@@ -95,5 +251,13 @@ if __name__ == '__main__':
         no_upload=args.no_upload,
         upload_only=args.upload_only,
         dry_run=args.dry_run,
-        env=args.env
+        env=args.env,
+        days=args.days,
+        incremental=args.incremental,
+        retry_failed=args.retry_failed,
+        max_age=args.max_age,
+        stream=args.stream,
+        stream_dir=args.stream_dir,
+        export=not args.no_export,
+        profile=args.profile
     )
@@ -0,0 +1,86 @@
+# HTTP 快取儲存效能比較：FilesystemCacheStorage vs SqliteCacheStorage
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_httpcache --requests 2000
+import os, sys, time, shutil, tempfile, argparse
+from scrapy import Spider
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.utils.test import get_crawler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from moviescraper.httpcache import SqliteCacheStorage
+
+class BenchSpider(Spider):
+    name = "bench"
+
+def make_body(i):
+    rows = "".join(
+        f'<li class="theater"><h3><a>影院 {i}-{n}</a></h3><ul><li><h6>1{n % 10}:30</h6></li></ul></li>'
+        for n in range(400)
+    )
+    return f"<html><body><ul>{rows}</ul></body></html>".encode("utf-8")
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def bench(storage_cls, cachedir, count):
+    settings = Settings({"HTTPCACHE_DIR": cachedir, "HTTPCACHE_EXPIRATION_SECS": 0})
+    crawler = get_crawler(BenchSpider, settings.copy_to_dict())
+    spider = crawler._create_spider("bench")
+    storage = storage_cls(crawler.settings)
+    storage.open_spider(spider)
+
+    pairs = []
+    for i in range(count):
+        url = f"https://www.vscinemas.com.tw/film/detail.aspx?id={i}"
+        request = Request(url)
+        response = HtmlResponse(url=url, body=make_body(i), headers={"Content-Type": "text/html; charset=utf-8"})
+        pairs.append((request, response))
+
+    start = time.perf_counter()
+    for request, response in pairs:
+        storage.store_response(spider, request, response)
+    store_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for request, _ in pairs:
+        assert storage.retrieve_response(spider, request) is not None
+    lookup_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(count):
+        storage.retrieve_response(spider, Request(f"https://www.vscinemas.com.tw/missing?id={i}"))
+    miss_secs = time.perf_counter() - start
+
+    storage.close_spider(spider)
+    return {
+        "store_ms": store_secs / count * 1000,
+        "lookup_ms": lookup_secs / count * 1000,
+        "miss_ms": miss_secs / count * 1000,
+        "disk_kb": dir_size(cachedir) / 1024,
+        "files": sum(len(files) for _, _, files in os.walk(cachedir)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 快取儲存效能比較")
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"📦 {args.requests} 筆回應（每筆約 {len(make_body(0)) // 1024} KB）")
+    print(f"{'storage':<24}{'store ms':>10}{'lookup ms':>11}{'miss ms':>9}{'disk KB':>11}{'files':>8}")
+    for storage_cls in (FilesystemCacheStorage, SqliteCacheStorage):
+        cachedir = tempfile.mkdtemp(prefix="httpcache_bench_")
+        try:
+            r = bench(storage_cls, cachedir, args.requests)
+        finally:
+            shutil.rmtree(cachedir, ignore_errors=True)
+        print(f"{storage_cls.__name__:<24}{r['store_ms']:>10.3f}{r['lookup_ms']:>11.3f}"
+              f"{r['miss_ms']:>9.3f}{r['disk_kb']:>11.0f}{r['files']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# 每筆場次的記憶體用量：dict（現行 JsonExportPipeline 暫存）vs ShowtimeRecord（slots + 共用字串）
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_item_memory --rows 1000000
+import gc, argparse, tracemalloc
+
+from benchmarks.synthetic import synthetic_items
+from moviescraper.items import ShowtimeRecord
+
+def measure(rows, build):
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(item) for item in synthetic_items(rows)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return current, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="場次紀錄記憶體用量比較")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"📦 合成 {args.rows:,} 筆場次")
+    results = {}
+    shared_times = {}
+    for name, build in (("dict", dict), ("ShowtimeRecord", lambda item: ShowtimeRecord.from_item(item, shared_times))):
+        current, peak = measure(args.rows, build)
+        results[name] = current
+        print(f"{name:<16} 保留 {current / 1024 / 1024:8.1f} MB  峰值 {peak / 1024 / 1024:8.1f} MB"
+              f"  每筆 {current / args.rows:6.0f} bytes")
+
+    print(f"📉 每筆減少 {(1 - results['ShowtimeRecord'] / results['dict']) * 100:.1f}%")
+
+if __name__ == "__main__":
+    main()
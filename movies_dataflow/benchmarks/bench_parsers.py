@@ -0,0 +1,142 @@
+# 爬蟲解析 callback 的效能回歸測試：以 benchmarks/fixtures/ 的 HTML 離線執行各 callback，
+# 量測 items/s、每頁耗時與 tracemalloc 記憶體（峰值、callback 結束後仍保留的量），
+# 並與 baseline 比較，變慢或記憶體增加超過門檻時以非 0 結束（可放進 CI）
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_parsers --update-baseline   # 在主分支記錄 baseline
+#   python -m benchmarks.bench_parsers                     # 修改後比較，回歸時 exit 1
+#   python -m benchmarks.bench_parsers --only vs,amba --threshold 0.3
+#
+# baseline 與機器相關，只和同一台機器上記錄的結果比較。
+# sbc / sk / showtimes 匯入時需要 selenium 與 scrapy_selenium4（requirements.txt），缺少時略過
+import sys, json, time, argparse, importlib, tracemalloc
+from pathlib import Path
+from scrapy import Selector
+from scrapy.http import HtmlResponse
+
+FIXTURES_DIR = Path(__file__).with_name("fixtures")
+BASELINE_PATH = Path(__file__).with_name("parser_baseline.json")
+DAYS = 7 # fixture 含 7 天場次，全部解析
+
+def response_input(fixture, url):
+    body = (FIXTURES_DIR / fixture).read_bytes()
+    # 每次都建新的 response：Selector 會快取在 response 上，實際爬取時每頁都要重新解析 HTML
+    return lambda: HtmlResponse(url=url, body=body, encoding="utf-8")
+
+def selector_input(fixture):
+    text = (FIXTURES_DIR / fixture).read_text(encoding="utf-8")
+    return lambda: Selector(text=text)
+
+# 秀泰的 parse 需要 Selenium driver；這裡重現它對每個電影區塊呼叫 extract_showtime_info 的部分
+def showtimes_blocks(module, spider, response):
+    for movie in response.xpath('//div[div[@class="sc-EgOXT iZnlsW"]]'):
+        if movie.xpath('.//div[contains(text(), "廳")]'):
+            yield from module.extract_showtime_info(movie)
+
+CASES = {
+    "amba": ("moviescraper.spiders.amba", "AmbassadorSpider", "movieTimes_parse",
+             response_input("amba_movieTimes.html", "https://www.ambassador.com.tw/home/Showtime")),
+    "vs": ("moviescraper.spiders.vs", "vsSpider", "movie_info_parse",
+           response_input("vs_movie_info.html", "https://www.vscinemas.com.tw/film/detail.aspx?id=1")),
+    "venice": ("moviescraper.spiders.venice", "VeniceSpider", "showtimes_parse",
+               response_input("venice_showtimes.html", "https://www.venice-cinemas.com.tw/showtimes")),
+    "sbc": ("moviescraper.spiders.sbc", "sbcSpider", "movieInfo_parse",
+            response_input("sbc_movieInfo.html", "https://www.sbcmovies.com.tw/browsing/Movies/1")),
+    "sk": ("moviescraper.spiders.sk", "skSpider", "movie_data", selector_input("sk_sessions.html")),
+    "showtimes": ("moviescraper.spiders.showTimes", "ShowTimeSpider", showtimes_blocks,
+                  response_input("showtimes_ticketing.html", "https://www.showtimes.com.tw/ticketing")),
+}
+
+def load_case(name):
+    module_name, class_name, callback, make_input = CASES[name]
+    module = importlib.import_module(module_name)
+    spider = getattr(module, class_name)()
+    spider.days = DAYS
+    if isinstance(callback, str):
+        parse = getattr(spider, callback)
+    else:
+        parse = lambda page: callback(module, spider, page)
+    return lambda: list(parse(make_input()) or [])
+
+def measure(run, min_time, min_rounds=5):
+    run() # 暖機（匯入、regex 編譯等一次性成本）
+    rounds, items = 0, 0
+    start = time.perf_counter()
+    while rounds < min_rounds or time.perf_counter() - start < min_time:
+        items += len(run())
+        rounds += 1
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        results = run()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items": len(results),
+        "items_per_sec": round(items / elapsed, 1),
+        "ms_per_page": round(elapsed / rounds * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(retained / 1024, 1),
+    }
+
+def compare(name, result, base, threshold):
+    """回傳回歸說明列表（空列表表示通過）"""
+    problems = []
+    if result["items_per_sec"] < base["items_per_sec"] * (1 - threshold):
+        problems.append(f"items/s {base['items_per_sec']:,.0f} → {result['items_per_sec']:,.0f}")
+    if result["peak_kb"] > base["peak_kb"] * (1 + threshold):
+        problems.append(f"峰值記憶體 {base['peak_kb']:,.0f} KB → {result['peak_kb']:,.0f} KB")
+    if result["items"] != base["items"]:
+        print(f"⚠️ {name}: 解析出的筆數改變 {base['items']} → {result['items']}（解析結果可能不同）")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="爬蟲解析 callback 效能回歸測試")
+    parser.add_argument("--only", help="只測指定爬蟲（逗號分隔）")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每個 callback 至少量測的秒數")
+    parser.add_argument("--threshold", type=float, default=0.2, help="容許的退步比例")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="以這次結果覆寫 baseline")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(CASES)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+
+    results, regressions = {}, {}
+    print(f"{'callback':<12}{'items':>7}{'items/s':>12}{'ms/頁':>10}{'峰值 KB':>10}{'保留 KB':>10}")
+    for name in names:
+        try:
+            run = load_case(name)
+        except ImportError as e:
+            print(f"⚠️ {name}: 略過（缺少相依套件：{e.name}）")
+            continue
+        result = results[name] = measure(run, args.min_time)
+        print(
+            f"{name:<12}{result['items']:>7}{result['items_per_sec']:>12,.0f}{result['ms_per_page']:>10.2f}"
+            f"{result['peak_kb']:>10,.0f}{result['retained_kb']:>10,.0f}"
+        )
+        if name in baseline and not args.update_baseline:
+            problems = compare(name, result, baseline[name], args.threshold)
+            if problems:
+                regressions[name] = problems
+
+    if args.update_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"📝 已更新 baseline：{args.baseline}")
+        return
+    if not baseline:
+        print("⚠️ 尚無 baseline，先以 --update-baseline 記錄")
+        return
+
+    if regressions:
+        for name, problems in regressions.items():
+            print(f"❌ {name} 效能回歸（門檻 {args.threshold:.0%}）：" + "；".join(problems))
+        sys.exit(1)
+    print(f"✅ 沒有超過 {args.threshold:.0%} 的效能回歸")
+
+if __name__ == "__main__":
+    main()
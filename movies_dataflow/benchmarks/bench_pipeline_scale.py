@@ -0,0 +1,237 @@
+# 端到端資料流量測：合成爬蟲原始 item（各爬蟲的日期格式、全形 / 標點雜訊的片名變體、
+# cinema_address_map 的影院名稱），依序經過
+#   MoviescraperPipeline → JsonExportPipeline → merge_cleaned_outputs → MovieItem 驗證（/upload）→ prepare_rows
+# 回報每個階段的耗時、每秒筆數與峰值 RSS，看規模放大時哪一段先撐不住
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_pipeline_scale                      # 10k / 100k / 1M（1M 需時十餘分鐘）
+#   python -m benchmarks.bench_pipeline_scale --rows 100000 --json scale.json
+#
+# 每個規模在獨立的子行程執行，峰值 RSS 不受前一個規模影響
+import os, sys, gc, json, time, random, logging, argparse, tempfile, threading, subprocess
+from contextlib import redirect_stdout
+from scrapy.settings import Settings
+
+from benchmarks.synthetic import CINEMAS, VERSIONS, TIMES
+from moviescraper.items import MovieItem
+from moviescraper.pipelines import MoviescraperPipeline, JsonExportPipeline
+from moviescraper.utils.data_merger import merge_cleaned_outputs
+
+WEEKDAYS = "一二三四五六日"
+FULL_WIDTH = str.maketrans("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", "０１２３４５６７８９ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ")
+ENGLISH = ["", "", "IMAX", "F1", "Jurassic World", "Spider-Man", "Toy Story 5", "Dragon II"]
+
+# 各爬蟲原始頁面上的日期寫法（MoviescraperPipeline.format_date 處理的格式）
+def raw_date(spider, day):
+    y, m, d, w = day.year, day.month, day.day, WEEKDAYS[day.weekday()]
+    return {
+        "venice": f"{y}-{m:02d}-{d:02d}(星期{w})",
+        "vs": f"{y}年{m:02d}月{d:02d}日星期{w}",
+        "sk": f"{m:02d}-{d:02d}({w})",
+        "showtimes": f"{m}月{d}日(周{w})",
+        "amba": f"{y}/{m:02d}/{d:02d}({w})",
+        "sbc": f"{y}-{m:02d}-{d:02d}",
+    }[spider]
+
+# 彼此差異夠大的片名（MoviescraperPipeline 以 90 分為同一部片）
+def film_titles(count, rng):
+    chars = [chr(rng.randint(0x4E00, 0x4E00 + 3000)) for _ in range(800)]
+    return [
+        ("".join(rng.choices(chars, k=rng.randint(3, 7))) + " " + rng.choice(ENGLISH)).strip()
+        for _ in range(count)
+    ]
+
+# 同一部片在不同影城網站的寫法：全形英數、標點、多餘空白
+def title_variant(title, rng):
+    roll = rng.random()
+    if roll < 0.2:
+        return title.translate(FULL_WIDTH)
+    if roll < 0.35:
+        return f"《{title}》"
+    if roll < 0.5:
+        return title.replace(" ", "：", 1) + "!"
+    if roll < 0.6:
+        return f"  {title}  "
+    return title
+
+def raw_items(rows, seed=5, films=80):
+    """依序產生 (爬蟲名稱, MovieItem)，與爬蟲交給 pipeline 的 item 相同"""
+    from datetime import date, timedelta
+    rng = random.Random(seed)
+    titles = film_titles(films, rng)
+    spiders = ["vs", "amba", "showtimes", "sk", "venice", "sbc"]
+    first_day = date.today() + timedelta(days=1)
+    for n in range(rows):
+        spider = spiders[n % len(spiders)]
+        cinema, _ = rng.choice(CINEMAS)
+        version = rng.choice(VERSIONS)
+        item = MovieItem()
+        item["影院"] = cinema + rng.choice(["", "", " 數位廳"])
+        item["網址"] = f"https://example.com/{spider}/{n % 500}"
+        item["電影名稱"] = title_variant(rng.choice(titles), rng)
+        item["放映版本"] = f"{version}(中文)" if spider == "amba" else version
+        item["日期"] = raw_date(spider, first_day + timedelta(days=rng.randrange(7)))
+        item["時刻表"] = [f" {t} " for t in sorted(rng.sample(TIMES, rng.randint(2, 8)))]
+        yield spider, item
+
+# -------------------------------------------------------------
+# RSS 量測：背景執行緒讀 /proc/self/statm（Linux）；其他平台只能取整個行程的 ru_maxrss，
+# Windows 沒有 resource 模組 → RSS 記為 0，只看耗時
+# -------------------------------------------------------------
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+def max_rss():
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class RssSampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_rss = self.peak = 0
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.start_rss = current_rss() or max_rss()
+        self.peak = self.start_rss
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or max_rss())
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss() or max_rss())
+
+class BenchSpider:
+    def __init__(self, name, folder):
+        self.name = name
+        self.settings = Settings({"DATA_DIR": folder})
+
+def run_stages(rows, folder):
+    from api.fastapi_app import MovieItem as UploadItem
+    from api.sheets import prepare_rows
+
+    results = []
+    def record(stage, elapsed, sampler, count):
+        results.append({
+            "stage": stage,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(count / elapsed) if elapsed else None,
+            "peak_rss_mb": round(sampler.peak / 1024 / 1024, 1),
+            "rss_growth_mb": round((sampler.peak - sampler.start_rss) / 1024 / 1024, 1),
+        })
+
+    # 1. 正規化（JsonExportPipeline.process_item 只是暫存，一併計入第 2 階段）
+    normalizer = MoviescraperPipeline()
+    exporters = {}
+    normalize_time = export_time = 0.0
+    with RssSampler() as sampler:
+        for spider_name, item in raw_items(rows):
+            spider = BenchSpider(spider_name, folder)
+            start = time.perf_counter()
+            record_item = normalizer.process_item(item, spider)
+            middle = time.perf_counter()
+            exporter = exporters.get(spider_name)
+            if exporter is None:
+                exporter = exporters[spider_name] = JsonExportPipeline()
+                exporter.open_spider(spider)
+            exporter.process_item(record_item, spider)
+            export_time += time.perf_counter() - middle
+            normalize_time += middle - start
+    record("MoviescraperPipeline", normalize_time, sampler, rows)
+
+    # 2. 輸出 *_formated.json
+    with RssSampler() as sampler, redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        for spider_name, exporter in exporters.items():
+            exporter.close_spider(BenchSpider(spider_name, folder))
+        export_time += time.perf_counter() - start
+    record("JsonExportPipeline", export_time, sampler, rows)
+    del exporters, normalizer
+    gc.collect()
+
+    # 3. 合併（含跨影城片名歸併與欄式快照）
+    with RssSampler() as sampler, redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        merge_cleaned_outputs(folder=folder)
+        elapsed = time.perf_counter() - start
+    record("merge_cleaned_outputs", elapsed, sampler, rows)
+    gc.collect()
+
+    # 4. /upload 的請求驗證（FastAPI 以 MovieItem 逐筆驗證 all_cleaned.json）
+    with RssSampler() as sampler:
+        start = time.perf_counter()
+        with open(os.path.join(folder, "all_cleaned.json"), encoding="utf-8") as f:
+            items = [UploadItem(**item) for item in json.load(f)]
+        elapsed = time.perf_counter() - start
+    record("upload (MovieItem)", elapsed, sampler, rows)
+
+    # 5. 轉成 sheet 列
+    with RssSampler() as sampler, redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        sheet_rows = prepare_rows(items)
+        elapsed = time.perf_counter() - start
+    record("prepare_rows", elapsed, sampler, len(sheet_rows))
+    return results
+
+def print_results(rows, results):
+    print(f"\n📦 {rows:,} 筆")
+    print(f"{'階段':<24}{'秒':>9}{'筆/秒':>12}{'峰值 RSS MB':>14}{'增加 MB':>10}")
+    for r in results:
+        rate = f"{r['rows_per_sec']:,}" if r["rows_per_sec"] else "-"
+        print(f"{r['stage']:<24}{r['seconds']:>9.2f}{rate:>12}{r['peak_rss_mb']:>14,.1f}{r['rss_growth_mb']:>10,.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端資料流量測")
+    parser.add_argument("--rows", default="10000,100000,1000000", help="規模（逗號分隔）")
+    parser.add_argument("--json", help="另存結果 JSON（追蹤各項最佳化的影響）")
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.rows.split(",")]
+
+    if len(sizes) > 1:
+        # 每個規模各自一個子行程
+        combined = {}
+        for rows in sizes:
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                path = tmp.name
+            cmd = [sys.executable, "-m", "benchmarks.bench_pipeline_scale", f"--rows={rows}", f"--json={path}"]
+            try:
+                if subprocess.run(cmd).returncode != 0:
+                    print(f"❌ {rows:,} 筆執行失敗")
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    combined.update(json.load(f))
+            finally:
+                os.unlink(path)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(combined, f, indent=2, ensure_ascii=False)
+        return
+
+    logging.disable(logging.WARNING) # 每個新片名都會記一筆 warning
+    rows = sizes[0]
+    with tempfile.TemporaryDirectory() as folder:
+        results = run_stages(rows, folder)
+    print_results(rows, results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({str(rows): results}, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
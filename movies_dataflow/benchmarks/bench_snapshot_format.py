@@ -0,0 +1,46 @@
+# 合併輸出格式比較：all_cleaned.json（indent=4）vs 欄式快照（字典編碼）
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_snapshot_format --rows 100000
+import gzip, json, time, argparse
+
+from benchmarks.synthetic import synthetic_items
+from moviescraper.utils.columnar import encode_columns, decode_columns
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="合併輸出格式大小與解析時間比較")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    items = list(synthetic_items(args.rows))
+    print(f"📦 合成 {args.rows:,} 筆場次")
+
+    formats = {
+        "json (indent=4)": (
+            lambda: json.dumps(items, indent=4, ensure_ascii=False).encode("utf-8"),
+            lambda raw: json.loads(raw),
+        ),
+        "columnar": (
+            lambda: json.dumps(encode_columns(items), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            lambda raw: decode_columns(json.loads(raw)),
+        ),
+    }
+
+    for name, (encode, decode) in formats.items():
+        raw, encode_time = timed(encode)
+        decoded, decode_time = timed(lambda: decode(raw))
+        assert decoded == items, f"{name} 解碼結果與原資料不同"
+        compressed = len(gzip.compress(raw, compresslevel=6))
+        print(f"{name:<16} {len(raw) / 1024 / 1024:8.1f} MB  gzip {compressed / 1024 / 1024:6.2f} MB"
+              f"  編碼 {encode_time * 1000:7.0f} ms  解析 {decode_time * 1000:7.0f} ms")
+
+if __name__ == "__main__":
+    main()
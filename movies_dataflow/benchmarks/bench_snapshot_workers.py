@@ -0,0 +1,87 @@
+# 多 worker 讀取成本：每個 worker 各自 json.load(all_cleaned.json) vs 以 mmap 共用唯讀快照
+# 以 /proc/self/smaps_rollup 的 Private（各 worker 獨佔）與 Pss（共用頁面平均分攤）衡量，僅限 Linux
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_snapshot_workers --rows 200000 --workers 1 2 4 8
+import os, json, time, shutil, argparse, tempfile
+from multiprocessing import get_context
+
+from benchmarks.synthetic import synthetic_items
+from api.snapshot import SnapshotHandle, write_snapshot
+
+def memory_kb():
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Pss", "Private_Clean", "Private_Dirty"):
+                usage[key] = int(value.split()[0])
+    return usage["Private_Clean"] + usage["Private_Dirty"], usage["Pss"]
+
+def json_worker(path, city, barrier, results):
+    base, _ = memory_kb()
+    start = time.perf_counter()
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    loaded = time.perf_counter() - start
+    matched = sum(1 for item in items if item["city"] == city)
+    barrier.wait()
+    private, pss = memory_kb()
+    results.put((loaded, matched, private - base, pss))
+    barrier.wait()
+
+def snapshot_worker(folder, city, barrier, results):
+    base, _ = memory_kb()
+    start = time.perf_counter()
+    snapshot = SnapshotHandle(folder).get()
+    loaded = time.perf_counter() - start
+    # 讀過所有列，讓整份檔案都映射進來
+    matched = sum(1 for row in range(snapshot.rows) if snapshot.row(row)["city"] == city)
+    barrier.wait()
+    private, pss = memory_kb()
+    results.put((loaded, matched, private - base, pss))
+    barrier.wait()
+
+def run(target, arg, workers, city):
+    ctx = get_context("fork")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=target, args=(arg, city, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="多 worker 讀取記憶體與冷啟動比較")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench_snapshot_")
+    try:
+        items = list(synthetic_items(args.rows))
+        city = items[0]["city"]
+        json_path = os.path.join(folder, "all_cleaned.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, indent=4, ensure_ascii=False)
+        snap_path = write_snapshot(items, folder)
+        del items
+        print(f"📦 {args.rows:,} 筆：JSON {os.path.getsize(json_path) / 1024 / 1024:.1f} MB"
+              f"，快照 {snap_path.stat().st_size / 1024 / 1024:.1f} MB")
+
+        for name, target, arg in (("json.load", json_worker, json_path), ("mmap", snapshot_worker, folder)):
+            for workers in args.workers:
+                stats = run(target, arg, workers, city)
+                loaded = max(s[0] for s in stats)
+                private = sum(s[2] for s in stats) / 1024
+                pss = sum(s[3] for s in stats) / 1024
+                print(f"{name:<10} workers={workers:<3} 載入 {loaded * 1000:7.1f} ms"
+                      f"  獨佔合計 {private:8.1f} MB  PSS 合計 {pss:8.1f} MB")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# 片名搜尋延遲：n-gram 索引 + rapidfuzz 排序 vs 逐一比對全部片名
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.bench_title_search --titles 5000
+import time, random, argparse
+from rapidfuzz import fuzz
+
+from api.search import TitleIndex, search_key
+
+WORDS = ["侏羅紀", "世界", "重生", "蜘蛛人", "鬼滅之刃", "無限城", "名偵探柯南", "超人", "F1", "Jurassic",
+         "World", "劇場版", "馴龍高手", "星際寶貝", "電子情緣", "玩具總動員", "奇異博士", "魔法公主"]
+
+# 常見片名用字 + 隨機中文詞（只用固定詞彙時每個 bigram 都會命中大量片名，不像真實片名）
+def synthetic_titles(count, seed=11):
+    rng = random.Random(seed)
+    chars = [chr(rng.randint(0x4E00, 0x4E00 + 3000)) for _ in range(1500)]
+    words = WORDS + ["".join(rng.choices(chars, k=rng.randint(2, 4))) for _ in range(count)]
+    titles = set()
+    while len(titles) < count:
+        titles.add(" ".join(rng.sample(words, rng.randint(1, 3))) + rng.choice(["", " 2", " 3", " 劇場版"]))
+    return sorted(titles)
+
+# 隨機刪除或替換一個字元，並改成全形
+def typo(title, rng):
+    chars = list(title)
+    i = rng.randrange(len(chars))
+    chars[i] = "" if rng.random() < 0.5 else "之"
+    return "".join(chars).replace("1", "１")
+
+def scan(titles, query, limit=10):
+    key = search_key(query)
+    scored = [(t, fuzz.partial_ratio(key, search_key(t))) for t in titles]
+    return sorted(scored, key=lambda r: -r[1])[:limit]
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="片名搜尋延遲比較")
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    titles = synthetic_titles(args.titles)
+    queries = [typo(rng.choice(titles), rng) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    index = TitleIndex(titles)
+    print(f"📦 {len(titles):,} 部片名，建索引 {(time.perf_counter() - start) * 1000:.0f} ms，{len(index.postings):,} 個 gram")
+    print(f"n-gram 索引  每次查詢 {timed(index.search, queries):8.3f} ms")
+    print(f"全部掃描     每次查詢 {timed(lambda q: scan(titles, q), queries[:50]):8.3f} ms")
+
+    start = time.perf_counter()
+    index.update(titles[: len(titles) // 2] + synthetic_titles(50, seed=12), version="next")
+    print(f"增量更新（移除一半、新增 50）{(time.perf_counter() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
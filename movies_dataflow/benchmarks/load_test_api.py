@@ -0,0 +1,240 @@
+# FastAPI 壓測：以假的 Google Sheets 在子行程啟動 API，
+# 上傳不同規模的資料（/upload，可多個同時上傳）、同時觸發 /trigger-update，並有多個執行緒持續打讀取端點，
+# 回報各端點的 p50/p95/p99 延遲、錯誤數與 API 行程的峰值 RSS，用來離線比較不同的上傳做法
+#
+# --sheets stub（預設）：另起一個本機 stub server（python -m api.fake_sheets），API 經 httpx 非同步呼叫
+# --sheets fake       ：API 行程內的假後端（SHEETS_BACKEND=fake），在執行緒裡同步呼叫
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.load_test_api                           # 1k / 10k / 50k / 200k
+#   python -m benchmarks.load_test_api --rows 1000,20000 --readers 16 --uploads 4 --json load.json
+#   FAKE_SHEETS_LATENCY=0.3 python -m benchmarks.load_test_api   # 假後端參數見 api/fake_sheets.py
+#
+# /trigger-update 會換成只等待 --updater-seconds 的替身，不會真的執行爬蟲
+import os, sys, json, time, socket, argparse, tempfile, threading, subprocess
+import urllib.request, urllib.error
+from urllib.parse import urlencode
+from collections import defaultdict
+
+from benchmarks.synthetic import synthetic_items
+
+API_KEY = "load-test"
+READ_ENDPOINTS = [
+    "/healthz",
+    "/showtimes?" + urlencode({"city": "台北", "limit": 50}),
+    "/showtimes/window?" + urlencode({"city": "台北", "date": "2025-07-03", "start": "18:00", "end": "22:00"}),
+    "/search?" + urlencode({"q": "電影 12"}),
+    "/nearby?" + urlencode({"lat": 25.04, "lon": 121.56, "radius_km": 5}),
+    "/reports?limit=5",
+]
+
+# -------------------------------------------------------------
+# 伺服器端（子行程）：替換 _run_updater 後以 uvicorn 啟動
+# -------------------------------------------------------------
+def serve(port, updater_seconds):
+    import logging, uvicorn
+    import api.fastapi_app as fastapi_app
+
+    logging.getLogger().setLevel(logging.WARNING) # 每次上傳的 INFO 紀錄會蓋過報表
+
+    def fake_updater(**kwargs):
+        time.sleep(updater_seconds)
+    fastapi_app._run_updater = fake_updater
+    uvicorn.run(fastapi_app.app, host="127.0.0.1", port=port, log_level="warning")
+
+# -------------------------------------------------------------
+# 用戶端
+# -------------------------------------------------------------
+def request(base, path, body=None, headers=None, timeout=600):
+    req = urllib.request.Request(base + path, data=body, headers=headers or {}, method="POST" if body is not None else "GET")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            payload = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        payload, status = e.read(), e.code
+    except OSError as e:
+        payload, status = str(e).encode(), 0
+    return status, time.perf_counter() - start, payload
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_ready(base, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if request(base, "/healthz", timeout=2)[0] == 200:
+            return True
+        time.sleep(0.2)
+    return False
+
+def process_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+def reader(base, stop, latencies, errors, index):
+    i = index
+    while not stop.is_set():
+        path = READ_ENDPOINTS[i % len(READ_ENDPOINTS)]
+        i += 1
+        status, elapsed, _ = request(base, path, timeout=60)
+        name = path.split("?")[0]
+        latencies[name].append(elapsed)
+        if status != 200:
+            errors[name] += 1
+
+def run_scenario(base, pid, rows, readers, uploads, min_seconds):
+    body = json.dumps(list(synthetic_items(rows, seed=rows)), ensure_ascii=False).encode("utf-8")
+    latencies, errors = defaultdict(list), defaultdict(int)
+    stop = threading.Event()
+    peak_rss = [process_rss(pid)]
+
+    def sample_rss():
+        while not stop.wait(0.05):
+            peak_rss[0] = max(peak_rss[0], process_rss(pid))
+
+    threads = [threading.Thread(target=reader, args=(base, stop, latencies, errors, i), daemon=True) for i in range(readers)]
+    threads.append(threading.Thread(target=sample_rss, daemon=True))
+    for t in threads:
+        t.start()
+
+    start = time.perf_counter()
+    trigger = request(base, "/trigger-update", json.dumps({"targets": ["vs"]}).encode(),
+                      {"Content-Type": "application/json", "x-api-key": API_KEY})
+    results = [None] * uploads
+
+    def upload(i):
+        results[i] = request(base, "/upload", body, {"Content-Type": "application/json"})
+
+    uploaders = [threading.Thread(target=upload, args=(i,)) for i in range(uploads)]
+    for t in uploaders:
+        t.start()
+    for t in uploaders:
+        t.join()
+    remaining = min_seconds - (time.perf_counter() - start)
+    if remaining > 0:
+        time.sleep(remaining)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    def upload_summary(result):
+        try:
+            upload_result = json.loads(result[2])
+        except ValueError:
+            upload_result = result[2][:200].decode("utf-8", "replace")
+        return {"status": result[0], "seconds": round(result[1], 3), "result": upload_result}
+
+    return {
+        "rows": rows,
+        "payload_mb": round(len(body) / 1024 / 1024, 1),
+        "uploads": [upload_summary(result) for result in results],
+        "trigger_update": {"status": trigger[0], "seconds": round(trigger[1], 3)},
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "errors": errors[name],
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+            }
+            for name, values in sorted(latencies.items())
+        },
+        "server_peak_rss_mb": round(peak_rss[0] / 1024 / 1024, 1),
+    }
+
+def print_result(r):
+    uploads = ", ".join(
+        f"{u['seconds']:.2f} 秒 → HTTP {u['status']} "
+        + (u["result"].get("status") if isinstance(u["result"], dict) else u["result"])
+        for u in r["uploads"]
+    )
+    print(f"\n📦 {r['rows']:,} 筆（{r['payload_mb']} MB）× {len(r['uploads'])}：/upload {uploads}"
+          f"，/trigger-update {r['trigger_update']['seconds'] * 1000:.0f} ms，API 峰值 RSS {r['server_peak_rss_mb']:,.0f} MB")
+    print(f"{'端點':<22}{'請求':>7}{'錯誤':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, e in r["endpoints"].items():
+        print(f"{name:<22}{e['requests']:>7}{e['errors']:>6}{e['p50_ms']:>10.1f}{e['p95_ms']:>10.1f}{e['p99_ms']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="FastAPI 壓測（假的 Google Sheets 後端）")
+    parser.add_argument("--rows", default="1000,10000,50000,200000", help="上傳規模（逗號分隔）")
+    parser.add_argument("--readers", type=int, default=8, help="同時打讀取端點的執行緒數")
+    parser.add_argument("--uploads", type=int, default=1, help="每個規模同時送出的 /upload 數")
+    parser.add_argument("--sheets", choices=["stub", "fake"], default="stub", help="Sheets 後端（見檔頭說明）")
+    parser.add_argument("--min-seconds", type=float, default=3.0, help="每個規模至少持續的秒數")
+    parser.add_argument("--updater-seconds", type=float, default=2.0, help="/trigger-update 替身的執行時間")
+    parser.add_argument("--json", help="另存結果 JSON")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS) # 子行程：在此 port 啟動 API
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.updater_seconds)
+        return
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stub = None
+    with tempfile.TemporaryDirectory() as workdir:
+        # 快照、暫存、runs/ 都寫在暫存目錄
+        env = dict(
+            os.environ,
+            UPDATER_API_KEY=API_KEY,
+            SNAPSHOT_DIR=os.path.join(workdir, "snapshots"),
+            STAGING_DIR=os.path.join(workdir, "staging"),
+            PYTHONPATH=package_dir + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        )
+        if args.sheets == "stub":
+            stub_port = free_port()
+            stub_base = f"http://127.0.0.1:{stub_port}"
+            stub = subprocess.Popen([sys.executable, "-m", "api.fake_sheets", f"--port={stub_port}"], cwd=workdir, env=env)
+            env.update(
+                SHEETS_API_URL=f"{stub_base}/v4",
+                DRIVE_API_URL=f"{stub_base}/drive/v3",
+                SHEETS_ACCESS_TOKEN=API_KEY,
+                SPREADSHEET_NAME="movies",
+            )
+            env.pop("SHEETS_BACKEND", None)
+        else:
+            env["SHEETS_BACKEND"] = "fake"
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test_api", f"--serve={port}", f"--updater-seconds={args.updater_seconds}"],
+            cwd=workdir, env=env,
+        )
+        try:
+            if not wait_ready(base) or (stub and request(stub_base, "/stats", timeout=10)[0] != 200):
+                print("❌ API 未能啟動")
+                sys.exit(1)
+            # 先發布一份快照，讀取端點才不會一開始全部回 503
+            request(base, "/upload", json.dumps(list(synthetic_items(200))).encode(), {"Content-Type": "application/json"})
+            print(f"🚀 API 已啟動（pid {server.pid}，Sheets 後端 {args.sheets}），讀取執行緒 {args.readers} 個")
+
+            results = []
+            for rows in (int(n) for n in args.rows.split(",")):
+                result = run_scenario(base, server.pid, rows, args.readers, args.uploads, args.min_seconds)
+                results.append(result)
+                print_result(result)
+        finally:
+            for process in (server, stub):
+                if process:
+                    process.terminate()
+                    process.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"📝 已寫入 {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# 產生 bench_parsers 用的 HTML fixture：結構依各爬蟲 callback 的 selector 撰寫，
+# 規模接近實際頁面（影院數、版本數、多日場次，加上導覽列等頁面雜訊）。
+# 有實際錄下的頁面時，直接以相同檔名放進 benchmarks/fixtures/ 取代即可
+#
+# 執行（於 movies_dataflow/ 目錄）：
+#   python -m benchmarks.make_fixtures
+import random
+from pathlib import Path
+
+from benchmarks.synthetic import CINEMAS, TIMES
+
+FIXTURES_DIR = Path(__file__).with_name("fixtures")
+WEEKDAYS = "一二三四五六日"
+
+def page(title, body, rng):
+    # 導覽列、頁尾與 script：讓 selector 掃描的 DOM 大小接近實際頁面
+    nav = "".join(f'<li><a href="/menu/{i}">選單項目 {i}</a></li>' for i in range(120))
+    footer = "".join(f"<p>版權與服務條款說明 {rng.random():.6f}</p>" for i in range(80))
+    script = "<script>var config = {" + ",".join(f'"k{i}": {i}' for i in range(300)) + "};</script>"
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>{script}</head>"
+        f"<body><header><nav><ul>{nav}</ul></nav></header><main>{body}</main><footer>{footer}</footer></body></html>"
+    )
+
+def times(rng, low=4, high=9):
+    return sorted(rng.sample(TIMES, rng.randint(low, high)))
+
+def amba_movie_times(rng):
+    dates = "".join(f"<li><a>2025/07/{d:02d}({WEEKDAYS[d % 7]})</a></li>" for d in range(1, 8))
+    boxes = ""
+    for cinema, _ in rng.sample(CINEMAS, 20):
+        for version in ("數位(中文)", "IMAX(英文)", "4DX(英文)"):
+            slots = "".join(f"<li><h6>{t}</h6><span>剩餘座位</span></li>" for t in times(rng))
+            boxes += (
+                f'<div class="theater-box"><h3><a href="/theater">{cinema}</a></h3>'
+                f'<p class="tag-seat">{version}</p><ul class="no-bullet">{slots}</ul></div>'
+            )
+    body = (
+        '<div class="movie-info-box"><h2>侏羅紀世界：重生</h2></div>'
+        f'<div id="search-bar-page"><ul class="scrollbar">{dates}</ul></div>{boxes}'
+    )
+    return page("國賓影城", body, rng)
+
+def vs_movie_info(rng):
+    versions, articles = "", ""
+    for v, version in enumerate(("數位", "IMAX", "4DX", "GC 數位")):
+        links = ""
+        for t, (cinema, _) in enumerate(rng.sample(CINEMAS, 15)):
+            anchor = f"theater-{v}-{t}"
+            links += f'<li><a href="#{anchor}">{cinema}</a></li>'
+            days = "".join(
+                f'<div class="movieDay"><h4>2025 年 07 月 {d:02d} 日 星期{WEEKDAYS[d % 7]}</h4>'
+                f'<ul class="bookList">{"".join(f"<li><a>{t}</a></li>" for t in times(rng))}</ul></div>'
+                for d in range(1, 8)
+            )
+            articles += f'<article id="{anchor}">{days}</article>'
+        versions += f'<li><div class="versionFirst">{version}</div><ul>{links}</ul></li>'
+    body = f'<div class="titleArea"><h1>F1 電影</h1></div><ul class="versionList">{versions}</ul>{articles}'
+    return page("威秀影城", body, rng)
+
+def venice_showtimes(rng):
+    days = "".join(
+        f'<div class="show-time"><div class="showtime-date">2025-07-{d:02d} ({WEEKDAYS[d % 7]})</div>'
+        f'<div class="showtime-item">{"".join(f"<label>{t}</label>" for t in times(rng, 5, 12))}</div></div>'
+        for d in range(1, 8)
+    )
+    return page("威尼斯影城", f'<div class="show-time-view"><h2>超人 (數位版)</h2></div>{days}', rng)
+
+def sbc_movie_info(rng):
+    sessions = ""
+    for d in range(1, 8):
+        slots = "".join(
+            f'<time datetime="2025-07-{d:02d}T{t}:00">{t}</time>' for t in times(rng, 5, 12)
+        )
+        sessions += f'<div class="session"><div class="session-times">{slots}</div></div>'
+    body = f'<div id="show-times"><h2>英語 蜘蛛人：穿越新宇宙</h2><div class="film-showtimes">{sessions}</div></div>'
+    return page("星橋國際影城", body, rng)
+
+def sk_sessions(rng):
+    routes = "".join(
+        f'<div class="route-item{" active" if i == 0 else ""}"><div class="title">{name}</div></div>'
+        for i, name in enumerate(["新光影城台北獅子林", "新光影城台北天母", "新光影城桃園青埔", "新光影城台中中港", "新光影城台南西門"])
+    )
+    movies = ""
+    for m in range(30):
+        days = "".join(
+            f'<div class="day-sessions"><div class="film-type">{rng.choice(["數位", "IMAX", "4DX"])}</div>'
+            f'<div class="business-date">07 月 {d:02d} 日</div>'
+            f'{"".join(f"<div class=session>{t}</div>" for t in times(rng))}</div>'
+            for d in range(1, 8)
+        )
+        movies += f'<div class="movie-sessions-view"><div class="film-name">電影 {m} 之 特別版</div>{days}</div>'
+    return page("新光影城", f'<div class="route-items">{routes}</div>{movies}', rng)
+
+def showtimes_ticketing(rng):
+    movies = ""
+    for m in range(40):
+        blocks = "".join(
+            f'<div><div>{rng.randint(1, 12)}廳 | {rng.choice(["數位", "IMAX", "4DX", "英文版"])}</div>'
+            f'<div>{t} ~ 23:59</div></div>'
+            for t in times(rng, 3, 10)
+        )
+        movies += (
+            f'<div><div class="sc-EgOXT iZnlsW"><img src="/poster/{m}.jpg"></div>'
+            f'<div class="dZNNPl">電影 {m} 之 特別版</div>{blocks}</div>'
+        )
+    body = f'<div class="izhUUl"><span>7月1日</span><span>週二</span></div><div class="movies">{movies}</div>'
+    return page("秀泰影城", body, rng)
+
+FIXTURES = {
+    "amba_movieTimes.html": amba_movie_times,
+    "vs_movie_info.html": vs_movie_info,
+    "venice_showtimes.html": venice_showtimes,
+    "sbc_movieInfo.html": sbc_movie_info,
+    "sk_sessions.html": sk_sessions,
+    "showtimes_ticketing.html": showtimes_ticketing,
+}
+
+def main():
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for name, build in FIXTURES.items():
+        html = build(random.Random(name))
+        (FIXTURES_DIR / name).write_text(html, encoding="utf-8")
+        print(f"📝 {name}：{len(html.encode('utf-8')) / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# 合成場次資料（欄位與 *_formated.json / all_cleaned.json 相同），供各 benchmark 共用
+import os, sys, random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from moviescraper.utils.cinema_info import cinema_address_map
+
+CINEMAS = list(cinema_address_map.items())
+CHAINS = ["威秀影城", "國賓影城", "秀泰影城", "新光影城", "威尼斯影城", "星橋國際影城"]
+VERSIONS = ["數位", "IMAX", "4DX", "英文版", "中文版", "GC 數位"]
+TITLES = [f"電影 {n} 之 特別版" for n in range(300)]
+TIMES = [f"{h:02d}:{m:02d}" for h in range(9, 24) for m in (0, 15, 30, 45)]
+
+# 模擬逐頁解析：每筆的字串都是新物件（與 selector .get() 的結果相同）
+def fresh(value):
+    return (value + ".")[:-1]
+
+def synthetic_items(rows, seed=7):
+    rng = random.Random(seed)
+    for _ in range(rows):
+        cinema, address = rng.choice(CINEMAS)
+        yield {
+            "影院": fresh(cinema),
+            "網址": fresh("https://www.vscinemas.com.tw/film"),
+            "電影名稱": fresh(rng.choice(TITLES)),
+            "放映版本": fresh(rng.choice(VERSIONS)),
+            "日期": fresh(f"2025-07-{rng.randint(1, 7):02d}"),
+            "時刻表": [fresh(t) for t in sorted(rng.sample(TIMES, rng.randint(2, 6)))],
+            "地址": fresh(address),
+            "city": fresh(address[:2]),
+            "cinema": fresh(rng.choice(CHAINS)),
+        }
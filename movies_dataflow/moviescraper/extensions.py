@@ -0,0 +1,162 @@
+# 自訂 Scrapy extensions
+import os, json, time, logging
+from datetime import datetime
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+# 各爬蟲（網域）的禮貌設定 + 自適應節流（取代全域 DOWNLOAD_DELAY / AutoThrottle）
+# - 延遲：朝 latency / target_concurrency 收斂，限制在 [delay, max_delay]
+# - 併發：連續 increase_after 個健康回應（延遲低、無錯誤）→ +1，直到 max_concurrency
+# - 429 / 5xx：延遲加倍、併發減半
+class AdaptiveThrottle:
+    BACKOFF_STATUSES = {429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.profiles = settings.getdict("POLITENESS_PROFILES")
+        self.default_profile = {
+            "delay": settings.getfloat("DOWNLOAD_DELAY"),
+            "concurrency": settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+            "max_concurrency": settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+            "target_concurrency": 1.0,
+            "max_delay": settings.getfloat("AUTOTHROTTLE_MAX_DELAY"),
+            "healthy_latency": 2.0,
+            "increase_after": 10,
+        }
+        self.profile = dict(self.default_profile)
+        self.slots = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_downloaded, signal=signals.response_downloaded)
+        return ext
+
+    def spider_opened(self, spider):
+        self.profile = {**self.default_profile, **self.profiles.get(spider.name, {})}
+        # 新建立的 download slot 會採用 spider 的 download_delay / max_concurrent_requests
+        spider.download_delay = self.profile["delay"]
+        spider.max_concurrent_requests = self.profile["concurrency"]
+        logger.info(
+            f"🚦 [{spider.name}] 初始節流：delay={self.profile['delay']}s "
+            f"concurrency={self.profile['concurrency']} target={self.profile['target_concurrency']}"
+        )
+
+    def response_downloaded(self, response, request, spider):
+        key = request.meta.get("download_slot")
+        slot = self.crawler.engine.downloader.slots.get(key)
+        latency = request.meta.get("download_latency")
+        if slot is None or latency is None:
+            return
+
+        state = self.slots.setdefault(key, {
+            "healthy": 0, "responses": 0, "errors": 0, "latency": latency,
+            "delay": slot.delay, "concurrency": slot.concurrency,
+        })
+        state["responses"] += 1
+        state["latency"] = 0.8 * state["latency"] + 0.2 * latency
+        profile = self.profile
+
+        if response.status in self.BACKOFF_STATUSES:
+            state["errors"] += 1
+            state["healthy"] = 0
+            slot.delay = min(profile["max_delay"], max(slot.delay * 2, profile["delay"], 1.0))
+            slot.concurrency = max(1, slot.concurrency // 2)
+            state.update(delay=slot.delay, concurrency=slot.concurrency)
+            logger.info(f"🐢 [{key}] HTTP {response.status} → delay={slot.delay:.2f}s concurrency={slot.concurrency}")
+            return
+
+        target_delay = latency / profile["target_concurrency"]
+        slot.delay = min(profile["max_delay"], max(profile["delay"], (slot.delay + target_delay) / 2))
+
+        if state["latency"] <= profile["healthy_latency"]:
+            state["healthy"] += 1
+        else:
+            state["healthy"] = 0
+
+        if state["healthy"] >= profile["increase_after"] and slot.concurrency < profile["max_concurrency"]:
+            slot.concurrency += 1
+            state["healthy"] = 0
+            logger.debug(f"🐇 [{key}] 回應穩定 → concurrency={slot.concurrency}")
+
+        state.update(delay=slot.delay, concurrency=slot.concurrency)
+
+    # download slot 閒置後會被回收，因此以每次調整後記下的值為準
+    def spider_closed(self, spider):
+        stats = self.crawler.stats
+        for key, state in self.slots.items():
+            delay = round(state["delay"], 2)
+            concurrency = state["concurrency"]
+            logger.info(
+                f"📊 [{spider.name}] {key}: delay={delay} concurrency={concurrency} "
+                f"latency≈{state['latency']:.2f}s responses={state['responses']} errors={state['errors']}"
+            )
+            stats.set_value(f"politeness/{key}/delay", delay, spider=spider)
+            stats.set_value(f"politeness/{key}/concurrency", concurrency, spider=spider)
+            stats.set_value(f"politeness/{key}/latency", round(state["latency"], 3), spider=spider)
+            stats.set_value(f"politeness/{key}/errors", state["errors"], spider=spider)
+
+# 每個爬蟲的執行報告：以 spider_opened / spider_closed 記錄實際起訖時間（同一 process 併行的爬蟲各自計時），
+# 關閉時從 stats 取出筆數、請求數、下載量、錯誤數與結束原因，寫入 {DATA_DIR}/{spider}_report.json
+# （subprocess 模式的父行程與 API 都讀這個檔案）
+class RunReport:
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.folder = crawler.settings.get("DATA_DIR", "data")
+        self.started_at = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("RUN_REPORT_ENABLED"):
+            raise NotConfigured
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.started_at = time.time()
+
+    def spider_closed(self, spider, reason):
+        finished_at = time.time()
+        stats = self.crawler.stats.get_stats(spider)
+        status_counts = {
+            key.rsplit("/", 1)[1]: value
+            for key, value in stats.items()
+            if key.startswith("downloader/response_status_count/")
+        }
+        report = {
+            "spider": spider.name,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "finished_at": datetime.fromtimestamp(finished_at).isoformat(timespec="seconds"),
+            "duration": round(finished_at - self.started_at, 2),
+            "close_reason": reason,
+            "items": stats.get("item_scraped_count", 0),
+            "dropped_items": stats.get("item_dropped_count", 0),
+            "requests": stats.get("downloader/request_count", 0),
+            "response_bytes": stats.get("downloader/response_bytes", 0),
+            "errors": stats.get("log_count/ERROR", 0),
+            "spider_exceptions": stats.get("spider_exceptions/count", 0),
+            "download_exceptions": stats.get("downloader/exception_count", 0),
+            "retries": stats.get("retry/count", 0),
+            "status_counts": status_counts,
+            "cache_hits": stats.get("httpcache/hit", 0),
+            "incremental_skipped": stats.get("incremental/skipped_requests", 0),
+            "stream_failed_batches": stats.get("stream/failed_batches", 0), # 重試後仍未送達的串流批次
+        }
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{spider.name}_report.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        logger.info(
+            f"🧾 [{spider.name}] {report['duration']:.0f}s items={report['items']} "
+            f"requests={report['requests']} errors={report['errors']} reason={reason}"
+        )
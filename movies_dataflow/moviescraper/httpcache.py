@@ -0,0 +1,134 @@
+# 自訂 HTTP 快取：單一 SQLite 檔 + zlib 壓縮 + 容量上限(LRU) + ETag/Last-Modified 重新驗證
+#
+# settings.py:
+#   HTTPCACHE_STORAGE = "moviescraper.httpcache.SqliteCacheStorage"
+#   HTTPCACHE_POLICY = "moviescraper.httpcache.RevalidatingPolicy"
+import os, time, zlib, sqlite3, logging
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+class SqliteCacheStorage:
+    def __init__(self, settings):
+        self.cachedir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.db_path = os.path.join(self.cachedir, settings.get("HTTPCACHE_SQLITE_FILE", "httpcache.sqlite3"))
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.max_bytes = settings.getint("HTTPCACHE_SQLITE_MAX_BYTES", 200 * 1024 * 1024)
+        self.compress_level = settings.getint("HTTPCACHE_SQLITE_COMPRESS_LEVEL", 6)
+        self.db = None
+        self.total_bytes = 0
+        self._fingerprinter = None
+
+    def open_spider(self, spider):
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        self.db = sqlite3.connect(self.db_path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                spider TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers BLOB NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (spider, fingerprint)
+            )"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self.total_bytes = self._sum_size()
+        logger.debug(f"Using SQLite cache storage in {self.db_path}")
+
+    def close_spider(self, spider):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def retrieve_response(self, spider, request):
+        key = self._fingerprinter.fingerprint(request).hex()
+        row = self.db.execute(
+            "SELECT url, status, headers, body, stored_at FROM responses WHERE spider = ? AND fingerprint = ?",
+            (spider.name, key),
+        ).fetchone()
+        if row is None:
+            return None
+
+        url, status, raw_headers, body, stored_at = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None
+
+        self.db.execute(
+            "UPDATE responses SET accessed_at = ? WHERE spider = ? AND fingerprint = ?",
+            (time.time(), spider.name, key),
+        )
+        headers = Headers(headers_raw_to_dict(zlib.decompress(raw_headers)))
+        body = zlib.decompress(body)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        key = self._fingerprinter.fingerprint(request).hex()
+        raw_headers = zlib.compress(headers_dict_to_raw(response.headers), self.compress_level)
+        body = zlib.compress(response.body, self.compress_level)
+        size = len(raw_headers) + len(body)
+        now = time.time()
+        # 覆寫既有項目時先扣掉舊的大小（主鍵查詢，不必整表加總）
+        old = self.db.execute(
+            "SELECT size FROM responses WHERE spider = ? AND fingerprint = ?", (spider.name, key)
+        ).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (spider.name, key, response.url, response.status, raw_headers, body, size, now, now),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        self._evict()
+
+    def _sum_size(self):
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    # 超過容量上限 → 依最後讀取時間刪除最舊的項目
+    # 總大小在 open_spider 讀一次，之後隨寫入/刪除累加；
+    # 同一個快取檔可能有其他爬蟲同時寫入，真的要清理前再重新加總一次校正
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        self.total_bytes = self._sum_size()
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        excess = self.total_bytes - self.max_bytes
+        freed = 0
+        victims = []
+        for spider, key, size in self.db.execute(
+            "SELECT spider, fingerprint, size FROM responses ORDER BY accessed_at"
+        ):
+            victims.append((spider, key))
+            freed += size
+            if freed >= excess:
+                break
+
+        self.db.executemany("DELETE FROM responses WHERE spider = ? AND fingerprint = ?", victims)
+        self.total_bytes -= freed
+        logger.debug(f"🧹 HTTP 快取超過上限，移除 {len(victims)} 筆（{freed} bytes）")
+
+
+# 沒有 Cache-Control/Expires 的頁面：HTTPCACHE_REVALIDATE_AFTER 秒內直接使用快取，
+# 之後帶 If-None-Match / If-Modified-Since 向網站確認，304 時沿用快取內容
+class RevalidatingPolicy(RFC2616Policy):
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.revalidate_after = settings.getint("HTTPCACHE_REVALIDATE_AFTER", 600)
+
+    # 網站有給 Cache-Control / Expires 就照 RFC2616Policy 的計算（max-age=0、no-cache 都要尊重）
+    def _compute_freshness_lifetime(self, response, request, now):
+        lifetime = super()._compute_freshness_lifetime(response, request, now)
+        if b"Cache-Control" in response.headers or b"Expires" in response.headers:
+            return lifetime
+        return max(lifetime, self.revalidate_after)
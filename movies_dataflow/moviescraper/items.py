@@ -3,7 +3,9 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
+import sys
 import scrapy
+from dataclasses import dataclass
 
 
 class MoviescraperItem(scrapy.Item):
@@ -20,4 +22,53 @@ class MovieItem(scrapy.Item):
     電影名稱 = scrapy.Field()
     放映版本 = scrapy.Field()
     日期 = scrapy.Field()
-    時刻表 = scrapy.Field()
\ No newline at end of file
+    時刻表 = scrapy.Field()
+
+# 管線內部使用的精簡紀錄：__slots__ 取代每筆一個 dict，
+# 重複性高的欄位（影院、地址、日期、場次…）共用同一個字串物件，只在輸出時轉回 dict
+# frozen：後面的 pipeline 直接保留同一個物件，不必複製
+def _shared(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+@dataclass(slots=True, frozen=True)
+class ShowtimeRecord:
+    影院: str
+    網址: str
+    電影名稱: str
+    放映版本: str
+    日期: str
+    時刻表: tuple
+    地址: str
+    city: str
+    cinema: str
+
+    # shared_times：相同場次組合共用同一個 tuple，由呼叫端（pipeline）持有並在爬蟲結束時清空
+    @classmethod
+    def from_item(cls, item, shared_times=None):
+        times = tuple(_shared(t) for t in item.get('時刻表', ()))
+        if shared_times is not None:
+            times = shared_times.setdefault(times, times)
+        return cls(
+            影院=_shared(item.get('影院')),
+            網址=_shared(item.get('網址')),
+            電影名稱=_shared(item.get('電影名稱')),
+            放映版本=_shared(item.get('放映版本')),
+            日期=_shared(item.get('日期')),
+            時刻表=times,
+            地址=_shared(item.get('地址')),
+            city=_shared(item.get('city')),
+            cinema=_shared(item.get('cinema')),
+        )
+
+    def to_dict(self):
+        return {
+            '影院': self.影院,
+            '網址': self.網址,
+            '電影名稱': self.電影名稱,
+            '放映版本': self.放映版本,
+            '日期': self.日期,
+            '時刻表': list(self.時刻表),
+            '地址': self.地址,
+            'city': self.city,
+            'cinema': self.cinema,
+        }
@@ -3,11 +3,23 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+import os, json, time, random
+from contextlib import contextmanager
+from functools import partial
+from scrapy import signals, Request
+from scrapy.exceptions import NotConfigured, IgnoreRequest
+from scrapy.http import Response
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet.error import TimeoutError
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from .items import MovieItem
+from .utils.incremental import FingerprintStore, fingerprint
+from .utils.replay_archive import ArchiveReader, ArchiveWriter, archive_path
+from .utils import profiler
+
 
 class MoviescraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -148,4 +160,358 @@ class HeaderMiddleware:
             request.headers.update({
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_3) AppleWebKit/604.5.6 (KHTML, like Gecko) Version/11.0.3 Safari/604.5.6",
                 # "Referer": "https://www.skcinemas.com/"
-            })
\ No newline at end of file
+            })
+
+# 增量爬取：列表項目與詳細頁指紋未變（且未超過 TTL）→ 不再請求，直接重播上次的 items
+# 同一個詳細頁在不同 days 下產出的場次天數不同，指紋紀錄依 days 分檔
+class IncrementalSpiderMiddleware:
+    def __init__(self, settings, stats):
+        self.state_dir = settings.get("INCREMENTAL_DIR")
+        self.ttl = settings.getint("INCREMENTAL_TTL")
+        self.stats = stats
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("INCREMENTAL_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        days = int(getattr(spider, "days", 1))
+        path = os.path.join(self.state_dir, f"{spider.name}_days{days}_fingerprints.json")
+        self.store = FingerprintStore(path, self.ttl)
+        self.store.load()
+        spider.logger.info(f"♻️ 增量模式：已載入 {len(self.store.entries)} 筆指紋紀錄")
+
+    def spider_closed(self, spider):
+        self.store.save()
+
+    def process_spider_output(self, response, result, spider):
+        parent_key = response.meta.get("incremental_key")
+        body_fp = fingerprint(response.body) if parent_key else None
+        items, children = [], []
+
+        for obj in result:
+            if isinstance(obj, Request):
+                # 子頁面（如威尼斯的放映版本頁）以父頁面內容作為列表指紋
+                if parent_key:
+                    obj.meta.setdefault("listing_fp", body_fp)
+                listing_fp = obj.meta.get("listing_fp")
+
+                if listing_fp is not None:
+                    key = obj.meta.setdefault("incremental_key", obj.url)
+                    if parent_key:
+                        children.append(key)
+                    replayed = self.store.replay(key, listing_fp)
+                    if replayed is not None:
+                        self.stats.inc_value("incremental/skipped_requests", spider=spider)
+                        for data in replayed:
+                            yield MovieItem(data)
+                        continue
+            elif parent_key:
+                items.append(dict(obj))
+            yield obj
+
+        if parent_key:
+            unchanged = self.store.record(parent_key, response.meta["listing_fp"], body_fp, items, children)
+            if unchanged:
+                self.stats.inc_value("incremental/unchanged_bodies", spider=spider)
+
+
+# 斷路器：同一網域連續 N 次失敗（5xx / 429 / 連線錯誤）→ 停止發送請求並提前關閉爬蟲，
+# 留下 {DATA_DIR}/{spider}_breaker.json 讓 SpiderExecutor 改用上次成功的資料
+class CircuitBreakerMiddleware:
+    FAILURE_STATUSES = {429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.threshold = crawler.settings.getint("CIRCUIT_BREAKER_THRESHOLD")
+        self.folder = crawler.settings.get("DATA_DIR", "data")
+        self.failures = {}
+        self.open_domains = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CIRCUIT_BREAKER_ENABLED"):
+            raise NotConfigured
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        if urlparse_cached(request).hostname in self.open_domains:
+            raise IgnoreRequest(f"circuit breaker open: {request.url}")
+        return None
+
+    def process_response(self, request, response, spider):
+        domain = urlparse_cached(request).hostname
+        if response.status in self.FAILURE_STATUSES:
+            self._record_failure(domain, f"HTTP {response.status}", spider)
+        else:
+            self.failures[domain] = 0
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if isinstance(exception, IgnoreRequest):
+            return None
+        self._record_failure(urlparse_cached(request).hostname, repr(exception), spider)
+        return None
+
+    def _record_failure(self, domain, reason, spider):
+        self.failures[domain] = self.failures.get(domain, 0) + 1
+        if self.failures[domain] < self.threshold or domain in self.open_domains:
+            return
+
+        self.open_domains.add(domain)
+        spider.logger.error(f"⛔ 斷路器開啟：{domain} 連續 {self.failures[domain]} 次失敗（最後：{reason}）")
+        self.crawler.stats.set_value("circuit_breaker/open", domain, spider=spider)
+
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, f"{spider.name}_breaker.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "domain": domain,
+                "failures": self.failures[domain],
+                "reason": reason,
+                "time": time.time(),
+            }, f, ensure_ascii=False)
+
+        self.crawler.engine.close_spider(spider, "circuit_breaker_open")
+
+
+# 錄製 / 重播：REPLAY_MODE = "record" 把爬蟲收到的每個回應（含 Selenium 渲染後的第一個頁面）存進
+# {REPLAY_DIR}/{spider}.zip；"replay" 則完全不連網，直接從封存檔回應，可注入延遲與錯誤，
+# 讓併發、節流、快取的調整能以相同輸入重複比較
+# Selenium 爬蟲在 callback 內操作瀏覽器（點擊、切換日期）後取得的頁面：
+#   錄製時 meta["record_rendered"] 讓 callback 把頁面存進封存檔（見 utils/selenium_driver.py 的 record_rendered）
+#   重播時 meta["rendered_pages"] 帶回這些頁面，callback 不需瀏覽器即可解析
+class ReplayMiddleware:
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.mode = settings.get("REPLAY_MODE")
+        self.folder = settings.get("REPLAY_DIR")
+        self.latency = settings.getfloat("REPLAY_LATENCY")
+        self.jitter = settings.getfloat("REPLAY_LATENCY_JITTER")
+        self.error_rate = settings.getfloat("REPLAY_ERROR_RATE")
+        self.error_status = settings.getint("REPLAY_ERROR_STATUS")
+        self.timeout_rate = settings.getfloat("REPLAY_TIMEOUT_RATE")
+        self.seed = settings.get("REPLAY_SEED")
+        self.archive = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mode = crawler.settings.get("REPLAY_MODE")
+        if not mode:
+            raise NotConfigured
+        if mode not in ("record", "replay"):
+            raise ValueError(f"❌ 不支援的 REPLAY_MODE：{mode}")
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        path = archive_path(self.folder, spider.name)
+        if self.mode == "record":
+            self.archive = ArchiveWriter(path, spider.name)
+            spider.logger.info(f"📼 錄製模式：回應將存到 {path}")
+            return
+
+        if not os.path.exists(path):
+            spider.logger.error(f"❌ 找不到重播封存檔：{path}")
+            return
+        self.archive = ArchiveReader(path)
+        spider.logger.info(f"📼 重播模式：{path}（{len(self.archive)} 個回應，錄於 {self.archive.recorded_at}）")
+
+    def spider_closed(self, spider):
+        if self.archive is None:
+            return
+        if self.mode == "record":
+            size = self.archive.close()
+            spider.logger.info(f"📼 已錄製 {self.archive.count} 個回應（{size / 1024:.0f} KB）")
+        else:
+            self.archive.close()
+
+    def process_request(self, request, spider):
+        if self.mode == "record":
+            if self.archive is not None:
+                key = self.crawler.request_fingerprinter.fingerprint(request).hex()
+                request.meta["record_rendered"] = partial(self.archive.add_rendered, key)
+            return None
+        stats = self.crawler.stats
+        if self.archive is None:
+            raise IgnoreRequest(f"replay archive missing: {request.url}")
+
+        key = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        rendered = self.archive.rendered(key)
+        if rendered is not None:
+            request.meta["rendered_pages"] = rendered
+        entry, attempt = self.archive.next(key)
+        if entry is None:
+            stats.inc_value("replay/misses", spider=spider)
+            raise IgnoreRequest(f"not in replay archive: {request.url}")
+
+        # 以（指紋, 第幾次請求）決定延遲與錯誤，結果與請求的排程順序無關
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        delay = max(self.latency * (1 + rng.uniform(-self.jitter, self.jitter)), 0)
+        request.meta["download_latency"] = delay # 供 AdaptiveThrottle 調整延遲
+        roll = rng.random()
+        if roll < self.timeout_rate:
+            stats.inc_value("replay/injected_timeouts", spider=spider)
+            return self._later(delay, self._timeout, request)
+        if roll < self.timeout_rate + self.error_rate:
+            stats.inc_value("replay/injected_errors", spider=spider)
+            response = Response(request.url, status=self.error_status, request=request, flags=["replay"])
+        else:
+            stats.inc_value("replay/hits", spider=spider)
+            response = self.archive.response(entry, request)
+        return self._later(delay, lambda: response)
+
+    def process_response(self, request, response, spider):
+        if self.mode == "record" and self.archive is not None and "replay" not in response.flags:
+            self.archive.add(self.crawler.request_fingerprinter.fingerprint(request).hex(), response)
+            self.crawler.stats.inc_value("replay/recorded", spider=spider)
+        return response
+
+    @staticmethod
+    def _later(delay, fn, *args):
+        if not delay:
+            return fn(*args)
+        from twisted.internet import reactor, task
+        return task.deferLater(reactor, delay, fn, *args)
+
+    @staticmethod
+    def _timeout(request):
+        raise TimeoutError(string=f"injected timeout: {request.url}")
+
+
+# 效能分析：包住每個 callback，記錄 wall/CPU 時間、產出的 item 與 request 數、回應大小與 selector 耗時；
+# 爬蟲結束時依總耗時排序輸出熱點報表 {DATA_DIR}/{spider}_profile.json，
+# 開啟 PROFILING_SAMPLER 時另輸出 flamegraph 用的 {spider}_stacks.folded
+class ProfilingSpiderMiddleware:
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.folder = crawler.settings.get("DATA_DIR", "data")
+        self.use_sampler = crawler.settings.getbool("PROFILING_SAMPLER")
+        self.callbacks = {}
+        self.pending = {} # id(response) → (callback 名稱, 統計)
+        self.spider_name = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("PROFILING_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler)
+        profiler.sampler.interval = crawler.settings.getfloat("PROFILING_SAMPLE_INTERVAL")
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        self.spider_name = spider.name
+        profiler.install_selector_timer()
+        if self.use_sampler and not profiler.sampler.available():
+            spider.logger.warning("⚠️ 此平台不支援 setitimer，停用取樣 profiler")
+            self.use_sampler = False
+        if self.use_sampler:
+            profiler.sampler.start()
+
+    def _stats(self, name):
+        stats = self.callbacks.get(name)
+        if stats is None:
+            stats = self.callbacks[name] = {
+                "calls": 0, "wall_time": 0.0, "cpu_time": 0.0, "selector_time": 0.0,
+                "items": 0, "requests": 0, "response_bytes": 0,
+            }
+        return stats
+
+    # 把 callback 換成計時版本：Scrapy 在 input 與 output 之間還會處理其他工作，兩者的時間差不準
+    def process_spider_input(self, response, spider):
+        request = response.request
+        callback = request.callback or spider._parse
+        name = getattr(request.callback, "__name__", "parse")
+        stats = self._stats(name)
+        stats["calls"] += 1
+        stats["response_bytes"] += len(response.body)
+        self.pending[id(response)] = (name, stats)
+        request.callback = self._timed(callback, spider.name, name, stats)
+        return None
+
+    def _timed(self, callback, spider_name, name, stats):
+        def timed_callback(response, **kwargs):
+            with self._measure(spider_name, name, stats):
+                return callback(response, **kwargs)
+        return timed_callback
+
+    @contextmanager
+    def _measure(self, spider_name, name, stats):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        profiler.active = (spider_name, name, stats)
+        try:
+            yield
+        finally:
+            profiler.active = None
+            stats["wall_time"] += time.perf_counter() - wall_start
+            stats["cpu_time"] += time.process_time() - cpu_start
+
+    def process_spider_output(self, response, result, spider):
+        name, stats = self.pending.pop(id(response), (None, None))
+        if stats is None:
+            yield from result
+            return
+
+        # generator callback 的本體在這裡才執行：只計 next() 本身，不含下游 middleware / pipeline
+        iterator = iter(result)
+        while True:
+            with self._measure(spider.name, name, stats):
+                try:
+                    obj = next(iterator)
+                except StopIteration:
+                    break
+            if isinstance(obj, Request):
+                stats["requests"] += 1
+            else:
+                stats["items"] += 1
+            yield obj
+
+    def process_spider_exception(self, response, exception, spider):
+        self.pending.pop(id(response), None)
+        return None
+
+    def spider_closed(self, spider, reason):
+        profiler.uninstall_selector_timer()
+        if self.use_sampler:
+            profiler.sampler.stop()
+
+        report = self.build_report()
+        os.makedirs(self.folder, exist_ok=True)
+        if self.use_sampler:
+            folded_path = os.path.join(self.folder, f"{spider.name}_stacks.folded")
+            samples = profiler.sampler.write_folded(folded_path, spider.name)
+            report["sampler"] = {"interval": profiler.sampler.interval, "samples": samples, "path": folded_path}
+
+        with open(os.path.join(self.folder, f"{spider.name}_profile.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+        spider.logger.info(f"🔥 {spider.name} callback 熱點（依總耗時排序）：")
+        for row in report["callbacks"]:
+            spider.logger.info(
+                f"  {row['callback']:<20} {row['share']:5.1f}%  呼叫 {row['calls']:>5}  "
+                f"wall {row['wall_time']:7.2f}s  cpu {row['cpu_time']:7.2f}s  selector {row['selector_time']:6.2f}s  "
+                f"每次 {row['wall_per_call'] * 1000:7.1f}ms  items {row['items']:>6}  requests {row['requests']:>5}"
+            )
+
+    def build_report(self):
+        total = sum(stats["wall_time"] for stats in self.callbacks.values()) or 1.0
+        rows = []
+        for name, stats in self.callbacks.items():
+            rows.append({
+                "callback": name,
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()},
+                "wall_per_call": round(stats["wall_time"] / max(stats["calls"], 1), 4),
+                "share": round(stats["wall_time"] / total * 100, 1),
+            })
+        rows.sort(key=lambda r: -r["wall_time"])
+        return {"spider": self.spider_name, "callbacks": rows}
@@ -1,12 +1,26 @@
 # 多個 pipeline 分層架構，並在 settings.py 設定處理優先順序。
 from datetime import datetime
-import os, re, json, logging, unicodedata
+import os, re, json, logging
+from .items import ShowtimeRecord
 from .utils.cinema_info import cinema_address_map
+from .utils.batch_upload import BatchUploader
+from .utils.text import clean_title
 from rapidfuzz import fuzz
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, threads
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
+# 輸出邊界：ShowtimeRecord 在這裡才轉回 dict
+def item_to_dict(item):
+    if isinstance(item, ShowtimeRecord):
+        return item.to_dict()
+    return ItemAdapter(item).asdict()
+
 class MoviescraperPipeline:
     def __init__(self):
         self.address_map = cinema_address_map
@@ -19,23 +33,31 @@ class MoviescraperPipeline:
             'sbc': '星橋國際影城'
         }
         self.title_pool = []
+        self.date_cache = {} # 多日擷取時大量重複的原始日期字串，只解析一次
+        self.shared_times = {} # ShowtimeRecord 共用的場次 tuple，只在這個爬蟲執行期間保留
 
     def process_item(self, item, spider):
+        return self.normalize(item, spider.name)
+
+    def close_spider(self, spider):
+        self.shared_times.clear()
+
+    def normalize(self, item, spider_name):
         address = self.match_city_address(item['影院'])
         item['地址'] = address
         item['city'] = address[:2]
-        item['cinema'] = self.spider_cinema_map.get(spider.name, '未知影城')
+        item['cinema'] = self.spider_cinema_map.get(spider_name, '未知影城')
         item['電影名稱'] = self.normalize_title(item.get('電影名稱', ''))
-        item['日期'] = self.format_date(item.get('日期', ''), spider.name)
+        item['日期'] = self.cached_format_date(item.get('日期', ''), spider_name)
         item["時刻表"] = [t.strip() for t in item["時刻表"]]
 
         # 國賓影城_放映版本格式
-        if spider.name == 'amba':
+        if spider_name == 'amba':
             version = item.get('放映版本', '')
             match = re.search(r'[（(](.+?)[）)]', version)
             item['放映版本'] = match.group(1) or match.group(2) if match else version
 
-        return item
+        return ShowtimeRecord.from_item(item, self.shared_times)
 
     def match_city_address(self, cinema_name):
         for key in self.address_map:
@@ -45,10 +67,7 @@ class MoviescraperPipeline:
         return '未知地址'
 
     def normalize_title(self, title):
-        # 將全形轉半形（含標點）
-        title = unicodedata.normalize('NFKC', title)   # 全形轉半形
-        title = re.sub(r'[「」『』“”‘’:：_．・.]', ' ', title)     # 移除中英文符號
-        title = re.sub(r'\s+', ' ', title).strip()     # 合併空格並去除首尾空白
+        title = clean_title(title)
 
         # 模糊比對
         for known in self.title_pool:
@@ -69,6 +88,11 @@ class MoviescraperPipeline:
         logging.warning(f"⚠️ 未比對成功，新增標題：'{title}'")
         return title
 
+    def cached_format_date(self, raw_date, spider_name='unknown'):
+        if raw_date not in self.date_cache:
+            self.date_cache[raw_date] = self.format_date(raw_date, spider_name)
+        return self.date_cache[raw_date]
+
     def format_date(self, raw_date, spider_name='unknown'):
         date_str = raw_date.strip()
         today = datetime.today().date()
@@ -106,19 +130,175 @@ class MoviescraperPipeline:
         logger.warning(f"[{spider_name}] 無法解析日期格式: '{date_str}'")
         return raw_date  # 如果無法解析，就原樣返回
 
-# 存檔: data/*_formated.json
+# 批次模式（opt-in）：item 先暫存，滿 PIPELINE_BATCH_SIZE 筆或等待 PIPELINE_BATCH_TIMEOUT 秒後
+# 整批交給背景執行緒正規化，reactor 執行緒不再被 NFKC/regex/模糊比對卡住；
+# 只用一個執行緒：模糊比對依序累積 title_pool，多執行緒也只會排隊等同一把鎖，
+# 各批依送出順序處理、交付，輸出檔的 item 順序與逐筆模式相同
+class BatchedMoviescraperPipeline(MoviescraperPipeline):
+    def __init__(self, batch_size=100, timeout=0.5):
+        super().__init__()
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.buffer = []
+        self.flush_call = None
+        self.pool = None
+        self.tail = defer.succeed(None)
+
+    # 同一個 response 最多 CONCURRENT_ITEMS 筆 item 同時在 pipeline 中，
+    # 批次比這個大就永遠湊不滿，只能等逾時
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            batch_size=min(settings.getint("PIPELINE_BATCH_SIZE", 100), settings.getint("CONCURRENT_ITEMS")),
+            timeout=settings.getfloat("PIPELINE_BATCH_TIMEOUT", 0.5),
+        )
+
+    def open_spider(self, spider):
+        self.pool = ThreadPool(minthreads=1, maxthreads=1, name=f"pipeline-{spider.name}")
+        self.pool.start()
+
+    def close_spider(self, spider):
+        self.flush(spider)
+        d = self.tail
+        d.addBoth(lambda _: self.pool.stop())
+        d.addBoth(lambda _: MoviescraperPipeline.close_spider(self, spider))
+        return d
+
+    def process_item(self, item, spider):
+        from twisted.internet import reactor
+
+        d = defer.Deferred()
+        self.buffer.append((item, d))
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
+        elif self.flush_call is None:
+            self.flush_call = reactor.callLater(self.timeout, self.flush, spider)
+        return d
+
+    def flush(self, spider):
+        from twisted.internet import reactor
+
+        if self.flush_call is not None and self.flush_call.active():
+            self.flush_call.cancel()
+        self.flush_call = None
+        if not self.buffer:
+            return
+
+        batch, self.buffer = self.buffer, []
+        work = threads.deferToThreadPool(reactor, self.pool, self.normalize_batch, [item for item, _ in batch], spider.name)
+
+        # 等前一批交付完才交付這一批；直接串在 tail 後面，deliver 回傳 None，
+        # 交付完的批次結果與前一個 tail 都不再被引用，長時間爬取時記憶體不會累積
+        self.tail = self.tail.addCallback(lambda _: work).addBoth(lambda results: self.deliver(batch, results))
+
+    def normalize_batch(self, items, spider_name):
+        results = []
+        for item in items:
+            try:
+                results.append(self.normalize(item, spider_name))
+            except Exception:
+                results.append(Failure())
+        return results
+
+    @staticmethod
+    def deliver(batch, results):
+        if isinstance(results, Failure):
+            for _, d in batch:
+                d.errback(results)
+            return None
+
+        for (_, d), result in zip(batch, results):
+            if isinstance(result, Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+        return None
+
+# 串流上傳：爬取進行中就把正規化後的 item 分批送到 FastAPI（或本機暫存），
+# 最多 STREAM_MAX_IN_FLIGHT 批同時傳送，超過時暫停交付 item，讓 Scrapy 的 item 佇列形成背壓
+class ApiStreamPipeline:
+    def __init__(self, target, session_id, batch_size=500, max_in_flight=2, retries=5):
+        self.uploader = BatchUploader(target, session_id, retries=retries, pool_size=max_in_flight)
+        self.batch_size = batch_size
+        self.slots = defer.DeferredSemaphore(max_in_flight)
+        self.buffer = []
+        self.seq = 0
+        self.pending = set()
+        self.failed = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("STREAM_ENABLED"):
+            raise NotConfigured
+        return cls(
+            target=settings.get("STREAM_TARGET"),
+            session_id=settings.get("STREAM_SESSION"),
+            batch_size=settings.getint("STREAM_BATCH_SIZE", 500),
+            max_in_flight=settings.getint("STREAM_MAX_IN_FLIGHT", 2),
+            retries=settings.getint("STREAM_RETRIES", 5),
+        )
+
+    def process_item(self, item, spider):
+        self.buffer.append(item_to_dict(item))
+        if len(self.buffer) < self.batch_size:
+            return item
+
+        d = self.send_buffer(spider)
+        d.addCallback(lambda _: item)
+        return d
+
+    # 取得傳送名額後即返回（不等上傳完成）
+    def send_buffer(self, spider):
+        batch, self.buffer = self.buffer, []
+        seq, self.seq = self.seq, self.seq + 1
+
+        def start(_):
+            upload = threads.deferToThread(self.uploader.send, spider.name, seq, batch)
+            upload.addErrback(self.upload_failed, spider, seq)
+            upload.addBoth(lambda _: self.slots.release())
+            self.pending.add(upload)
+            upload.addBoth(lambda _: self.pending.discard(upload))
+
+        return self.slots.acquire().addCallback(start)
+
+    def upload_failed(self, failure, spider, seq):
+        self.failed += 1
+        spider.logger.error(f"❌ 串流批次 {spider.name}:{seq} 上傳失敗：{failure.getErrorMessage()}")
+
+    def close_spider(self, spider):
+        d = self.send_buffer(spider) if self.buffer else defer.succeed(None)
+        d.addCallback(lambda _: defer.DeferredList(list(self.pending)))
+        d.addCallback(lambda _: self.finish(spider))
+        return d
+
+    def finish(self, spider):
+        self.uploader.close()
+        spider.logger.info(f"📤 串流上傳完成：{self.seq} 批，失敗 {self.failed} 批")
+        spider.crawler.stats.set_value("stream/batches", self.seq, spider=spider)
+        spider.crawler.stats.set_value("stream/failed_batches", self.failed, spider=spider)
+
+# 存檔: {DATA_DIR}/*_formated.json（JSON_EXPORT_ENABLED = False 時停用）
 class JsonExportPipeline:
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("JSON_EXPORT_ENABLED", True):
+            raise NotConfigured
+        return cls()
+
     def open_spider(self, spider):
         self.items = []
+        self.folder = spider.settings.get("DATA_DIR", "data")
 
     def close_spider(self, spider):
-        os.makedirs("data", exist_ok=True)
-        with open(f"data/{spider.name}_formated.json", "w", encoding="utf-8") as f:
-            json.dump(self.items, f, indent=4, ensure_ascii=False)
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, f"{spider.name}_formated.json"), "w", encoding="utf-8") as f:
+            json.dump([item_to_dict(item) for item in self.items], f, indent=4, ensure_ascii=False)
             print(f"{spider.name}_formated.json saved")
 
     def process_item(self, item, spider):
-        self.items.append(dict(item))
+        self.items.append(item) # ShowtimeRecord 是 frozen dataclass，不需複製
         return item
 
 
@@ -48,34 +48,97 @@ TELNETCONSOLE_ENABLED = False
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    "moviescraper.middlewares.MoviescraperSpiderMiddleware": 543,
-#}
+SPIDER_MIDDLEWARES = {
+    # "moviescraper.middlewares.MoviescraperSpiderMiddleware": 543,
+    "moviescraper.middlewares.IncrementalSpiderMiddleware": 550,
+    # 最靠近爬蟲，量到的才是 callback 本身的耗時
+    "moviescraper.middlewares.ProfilingSpiderMiddleware": 950,
+}
+
+# 增量爬取（預設關閉，auto_updater --incremental 開啟）
+INCREMENTAL_ENABLED = False
+INCREMENTAL_TTL = 21600 # 指紋有效 6hr，逾時仍會重新請求
+INCREMENTAL_DIR = ".crawl_state" # 不放在 data/，避免每次執行被清除
+
+# callback 效能分析（預設關閉，auto_updater --profile 開啟）
+PROFILING_ENABLED = False
+PROFILING_SAMPLER = False # 取樣呼叫堆疊，輸出 {spider}_stacks.folded（僅 Unix）
+PROFILING_SAMPLE_INTERVAL = 0.005 # 秒（CPU 時間）
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
     # "moviescraper.middlewares.MoviescraperDownloaderMiddleware": 543,
     "moviescraper.middlewares.HeaderMiddleware": 543,
+    # 高於 RetryMiddleware(550)，才能看到每一次重試前的失敗回應
+    "moviescraper.middlewares.CircuitBreakerMiddleware": 590,
+    # 低於 SeleniumMiddleware(800)：重播時不啟動瀏覽器；高於 Retry/斷路器：注入的錯誤會經過它們
+    "moviescraper.middlewares.ReplayMiddleware": 700,
 }
 
+# 斷路器：同一網域連續失敗次數達門檻即停止該爬蟲，改用上次成功的資料
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_BREAKER_THRESHOLD = 5
+
+# 錄製 / 重播（預設關閉，spider_executor --record / --replay 開啟）
+# REPLAY_MODE: "record" 存下每個回應、"replay" 不連網直接回放 {REPLAY_DIR}/{spider}.zip
+REPLAY_MODE = None
+REPLAY_DIR = "recordings"
+REPLAY_LATENCY = 0.0 # 重播時每個回應的延遲（秒）
+REPLAY_LATENCY_JITTER = 0.5 # 延遲上下浮動比例
+REPLAY_ERROR_RATE = 0.0 # 回傳 REPLAY_ERROR_STATUS 的比例
+REPLAY_ERROR_STATUS = 503
+REPLAY_TIMEOUT_RATE = 0.0 # 模擬連線逾時的比例
+REPLAY_SEED = 0
+
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    # "scrapy.extensions.telnet.TelnetConsole": None,
+    "moviescraper.extensions.AdaptiveThrottle": 500,
+    "moviescraper.extensions.RunReport": 900,
+}
+
+# 每個爬蟲的執行報告 {DATA_DIR}/{spider}_report.json（SpiderExecutor 彙整為 run_report.json）
+RUN_REPORT_ENABLED = True
+
+# 各爬蟲的禮貌設定（未列出的欄位沿用 DOWNLOAD_DELAY / CONCURRENT_REQUESTS_PER_DOMAIN）
+# delay: 最小延遲、concurrency: 初始併發、max_concurrency: 併發上限、
+# target_concurrency: 延遲收斂目標（latency / target）、healthy_latency: 視為健康的平均延遲
+ADAPTIVE_THROTTLE_ENABLED = True
+POLITENESS_PROFILES = {
+    "vs": {"delay": 1, "concurrency": 2, "max_concurrency": 6, "target_concurrency": 2.0},
+    "amba": {"delay": 1, "concurrency": 2, "max_concurrency": 6, "target_concurrency": 2.0},
+    "venice": {"delay": 5, "concurrency": 1, "max_concurrency": 1, "target_concurrency": 0.5}, # 常回 522
+    "sbc": {"delay": 3, "concurrency": 1, "max_concurrency": 2, "target_concurrency": 1.0},
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
    "moviescraper.pipelines.MoviescraperPipeline": 300,
+   # 批次模式：改用下行取代 MoviescraperPipeline，正規化移到執行緒池
+   # "moviescraper.pipelines.BatchedMoviescraperPipeline": 300,
    "moviescraper.pipelines.JsonExportPipeline": 500,
+   "moviescraper.pipelines.ApiStreamPipeline": 600,
 }
+JSON_EXPORT_ENABLED = True
+PIPELINE_BATCH_SIZE = 100 # 不超過 CONCURRENT_ITEMS（預設 100）
+PIPELINE_BATCH_TIMEOUT = 0.5 # 未滿一批時最多等待秒數
+
+# 串流上傳（預設關閉，auto_updater --stream 開啟）
+# STREAM_TARGET: FastAPI 網址，或本機暫存目錄；STREAM_SESSION: 本次執行 id
+STREAM_ENABLED = False
+STREAM_TARGET = None
+STREAM_SESSION = None
+STREAM_BATCH_SIZE = 500
+STREAM_MAX_IN_FLIGHT = 2 # 同時傳送的批次上限（背壓）
+STREAM_RETRIES = 5
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = False # 改用 AdaptiveThrottle；AUTOTHROTTLE_MAX_DELAY 仍作為延遲上限
 # The initial download delay
 AUTOTHROTTLE_START_DELAY = 10
 # The maximum download delay to be set in case of high latencies
@@ -89,10 +152,14 @@ AUTOTHROTTLE_TARGET_CONCURRENCY = 0.5
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
 HTTPCACHE_ENABLED = True
-HTTPCACHE_EXPIRATION_SECS = 10800 # 目前緩存3hr:10800;一天 86400
+HTTPCACHE_EXPIRATION_SECS = 0 # 不做固定時間過期，改由 RevalidatingPolicy 判斷
 #HTTPCACHE_DIR = "httpcache"
 #HTTPCACHE_IGNORE_HTTP_CODES = []
-HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_STORAGE = "moviescraper.httpcache.SqliteCacheStorage"
+HTTPCACHE_POLICY = "moviescraper.httpcache.RevalidatingPolicy"
+HTTPCACHE_ALWAYS_STORE = True # 沒有快取標頭的頁面也存，過期後重新請求
+HTTPCACHE_REVALIDATE_AFTER = 600 # 10 分鐘內直接使用快取，之後以 ETag/Last-Modified 重新驗證
+HTTPCACHE_SQLITE_MAX_BYTES = 200 * 1024 * 1024 # 快取總大小上限，超過依 LRU 移除
 
 # Set settings whose default value is deprecated to a future-proof value
 # FEED_EXPORT_ENCODING = "utf-8"
@@ -105,6 +172,9 @@ HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 #     },
 # }
 
+# 輸出目錄（auto_updater 會指定為 runs/<run_id>）
+DATA_DIR = "data"
+
 #爬蟲執行日誌
 LOG_LEVEL = 'INFO' #可改為 'DEBUG', 'WARNING', 'ERROR'等。
 LOG_FILE = '%(name)s.log'
\ No newline at end of file
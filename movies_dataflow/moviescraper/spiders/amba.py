@@ -1,5 +1,6 @@
 import scrapy
 from moviescraper.items import MovieItem
+from moviescraper.utils.incremental import fingerprint
 
 class AmbassadorSpider(scrapy.Spider):
     name = 'amba'
@@ -16,7 +17,7 @@ class AmbassadorSpider(scrapy.Spider):
             relative_url = movie.css('a.poster::attr(href)').get()
 
             if relative_url:
-                yield response.follow(relative_url, self.movieTimes_parse)
+                yield response.follow(relative_url, self.movieTimes_parse, meta={'listing_fp': fingerprint(movie.get())})
             else:
                 self.logger.warning('未找到國賓影城的 relative_url，請檢查選擇器')
 
@@ -1,8 +1,9 @@
 import scrapy, time
 from moviescraper.items import MovieItem
+from moviescraper.utils.selenium_driver import use_chrome_driver, record_rendered, rendered_pages
+from moviescraper.utils.incremental import fingerprint
 from datetime import datetime
 from scrapy_selenium4 import SeleniumRequest
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
@@ -12,15 +13,17 @@ class sbcSpider(scrapy.Spider):
     name = "sbc"
     allowed_domains = ["sbcmovies.com.tw"]
     url = "https://www.sbcmovies.com.tw/browsing/Movies/NowShowing"
+    days = 1 # 擷取天數（spider 參數 -a days=N）
     custom_settings = {
-        "DOWNLOADER_MIDDLEWARES": {
-            "scrapy_selenium4.SeleniumMiddleware": 800,
-        },
         "SELENIUM_DRIVER_NAME": "chrome",
-        "SELENIUM_DRIVER_EXECUTABLE_PATH": ChromeDriverManager().install(),
         "SELENIUM_DRIVER_ARGUMENTS": ["--headless", "--disable-gpu", "--no-sandbox"]
     }
 
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        use_chrome_driver(settings)
+
     def start_requests(self):
         self.logger.info("🚀 發送 SeleniumRequest 至星橋票務頁面")
         yield SeleniumRequest(
@@ -32,7 +35,10 @@ class sbcSpider(scrapy.Spider):
     def parse(self, response):
         driver = response.meta.get("driver")
         if not driver:
-            self.logger.error("❌ Selenium driver not found in response.meta")
+            # 重播：錄製時切換語言後的頁面與 cookie
+            for page in rendered_pages(self, response):
+                listing = HtmlResponse(url=page["url"], body=page["html"], encoding="utf-8")
+                yield from self.follow_movies(listing, page["data"]["cookies"])
             return
 
         try:
@@ -54,14 +60,22 @@ class sbcSpider(scrapy.Spider):
         cookies = {c['name']: c['value'] for c in driver.get_cookies()}
         self.logger.debug(f"🍪 擷取 cookie：{cookies}")
 
-        body = driver.page_source
-        response = HtmlResponse(url=driver.current_url, body=body, encoding="utf-8")
+        body = record_rendered(response, driver, cookies=cookies)
+        listing = HtmlResponse(url=driver.current_url, body=body, encoding="utf-8")
+        yield from self.follow_movies(listing, cookies)
+
+    def follow_movies(self, response, cookies):
         movies = response.css("#movies-list .list-item")
 
         for movie in movies:
             relative_url = movie.css("div.main-action a::attr(href)").get()
             if relative_url:
-                    yield response.follow(relative_url, self.movieInfo_parse, cookies=cookies)
+                    yield response.follow(
+                        relative_url,
+                        self.movieInfo_parse,
+                        cookies=cookies,
+                        meta={'listing_fp': fingerprint(movie.get())}
+                    )
             else:
                 self.logger.warning('未找到星橋影城的 relative_url，請檢查選擇器')
 
@@ -78,29 +92,26 @@ class sbcSpider(scrapy.Spider):
         title_split = self.parse_title_by_suffix(raw_title)
 
         date_blocks = movie_info.css("div.film-showtimes .session")
-        if not date_blocks:
-            return
-        
-        # for date_block in date_blocks[0]:
-        date_block = date_blocks[0]
-        raw_datetimes = date_block.css("div.session-times time::attr(datetime)").getall()
-        date_str = ""
-        time_list = []
-
-        for raw_dt in raw_datetimes:
-            dt_obj = datetime.strptime(raw_dt, "%Y-%m-%dT%H:%M:%S")
-            date_str = dt_obj.strftime("%Y-%m-%d")
-            time_list.append(dt_obj.strftime("%H:%M"))
-
-        item = MovieItem()
-        item['影院'] = '星橋國際影城'
-        item['網址'] = self.url
-        item['電影名稱'] = title_split["電影名稱"]
-        item['放映版本'] = title_split["放映版本"]
-        item['日期'] = date_str if date_str else "未知日期"
-        item['時刻表'] = time_list
-
-        yield item
+
+        for date_block in date_blocks[:int(self.days)]:
+            raw_datetimes = date_block.css("div.session-times time::attr(datetime)").getall()
+            date_str = ""
+            time_list = []
+
+            for raw_dt in raw_datetimes:
+                dt_obj = datetime.strptime(raw_dt, "%Y-%m-%dT%H:%M:%S")
+                date_str = dt_obj.strftime("%Y-%m-%d")
+                time_list.append(dt_obj.strftime("%H:%M"))
+
+            item = MovieItem()
+            item['影院'] = '星橋國際影城'
+            item['網址'] = self.url
+            item['電影名稱'] = title_split["電影名稱"]
+            item['放映版本'] = title_split["放映版本"]
+            item['日期'] = date_str if date_str else "未知日期"
+            item['時刻表'] = time_list
+
+            yield item
 
     @staticmethod
     def parse_title_by_suffix(raw_title):
@@ -1,24 +1,26 @@
 import scrapy
 from scrapy_selenium4 import SeleniumRequest
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from scrapy.http import HtmlResponse
 from collections import defaultdict
 from moviescraper.items import MovieItem
+from moviescraper.utils.selenium_driver import use_chrome_driver, record_rendered, rendered_pages
 
 class ShowTimeSpider(scrapy.Spider):
     name = "showtimes"
     custom_settings = {
-        "DOWNLOADER_MIDDLEWARES": {
-            "scrapy_selenium4.SeleniumMiddleware": 800,
-        },
         "SELENIUM_DRIVER_NAME": "chrome",
-        "SELENIUM_DRIVER_EXECUTABLE_PATH": ChromeDriverManager().install(),
         "SELENIUM_DRIVER_ARGUMENTS": ["--headless", "--disable-gpu", "--no-sandbox"]
     }
     allowed_domains = ["showtimes.com.tw"]
+    days = 1 # 擷取天數（spider 參數 -a days=N）
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        use_chrome_driver(settings)
 
     def start_requests(self):
         self.logger.info("🚀 發送 SeleniumRequest 至秀泰票務頁面")
@@ -31,7 +33,14 @@ class ShowTimeSpider(scrapy.Spider):
     def parse(self, response):
         driver = response.meta.get("driver")
         if not driver:
-            self.logger.error("❌ Selenium driver not found in response.meta")
+            # 重播：錄製時每個影城、每一天點擊後的頁面
+            for page in rendered_pages(self, response):
+                theater_name = page["data"]["theater"]
+                try:
+                    page_response = HtmlResponse(url=page["url"], body=page["html"], encoding='utf-8')
+                    yield from self.date_page_items(response, theater_name, page_response)
+                except Exception as e:
+                    print(f"⚠️ 無法解析影城 {theater_name} 的頁面：{e}")
             return
 
         try:
@@ -65,9 +74,9 @@ class ShowTimeSpider(scrapy.Spider):
                 WebDriverWait(driver, 10).until(
                     EC.visibility_of_element_located((By.XPATH, '//span[contains(text(), "月")]'))
                 )
-                date_blocks = driver.find_elements(By.CSS_SELECTOR, 'div.sc-krNlru')[:1]
+                date_blocks = driver.find_elements(By.CSS_SELECTOR, 'div.sc-krNlru')
 
-                for d in range(min(1, len(date_blocks))):
+                for d in range(min(int(self.days), len(date_blocks))):
                     date_blocks = driver.find_elements(By.CSS_SELECTOR, 'div.sc-krNlru')
                     date_block = date_blocks[d]
 
@@ -78,33 +87,37 @@ class ShowTimeSpider(scrapy.Spider):
                         EC.presence_of_element_located((By.CLASS_NAME, "sc-EgOXT"))
                     )
 
-                    html = driver.page_source
+                    html = record_rendered(response, driver, theater=theater_name)
                     scrapy_response = HtmlResponse(url=driver.current_url, body=html, encoding='utf-8')
-                    date_texts = scrapy_response.css('div.izhUUl span::text').getall()
-                    date_formatted = (f'{date_texts[0]}({date_texts[1]})')
-                    movie_blocks = scrapy_response.xpath('//div[div[@class="sc-EgOXT iZnlsW"]]')
-
-                    for movie in movie_blocks:
-                        movie_name = movie.css('div.dZNNPl::text').get(default='').strip()
-                        has_time_blocks = movie.xpath('.//div[contains(text(), "廳")]')
-
-                        if has_time_blocks:
-                            showtime_groups = extract_showtime_info(movie)
-
-                            for group in showtime_groups:
-                                item = MovieItem()
-                                item['影院'] = theater_name
-                                item['網址'] = f'{response.url}'
-                                item['電影名稱'] = movie_name
-                                item['放映版本'] = group['放映版本']
-                                item['日期'] = date_formatted
-                                item['時刻表'] = group['時刻表']
-
-                                yield item
+                    yield from self.date_page_items(response, theater_name, scrapy_response)
 
             except Exception as e:
                 print(f"⚠️ 無法點擊影城 {theater_name} 失敗：{e}")
 
+    # 某影城某一天的頁面（點擊後的 page_source）
+    def date_page_items(self, response, theater_name, scrapy_response):
+        date_texts = scrapy_response.css('div.izhUUl span::text').getall()
+        date_formatted = (f'{date_texts[0]}({date_texts[1]})')
+        movie_blocks = scrapy_response.xpath('//div[div[@class="sc-EgOXT iZnlsW"]]')
+
+        for movie in movie_blocks:
+            movie_name = movie.css('div.dZNNPl::text').get(default='').strip()
+            has_time_blocks = movie.xpath('.//div[contains(text(), "廳")]')
+
+            if has_time_blocks:
+                showtime_groups = extract_showtime_info(movie)
+
+                for group in showtime_groups:
+                    item = MovieItem()
+                    item['影院'] = theater_name
+                    item['網址'] = f'{response.url}'
+                    item['電影名稱'] = movie_name
+                    item['放映版本'] = group['放映版本']
+                    item['日期'] = date_formatted
+                    item['時刻表'] = group['時刻表']
+
+                    yield item
+
 def group_showtimes_by_version_data(version_showtime_pairs):
     grouped =  defaultdict(list)
 
@@ -1,24 +1,26 @@
 import scrapy
 from scrapy_selenium4 import SeleniumRequest
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from moviescraper.items import MovieItem
+from moviescraper.utils.selenium_driver import use_chrome_driver, record_rendered, rendered_pages
 
 class skSpider(scrapy.Spider):
     name = 'sk'
     custom_settings = {
-        'DOWNLOADER_MIDDLEWARES': {
-            'scrapy_selenium4.SeleniumMiddleware': 800,
-        },
         'SELENIUM_DRIVER_NAME': 'chrome',
-        'SELENIUM_DRIVER_EXECUTABLE_PATH': ChromeDriverManager().install(),
         'SELENIUM_DRIVER_ARGUMENTS': ["--headless", "--disable-gpu", "--no-sandbox"]
     }
     allowed_domains = ['skcinemas.com']
     start_urls = ['https://www.skcinemas.com/sessions?c=1001']
+    days = 1 # 擷取天數（spider 參數 -a days=N）
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        use_chrome_driver(settings)
 
     async def start(self):
         yield SeleniumRequest(
@@ -28,7 +30,13 @@ class skSpider(scrapy.Spider):
         )
 
     def parse(self, response):
-        driver = response.meta['driver']
+        driver = response.meta.get('driver')
+        if not driver:
+            # 重播：依序解析錄製時點擊各影城後的頁面
+            for page in rendered_pages(self, response):
+                yield from self.movie_data(scrapy.Selector(text=page['html']))
+            return
+
         WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.CSS_SELECTOR, 'div.route-items')))
 
         # 點擊影城
@@ -48,9 +56,8 @@ class skSpider(scrapy.Spider):
                 print(f'⚠️ 新光影城 {i} 載入時間過長，跳過')
                 continue
 
-            new_html = driver.page_source
-            response = scrapy.Selector(text=new_html)
-            yield from self.movie_data(response)
+            new_html = record_rendered(response, driver)
+            yield from self.movie_data(scrapy.Selector(text=new_html))
 
 
     def movie_data(self, response):
@@ -58,21 +65,20 @@ class skSpider(scrapy.Spider):
         movies = response.css('div.movie-sessions-view')
 
         for movie in movies:
+            movie_name = movie.css('.film-name::text').get()
             date_blocks = movie.css('.day-sessions')
-            if not date_blocks:
-                return
-            # for date_block in date_blocks[:3]:
-            date_block = date_blocks[0]
-            version = date_block.css('.film-type::text').get() or '版本未知'
-            date_text = date_block.css('.business-date::text').get()
-            showtimes = date_block.css('.session::text').getall()
 
-            item = MovieItem() # 使用 Item 儲存資料
-            item['影院'] = cinema_name
-            item['網址'] = self.start_urls[0]
-            item['電影名稱'] = movie.css('.film-name::text').get()
-            item['放映版本'] = version
-            item['日期'] = date_text.strip().replace(' ', '') or '日期未知'
-            item['時刻表'] = showtimes
+            for date_block in date_blocks[:int(self.days)]:
+                version = date_block.css('.film-type::text').get() or '版本未知'
+                date_text = date_block.css('.business-date::text').get() or ''
+                showtimes = date_block.css('.session::text').getall()
+
+                item = MovieItem() # 使用 Item 儲存資料
+                item['影院'] = cinema_name
+                item['網址'] = self.start_urls[0]
+                item['電影名稱'] = movie_name
+                item['放映版本'] = version
+                item['日期'] = date_text.strip().replace(' ', '') or '日期未知'
+                item['時刻表'] = showtimes
 
-            yield item
+                yield item
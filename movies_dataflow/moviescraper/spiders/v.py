@@ -8,6 +8,7 @@ class VeniceSpider(scrapy.Spider):
     name = 'vn'
     allowed_domains = ['venice-cinemas.com.tw']
     start_urls = ['https://www.venice-cinemas.com.tw/showtime.php']
+    days = 1 # 擷取天數（spider 參數 -a days=N）
 
     def parse(self, response):
         try:
@@ -37,7 +38,7 @@ class VeniceSpider(scrapy.Spider):
         version = match.group(2).strip() if match else '未知版本'
 
         date_blocks = response.css('.show-time')
-        for date_block in date_blocks[0]:
+        for date_block in date_blocks[:int(self.days)]:
             date_text = date_block.css('.showtime-date::text').get()
             showtimes = date_block.css('.showtime-item label::text').getall()
 
@@ -3,18 +3,20 @@ import scrapy
 import re
 from urllib.parse import urljoin
 from moviescraper.items import MovieItem
+from moviescraper.utils.incremental import fingerprint
 
 class VeniceSpider(scrapy.Spider):
     name = 'venice'
     allowed_domains = ['venice-cinemas.com.tw']
     start_urls = ['https://venice-cinemas.com.tw/movie.php']
+    days = 1 # 擷取天數（spider 參數 -a days=N）
 
     def parse(self, response):
         for movie in response.css('div.movie-list'):
             relative_url = movie.css('.read-more a::attr(href)').get()
 
             if relative_url:
-                yield response.follow(relative_url, self.movie_info_parse)
+                yield response.follow(relative_url, self.movie_info_parse, meta={'listing_fp': fingerprint(movie.get())})
             else:
                 self.logger.warning('未找到威尼斯影城的 relative_url，請檢查選擇器')
 
@@ -38,21 +40,20 @@ class VeniceSpider(scrapy.Spider):
         movie_name = match.group(1).strip() if match else raw_movie_name.strip()
         version = match.group(2).strip() if match else '未知版本'
 
+        cinema_name = response.css('title::text').get(default='未知影城').strip()
         date_blocks = response.css('.show-time')
-        if not date_blocks:
-            return
-        # for date_block in date_blocks[:3]:
-        date_block = date_blocks[0]
-        date_text = date_block.css('.showtime-date::text').get()
-        showtimes = date_block.css('.showtime-item label::text').getall()
-
-        # 使用 Item 儲存資料
-        item = MovieItem()
-        item['影院'] = response.css('title::text').get(default='未知影城').strip()
-        item['網址'] = self.start_urls[0]
-        item['電影名稱'] = movie_name
-        item['放映版本'] = version
-        item['日期'] = date_text.strip().replace(' ', '') if date_text else '未知日期'
-        item['時刻表'] = showtimes if showtimes else ['未知時間']
-
-        yield item
\ No newline at end of file
+
+        for date_block in date_blocks[:int(self.days)]:
+            date_text = date_block.css('.showtime-date::text').get()
+            showtimes = date_block.css('.showtime-item label::text').getall()
+
+            # 使用 Item 儲存資料
+            item = MovieItem()
+            item['影院'] = cinema_name
+            item['網址'] = self.start_urls[0]
+            item['電影名稱'] = movie_name
+            item['放映版本'] = version
+            item['日期'] = date_text.strip().replace(' ', '') if date_text else '未知日期'
+            item['時刻表'] = showtimes if showtimes else ['未知時間']
+
+            yield item
\ No newline at end of file
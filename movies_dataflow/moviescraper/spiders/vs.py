@@ -2,11 +2,13 @@ import scrapy
 from datetime import datetime
 from urllib.parse import urljoin
 from moviescraper.items import MovieItem
+from moviescraper.utils.incremental import fingerprint
 
 class vsSpider(scrapy.Spider):
     name = 'vs'
     allowed_domains = ['vscinemas.com.tw']
     start_urls = ['https://www.vscinemas.com.tw/film']
+    days = 1 # 擷取天數（spider 參數 -a days=N）
 
     def parse(self, response):
         movies = response.css('section.infoArea')
@@ -21,7 +23,8 @@ class vsSpider(scrapy.Spider):
             relative_url = movie.css('h2 a::attr(href)').get()
 
             if relative_url:
-                yield response.follow(relative_url, self.movie_info_parse)
+                # listing_fp：列表項目指紋，供增量模式判斷是否略過詳細頁
+                yield response.follow(relative_url, self.movie_info_parse, meta={'listing_fp': fingerprint(movie.get())})
 
             else:
                 self.logger.warning('未找到 vsCinemas_relative_url，請檢查選擇器')
@@ -36,8 +39,10 @@ class vsSpider(scrapy.Spider):
     def movie_info_parse(self, response):
 
         versionList = response.xpath('//ul[@class="versionList"]/li') #所有放映版本
+        movie_name = response.css('.titleArea h1::text').get()
 
         for version in versionList:
+            version_name = version.css('.versionFirst::text').get()
             theaters = version.css('ul li')
 
             for theater in theaters:
@@ -49,20 +54,17 @@ class vsSpider(scrapy.Spider):
                 else:
                     date_blocks = []
 
-                # for date_block in date_blocks[:3]:
-                if not date_blocks:
-                    return
-                date_block = date_blocks[0]
-                date_text = date_block.css('h4::text').get()
-                showtimes = date_block.css('.bookList li a::text').getall()
+                for date_block in date_blocks[:int(self.days)]:
+                    date_text = date_block.css('h4::text').get()
+                    showtimes = date_block.css('.bookList li a::text').getall()
 
-                # 使用 Item 儲存資料
-                item = MovieItem()
-                item['影院'] = theater_name
-                item['網址'] = self.start_urls[0]
-                item['電影名稱'] = response.css('.titleArea h1::text').get()
-                item['放映版本'] = version.css('.versionFirst::text').get()
-                item['日期'] = date_text.strip().replace(' ', '')
-                item['時刻表'] = showtimes
+                    # 使用 Item 儲存資料
+                    item = MovieItem()
+                    item['影院'] = theater_name
+                    item['網址'] = self.start_urls[0]
+                    item['電影名稱'] = movie_name
+                    item['放映版本'] = version_name
+                    item['日期'] = date_text.strip().replace(' ', '')
+                    item['時刻表'] = showtimes
 
-                yield item
\ No newline at end of file
+                    yield item
\ No newline at end of file
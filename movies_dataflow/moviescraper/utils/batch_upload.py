@@ -0,0 +1,174 @@
+# 分批上傳：每批以 (session, source, seq) 作為冪等鍵送到 FastAPI /upload/batch，
+# 或寫入本機暫存目錄；失敗時指數退避重試（at-least-once，伺服器端會略過重複的批次）
+import os, gzip, json, time, logging
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+class BatchUploader:
+    def __init__(self, target, session_id, retries=5, backoff=1.0, timeout=60, pool_size=4, compress=False):
+        self.target = target
+        self.session_id = session_id
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.compress = compress
+        self.bytes_sent = 0 # 實際送出的大小（gzip 後）
+        self.raw_bytes_sent = 0 # 壓縮前的大小
+        self.http = None
+
+        if not self.is_local:
+            self.http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.http.mount("http://", adapter)
+            self.http.mount("https://", adapter)
+
+    @property
+    def is_local(self):
+        return not self.target.startswith(("http://", "https://"))
+
+    @staticmethod
+    def batch_key(source, seq):
+        return f"{source}:{seq:06d}"
+
+    def send(self, source, seq, items, replace=False):
+        key = self.batch_key(source, seq)
+        if self.is_local:
+            return self._write_local(source, seq, items, replace)
+
+        url = f"{self.target.rstrip('/')}/upload/batch"
+        headers = {
+            "X-Upload-Session": self.session_id,
+            "Idempotency-Key": key,
+            "Content-Type": "application/json",
+        }
+        body = json.dumps(items, ensure_ascii=False).encode("utf-8")
+        raw_size = len(body)
+        if self.compress:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        params = {"replace": "true"} if replace else None
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                res = self.http.post(url, data=body, headers=headers, params=params, timeout=self.timeout)
+                if res.status_code < 500 and res.status_code != 429:
+                    res.raise_for_status()
+                    self.bytes_sent += len(body)
+                    self.raw_bytes_sent += raw_size
+                    return res.json()
+                logger.warning(f"⚠️ 批次 {key} 回應 {res.status_code}（第 {attempt} 次）")
+            except requests.exceptions.HTTPError:
+                raise
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"⚠️ 批次 {key} 傳送失敗（第 {attempt} 次）：{e}")
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        raise RuntimeError(f"批次 {key} 重試 {self.retries} 次仍失敗")
+
+    # 伺服器端各來源已暫存的筆數
+    def staged_counts(self):
+        if self.is_local:
+            folder = Path(self.target) / self.session_id
+            counts = {}
+            if not folder.exists():
+                return counts
+            for source_dir in (p for p in folder.iterdir() if p.is_dir()):
+                counts[source_dir.name] = sum(
+                    len(json.loads(path.read_text(encoding="utf-8"))) for path in source_dir.glob("*.json")
+                )
+            return counts
+
+        res = self.http.get(f"{self.target.rstrip('/')}/upload/batch/{self.session_id}", timeout=self.timeout)
+        res.raise_for_status()
+        return res.json().get("sources", {})
+
+    def commit(self):
+        if self.is_local:
+            return {"status": "staged", "path": str(Path(self.target) / self.session_id)}
+
+        res = self.http.post(
+            f"{self.target.rstrip('/')}/upload/commit",
+            json={"session": self.session_id},
+            timeout=self.timeout * 5,
+        )
+        res.raise_for_status()
+        result = res.json()
+        if result.get("status") != "success":
+            raise RuntimeError(f"提交未完成：{result}")
+        return result
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+
+    # 本機暫存：{target}/{session}/{source}/{seq}.json，以 os.replace 寫入確保每批完整
+    def _write_local(self, source, seq, items, replace):
+        folder = Path(self.target) / self.session_id / source
+        if replace and folder.exists():
+            for old in folder.glob("*.json"):
+                old.unlink()
+        folder.mkdir(parents=True, exist_ok=True)
+
+        path = folder / f"{seq:06d}.json"
+        if path.exists():
+            return {"status": "duplicate", "key": self.batch_key(source, seq)}
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return {"status": "accepted", "key": self.batch_key(source, seq), "count": len(items)}
+
+# 逐筆讀取 JSON 陣列檔（不一次載入整個檔案）
+# 以 idx 在 buffer 裡前進，只有補讀下一段時才丟掉已解析的部分（每筆都切 buffer 會讓每段變成 O(n²)）
+WHITESPACE = " \t\r\n"
+
+def iter_json_array(path, chunk_size=1 << 20):
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        while not buffer and (chunk := f.read(chunk_size)):
+            buffer = chunk.lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} 不是 JSON 陣列")
+        idx = 1
+        eof = False
+
+        while True:
+            while idx < len(buffer) and (buffer[idx] in WHITESPACE or buffer[idx] == ","):
+                idx += 1
+            if idx < len(buffer) and buffer[idx] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, idx)
+                # 剛好解析到 buffer 結尾時（例如數字被切在兩段之間）要先補讀才能確定
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                more = f.read(chunk_size)
+                eof = not more
+                buffer = buffer[idx:] + more
+                idx = 0
+                continue
+            yield item
+            idx = end
+
+# 依序列化後大小（未壓縮）與筆數切批
+def iter_batches(items, max_bytes=1 << 20, max_rows=5000):
+    batch, size = [], 0
+    for item in items:
+        item_size = len(json.dumps(item, ensure_ascii=False).encode("utf-8")) + 1
+        if batch and (size + item_size > max_bytes or len(batch) >= max_rows):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += item_size
+    if batch:
+        yield batch
@@ -1,3 +1,6 @@
+import json
+from pathlib import Path
+
 cinema_address_map = {
 
     # 新光影城
@@ -74,4 +77,10 @@ cinema_address_map = {
     "花蓮秀泰": "花蓮市國聯五路69號",
     "台東秀泰": "台東市新生路93號",
 
-}
\ No newline at end of file
+}
+# 各影城的大約座標（本機資料檔，不做線上地理編碼）；新增影城時一併補上
+COORDINATES_PATH = Path(__file__).with_name("cinema_coordinates.json")
+
+def load_cinema_coordinates(path=COORDINATES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,107 @@
+# 欄式快照格式（all_cleaned.columnar.json）：
+# 重複性高的字串欄位以字典編碼（dictionary + codes），時刻表為 list 欄位（offsets + codes），
+# 欄位名稱只出現一次；解碼後與 all_cleaned.json 的每一筆相同
+import json
+
+FORMAT_NAME = "movies-columnar"
+FORMAT_VERSION = 1
+STRING_FIELDS = ["city", "cinema", "影院", "地址", "網址", "電影名稱", "放映版本", "日期"]
+LIST_FIELD = "時刻表"
+ROW_ORDER = ["影院", "網址", "電影名稱", "放映版本", "日期", "時刻表", "地址", "city", "cinema"]
+
+class _Dictionary:
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+def encode_columns(items):
+    dictionaries = {field: _Dictionary() for field in STRING_FIELDS}
+    codes = {field: [] for field in STRING_FIELDS}
+    times_dictionary = _Dictionary()
+    times_offsets = [0]
+    times_codes = []
+    stale_rows = []
+
+    for row, item in enumerate(items):
+        for field in STRING_FIELDS:
+            codes[field].append(dictionaries[field].code(item.get(field, "")))
+        times_codes.extend(times_dictionary.code(t) for t in item.get(LIST_FIELD, []))
+        times_offsets.append(len(times_codes))
+        if item.get("stale"):
+            stale_rows.append(row)
+
+    columns = {
+        field: {"dictionary": dictionaries[field].values, "codes": codes[field]}
+        for field in STRING_FIELDS
+    }
+    columns[LIST_FIELD] = {
+        "dictionary": times_dictionary.values,
+        "offsets": times_offsets,
+        "codes": times_codes,
+    }
+    if stale_rows:
+        columns["stale"] = {"rows": stale_rows}
+
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "rows": len(times_offsets) - 1,
+        "columns": columns,
+    }
+
+# 負數 code 在 Python 會從尾端取值：不檢查的話，被竄改的快照會解碼成錯誤的資料而不是報錯
+def _check_codes(name, codes, size):
+    if codes and (min(codes) < 0 or max(codes) >= size):
+        raise ValueError(f"{name} 的 code 超出字典範圍 [0, {size})")
+
+def decode_columns(snapshot):
+    if snapshot.get("format") != FORMAT_NAME or snapshot.get("version") != FORMAT_VERSION:
+        raise ValueError(f"不支援的快照格式：{snapshot.get('format')} v{snapshot.get('version')}")
+
+    columns = snapshot["columns"]
+    rows = snapshot["rows"]
+    decoded = {}
+    for field in STRING_FIELDS:
+        dictionary = columns[field]["dictionary"]
+        field_codes = columns[field]["codes"]
+        if len(field_codes) != rows:
+            raise ValueError(f"欄位 {field} 筆數 {len(field_codes)} 與 rows={rows} 不符")
+        _check_codes(f"欄位 {field}", field_codes, len(dictionary))
+        decoded[field] = [dictionary[c] for c in field_codes]
+
+    times = columns[LIST_FIELD]
+    offsets, times_codes, times_dictionary = times["offsets"], times["codes"], times["dictionary"]
+    if len(offsets) != rows + 1:
+        raise ValueError(f"時刻表 offsets 長度 {len(offsets)} 與 rows={rows} 不符")
+    if offsets[0] != 0 or offsets[-1] != len(times_codes) or any(a > b for a, b in zip(offsets, offsets[1:])):
+        raise ValueError(f"時刻表 offsets 必須從 0 遞增到 {len(times_codes)}")
+    _check_codes("時刻表", times_codes, len(times_dictionary))
+    stale_rows = set(columns.get("stale", {}).get("rows", []))
+
+    items = []
+    for row in range(rows):
+        item = {}
+        for field in ROW_ORDER:
+            if field == LIST_FIELD:
+                item[field] = [times_dictionary[c] for c in times_codes[offsets[row]:offsets[row + 1]]]
+            else:
+                item[field] = decoded[field][row]
+        if row in stale_rows:
+            item["stale"] = True
+        items.append(item)
+    return items
+
+def write_columnar(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(encode_columns(items), f, ensure_ascii=False, separators=(",", ":"))
+
+def read_columnar(path):
+    with open(path, encoding="utf-8") as f:
+        return decode_columns(json.load(f))
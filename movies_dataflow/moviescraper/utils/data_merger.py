@@ -1,8 +1,18 @@
-import json
+import json, time
+from collections import Counter
 from pathlib import Path
+from .title_cluster import canonicalize_titles
+from .columnar import write_columnar
 
-def merge_cleaned_outputs(folder="data", pattern="*_formated.json", output="all_cleaned.json"):
+def merge_cleaned_outputs(
+    folder="data",
+    pattern="*_formated.json",
+    output="all_cleaned.json",
+    cluster_titles=True,
+    columnar_output="all_cleaned.columnar.json"
+):
     merged = []
+    date_counts = Counter()
 
     for file in Path(folder).glob(pattern):
         if file.name == output:
@@ -12,14 +22,30 @@ def merge_cleaned_outputs(folder="data", pattern="*_formated.json", output="all_
             with open(file, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 if isinstance(data, list):
-                    for item in data:
-                        merged.append(item)
+                    merged.extend(data)
+                    date_counts.update(item.get('日期', '未知日期') for item in data)
 
         except Exception as e:
             print(f"[ERROR] 讀取 {file.name} 失敗：{e}")
 
+    # 跨影城片名歸併
+    if cluster_titles and merged:
+        start = time.perf_counter()
+        rewritten, clusters = canonicalize_titles(merged)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[CLUSTER] {clusters} 部電影，改寫 {rewritten} 筆片名（{elapsed:.0f} ms）")
+
     output_path = Path(folder)/output
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(merged, f, indent=4, ensure_ascii=False)
 
-    print(f"[MERGED] 成功合併 {len(merged)} 筆資料到 {output_path}")
\ No newline at end of file
+    print(f"[MERGED] 成功合併 {len(merged)} 筆資料到 {output_path}")
+    for date, count in sorted(date_counts.items()):
+        print(f"  - {date}: {count} 筆")
+
+    # 欄式快照（字典編碼，體積較小）
+    if columnar_output:
+        columnar_path = Path(folder)/columnar_output
+        write_columnar(columnar_path, merged)
+        print(f"[COLUMNAR] {columnar_path}：{columnar_path.stat().st_size / 1024:.0f} KB"
+              f"（JSON {output_path.stat().st_size / 1024:.0f} KB）")
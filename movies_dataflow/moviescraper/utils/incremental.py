@@ -0,0 +1,70 @@
+import os, json, time, hashlib, logging
+
+logger = logging.getLogger(__name__)
+
+def fingerprint(content):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha1(content).hexdigest()
+
+# 增量爬取的指紋紀錄：每個詳細頁一筆 {listing, body, fetched_at, items, children}
+class FingerprintStore:
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.seen = set()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 讀取指紋紀錄失敗，改為完整爬取：{e}")
+            self.entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        kept = {key: self.entries[key] for key in self.seen if key in self.entries}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(kept, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def replay(self, key, listing_fp, _visiting=None):
+        """列表項目未變且未過期 → 回傳上次的 items（含子頁面），否則回傳 None"""
+        entry = self.entries.get(key)
+        if not entry or entry["listing"] != listing_fp:
+            return None
+        if time.time() - entry["fetched_at"] > self.ttl:
+            return None
+
+        visiting = _visiting or set()
+        if key in visiting:
+            return None
+        visiting.add(key)
+
+        items = list(entry["items"])
+        for child in entry["children"]:
+            child_items = self.replay(child, entry["body"], visiting)
+            if child_items is None:
+                return None
+            items.extend(child_items)
+
+        self.seen.add(key)
+        return items
+
+    def record(self, key, listing_fp, body_fp, items, children):
+        previous = self.entries.get(key)
+        unchanged = previous is not None and previous["body"] == body_fp
+        self.entries[key] = {
+            "listing": listing_fp,
+            "body": body_fp,
+            "fetched_at": time.time(),
+            "items": items,
+            "children": children,
+        }
+        self.seen.add(key)
+        return unchanged
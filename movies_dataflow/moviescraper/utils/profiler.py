@@ -0,0 +1,102 @@
+# ProfilingSpiderMiddleware 的底層工具：selector 計時與取樣 profiler。
+# 同一個 process 可能同時跑多個爬蟲（run_cli），兩者都是整個 process 共用一份並以參考計數安裝，
+# 透過 active 標記目前在執行哪個爬蟲的哪個 callback
+import os, time, signal, functools
+from collections import Counter
+import parsel
+
+active = None # (爬蟲名稱, callback 名稱, 統計 dict)；reactor 單執行緒，同時只會有一個
+_selector_depth = 0
+_selector_users = 0
+_selector_originals = {}
+
+# -------------------------------------------------------------
+# selector 計時：HTML 解析（Selector 建構）與 xpath/css/re 查詢
+# -------------------------------------------------------------
+def _timed(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        global _selector_depth
+        # css() 內部會呼叫 xpath()，只計最外層
+        if _selector_depth or active is None:
+            return method(self, *args, **kwargs)
+        stats = active[2]
+        _selector_depth += 1
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _selector_depth -= 1
+            stats["selector_time"] += time.perf_counter() - start
+    return wrapper
+
+def install_selector_timer():
+    global _selector_users
+    _selector_users += 1
+    if _selector_users > 1:
+        return
+    for name in ("__init__", "xpath", "css", "re"):
+        original = getattr(parsel.Selector, name)
+        _selector_originals[name] = original
+        setattr(parsel.Selector, name, _timed(original))
+
+def uninstall_selector_timer():
+    global _selector_users
+    _selector_users -= 1
+    if _selector_users > 0:
+        return
+    for name, original in _selector_originals.items():
+        setattr(parsel.Selector, name, original)
+    _selector_originals.clear()
+
+# -------------------------------------------------------------
+# 取樣 profiler：SIGPROF 定時取樣呼叫堆疊，輸出 flamegraph 可用的 folded 格式
+# （每行「爬蟲;callback;外層;...;內層 次數」，可直接給 flamegraph.pl / speedscope）
+# 僅支援 Unix；必須在主執行緒啟動（CrawlerProcess 的 reactor 即在主執行緒）
+# -------------------------------------------------------------
+class StackSampler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.users = 0
+        self.previous_handler = None
+
+    @staticmethod
+    def available():
+        return hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+    def start(self):
+        self.users += 1
+        if self.users > 1:
+            return
+        self.previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        self.users -= 1
+        if self.users > 0:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+
+    def _sample(self, signum, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.reverse()
+        owner = f"{active[0]};{active[1]}" if active else "(engine)"
+        self.samples[owner + ";" + ";".join(frames)] += 1
+
+    def write_folded(self, path, spider_name):
+        lines = [
+            f"{stack} {count}"
+            for stack, count in self.samples.items()
+            if stack.startswith(spider_name + ";")
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(lines)) + ("\n" if lines else ""))
+        return sum(count for stack, count in self.samples.items() if stack.startswith(spider_name + ";"))
+
+sampler = StackSampler()
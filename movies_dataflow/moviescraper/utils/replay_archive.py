@@ -0,0 +1,107 @@
+# 錄製 / 重播用的回應封存檔：每個爬蟲一個 zip（{REPLAY_DIR}/{spider}.zip），
+# index.json 記錄 request 指紋 → 回應（url、狀態碼、標頭、回應類別、編碼），內容另存為 deflate 壓縮的 bodies/N
+# 同一個指紋被請求多次（dont_filter、重試）時依錄製順序輪流回放
+# Selenium 爬蟲在 callback 內點擊後取得的頁面（driver.page_source）另存在 rendered：
+# request 指紋 → [{url, body, data}]，重播時不開瀏覽器，直接把這些頁面依序交給 callback
+import os, json, zipfile
+from datetime import datetime
+from scrapy.http import Headers, TextResponse
+from scrapy.utils.misc import load_object
+
+INDEX_NAME = "index.json"
+
+def archive_path(folder, spider_name):
+    return os.path.join(folder, f"{spider_name}.zip")
+
+class ArchiveWriter:
+    def __init__(self, path, spider_name):
+        self.path = path
+        self.spider_name = spider_name
+        self.entries = {}
+        self.rendered = {}
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.zip = zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED, compresslevel=9)
+
+    def add(self, key, response):
+        name = f"bodies/{self.count:06d}"
+        self.zip.writestr(name, response.body)
+        self.count += 1
+        self.entries.setdefault(key, []).append({
+            "url": response.url,
+            "status": response.status,
+            "headers": {
+                k.decode("latin-1"): [v.decode("latin-1") for v in values]
+                for k, values in response.headers.items()
+            },
+            "class": f"{type(response).__module__}.{type(response).__qualname__}",
+            "encoding": response.encoding if isinstance(response, TextResponse) else None,
+            "body": name,
+        })
+
+    def add_rendered(self, key, url, html, **data):
+        name = f"bodies/{self.count:06d}"
+        self.zip.writestr(name, html.encode("utf-8"))
+        self.count += 1
+        self.rendered.setdefault(key, []).append({"url": url, "body": name, "data": data})
+
+    # 寫完 index 才換上正式檔名，錄製中斷不會留下半個封存檔
+    def close(self):
+        index = {
+            "spider": self.spider_name,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "responses": self.count,
+            "entries": self.entries,
+            "rendered": self.rendered,
+        }
+        self.zip.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False))
+        self.zip.close()
+        os.replace(self.path + ".tmp", self.path)
+        return os.path.getsize(self.path)
+
+class ArchiveReader:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path)
+        index = json.loads(self.zip.read(INDEX_NAME))
+        self.entries = index["entries"]
+        self.rendered_entries = index.get("rendered", {}) # 舊版封存檔沒有這一項
+        self.recorded_at = index["recorded_at"]
+        self.served = {} # 指紋 → 已回放次數
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+    def next(self, key):
+        """回傳 (entry, 第幾次請求)；沒有錄到時 entry 為 None"""
+        attempt = self.served.get(key, 0)
+        self.served[key] = attempt + 1
+        entries = self.entries.get(key)
+        if not entries:
+            return None, attempt
+        return entries[attempt % len(entries)], attempt
+
+    def rendered(self, key):
+        """錄製時該請求的 callback 取得的頁面 [{url, html, data}]；沒有錄到時為 None"""
+        pages = self.rendered_entries.get(key)
+        if pages is None:
+            return None
+        return [
+            {"url": page["url"], "html": self.zip.read(page["body"]).decode("utf-8"), "data": page["data"]}
+            for page in pages
+        ]
+
+    def response(self, entry, request):
+        kwargs = {
+            "url": entry["url"],
+            "status": entry["status"],
+            "headers": Headers(entry["headers"]),
+            "body": self.zip.read(entry["body"]),
+            "request": request,
+            "flags": ["replay"],
+        }
+        if entry["encoding"]:
+            kwargs["encoding"] = entry["encoding"]
+        return load_object(entry["class"])(**kwargs)
+
+    def close(self):
+        self.zip.close()
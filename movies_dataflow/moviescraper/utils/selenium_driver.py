@@ -0,0 +1,36 @@
+# Selenium 爬蟲的 ChromeDriver 路徑：建立 crawler 時才下載 / 定位，
+# 匯入爬蟲模組本身不需網路（離線的 parser benchmark 會直接匯入爬蟲類別）
+from scrapy.exceptions import CloseSpider
+from webdriver_manager.chrome import ChromeDriverManager
+
+# SeleniumMiddleware 加進專案的 DOWNLOADER_MIDDLEWARES（寫在 custom_settings 會整個取代掉專案設定，
+# 斷路器、ReplayMiddleware 都不會套用到 Selenium 爬蟲）
+def use_chrome_driver(settings):
+    # 重播模式不開瀏覽器，回應與操作後的頁面全部由 ReplayMiddleware 提供
+    if settings.get("REPLAY_MODE") == "replay":
+        return
+    middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+    middlewares["scrapy_selenium4.SeleniumMiddleware"] = 800
+    settings.set("DOWNLOADER_MIDDLEWARES", middlewares, priority="spider")
+    if not settings.get("SELENIUM_DRIVER_EXECUTABLE_PATH"):
+        settings.set("SELENIUM_DRIVER_EXECUTABLE_PATH", ChromeDriverManager().install(), priority="spider")
+
+# 操作瀏覽器後取得頁面；錄製模式下同時存進封存檔（data 為重播時解析需要的額外資訊，例如影城名稱、cookie）
+def record_rendered(response, driver, **data):
+    html = driver.page_source
+    record = response.meta.get("record_rendered")
+    if record:
+        record(driver.current_url, html, **data)
+    return html
+
+# 沒有 driver 時（重播模式）改用錄製時存下的頁面 [{url, html, data}]
+# 重播卻沒有錄到頁面（舊版封存檔或錄製時沒取得頁面）→ 關閉爬蟲並說明原因，不回報 0 筆的成功
+def rendered_pages(spider, response):
+    pages = response.meta.get("rendered_pages")
+    if pages is not None:
+        return pages
+    if spider.settings.get("REPLAY_MODE") == "replay":
+        spider.logger.error(f"❌ 封存檔沒有 {response.url} 在瀏覽器操作後的頁面，請重新錄製（--record）")
+        raise CloseSpider("replay_missing_rendered_pages")
+    spider.logger.error("❌ Selenium driver not found in response.meta")
+    return []
@@ -0,0 +1,10 @@
+# 片名清洗：pipeline 正規化與 API 搜尋共用，確保兩邊對全形、標點、空白的處理一致
+import re, unicodedata
+
+TITLE_PUNCTUATION = re.compile(r'[「」『』“”‘’:：_．・.]')
+WHITESPACE = re.compile(r'\s+')
+
+def clean_title(title):
+    title = unicodedata.normalize('NFKC', title)   # 全形轉半形（含標點）
+    title = TITLE_PUNCTUATION.sub(' ', title)      # 移除中英文符號
+    return WHITESPACE.sub(' ', title).strip()      # 合併空格並去除首尾空白
@@ -0,0 +1,212 @@
+# 版本化的執行目錄：runs/<run_id>/ 存放各爬蟲輸出、all_cleaned.json 與 manifest.json，
+# runs/CURRENT 指向最新完成的執行（以 os.replace 原子切換）
+import os, json, shutil
+from datetime import datetime
+from pathlib import Path
+
+RUNS_DIR = Path("runs")
+CURRENT_POINTER = RUNS_DIR / "CURRENT"
+MANIFEST_NAME = "manifest.json"
+RUN_REPORT_NAME = "run_report.json"
+HISTORY_PATH = RUNS_DIR / "history.jsonl" # 每次執行一行，供趨勢比較
+KEEP_RUNS = 5
+
+def new_run_dir():
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+    run_dir = RUNS_DIR / run_id
+    suffix = 1
+    while run_dir.exists():
+        suffix += 1
+        run_dir = RUNS_DIR / f"{run_id}-{suffix}"
+    run_dir.mkdir(parents=True)
+    return run_dir
+
+def current_run_dir():
+    try:
+        run_id = CURRENT_POINTER.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    run_dir = RUNS_DIR / run_id
+    return run_dir if run_dir.is_dir() else None
+
+def promote(run_dir):
+    tmp_pointer = RUNS_DIR / f"CURRENT.{os.getpid()}.tmp"
+    tmp_pointer.write_text(Path(run_dir).name, encoding="utf-8")
+    os.replace(tmp_pointer, CURRENT_POINTER)
+    print(f"✅ 已切換至最新執行：{Path(run_dir).name}")
+
+def prune_runs(keep=KEEP_RUNS):
+    current = current_run_dir()
+    runs = sorted(p for p in RUNS_DIR.iterdir() if p.is_dir())
+    for run_dir in runs[:-keep]:
+        if current and run_dir.resolve() == current.resolve():
+            continue
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+def load_manifest(run_dir):
+    try:
+        with open(Path(run_dir) / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"spiders": {}}
+
+def write_manifest(run_dir, manifest):
+    path = Path(run_dir) / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def output_path(run_dir, name):
+    return Path(run_dir) / f"{name}_formated.json"
+
+# 依輸出檔判斷爬蟲狀態：ok / stale（沿用舊資料）/ tripped（斷路器）/ empty / failed
+def spider_status(run_dir, name):
+    path = output_path(run_dir, name)
+    if not path.exists():
+        return {"status": "failed", "items": 0}
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+    except Exception:
+        return {"status": "failed", "items": 0}
+
+    if (Path(run_dir) / f"{name}_breaker.json").exists():
+        status = "tripped"
+    elif not items:
+        status = "empty"
+    elif any(item.get("stale") for item in items):
+        status = "stale"
+    else:
+        status = "ok"
+    return {"status": status, "items": len(items)}
+
+# max_age 格式："3600"（全部）、"vs=1800,amba=7200"、"3600,venice=600"，單位秒
+def parse_max_age(value):
+    if value is None or isinstance(value, dict):
+        return value
+    if isinstance(value, (int, float)):
+        return {"*": int(value)}
+
+    parsed = {}
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, seconds = part.rpartition("=")
+        parsed[name.strip() or "*"] = int(seconds)
+    return parsed
+
+# 上次成功的資料仍在 max_age 內、且擷取天數不少於這次要的 days → 不需重新爬取
+# （沿用的爬蟲保留原本的 days；舊 manifest 沒有逐爬蟲紀錄時以整次執行的 days 為準）
+def fresh_spiders(manifest, names, max_age, days=1):
+    now = datetime.now()
+    fresh = []
+    for name in names:
+        limit = max_age.get(name, max_age.get("*"))
+        info = manifest.get("spiders", {}).get(name)
+        if limit is None or not info or info.get("status") != "ok":
+            continue
+        if info.get("days", manifest.get("days", 1)) < days:
+            continue
+        age = (now - datetime.fromisoformat(info["finished_at"])).total_seconds()
+        if age < limit:
+            fresh.append(name)
+    return fresh
+
+def failed_spiders(manifest):
+    return [name for name, info in manifest.get("spiders", {}).items() if info.get("status") != "ok"]
+
+# 把上一次成功的輸出複製到新的執行目錄（不重新爬取）
+def carry_over(source_dir, run_dir, names, source_manifest):
+    carried = {}
+    for name in names:
+        src = output_path(source_dir, name)
+        if not src.exists():
+            continue
+        shutil.copyfile(src, output_path(run_dir, name))
+        info = source_manifest.get("spiders", {}).get(name, {})
+        carried[name] = {
+            **info,
+            "source_run": info.get("source_run", Path(source_dir).name),
+        }
+    return carried
+
+def build_manifest(run_dir, crawled, carried, days=1):
+    now = datetime.now().isoformat(timespec="seconds")
+    spiders = {}
+    for name in crawled:
+        report = load_spider_report(run_dir, name) or {}
+        spiders[name] = {
+            **spider_status(run_dir, name),
+            "finished_at": report.get("finished_at", now), # 爬蟲實際結束時間（max_age 以此計算）
+            "duration": report.get("duration"),
+            "close_reason": report.get("close_reason"),
+            "days": days,
+            "source_run": Path(run_dir).name,
+        }
+    spiders.update(carried)
+    return {
+        "run_id": Path(run_dir).name,
+        "created_at": now,
+        "days": days,
+        "spiders": spiders,
+    }
+
+# -------------------------------------------------------------
+# 執行報告（moviescraper.extensions.RunReport 寫出各爬蟲的 {spider}_report.json）
+# -------------------------------------------------------------
+def load_spider_report(run_dir, name):
+    try:
+        with open(Path(run_dir) / f"{name}_report.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def load_run_report(run_dir):
+    try:
+        with open(Path(run_dir) / RUN_REPORT_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_run_report(run_dir, report):
+    path = Path(run_dir) / RUN_REPORT_NAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def append_history(report, path=HISTORY_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+# 最新的在前；limit=None 表示全部
+def load_history(limit=None, path=HISTORY_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+
+    history = []
+    for line in reversed(lines):
+        try:
+            history.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+        if limit is not None and len(history) >= limit:
+            break
+    return history
+
+# 各爬蟲在歷史紀錄中最近一次的報告（排除指定的 run）
+def last_spider_reports(exclude_run=None, path=HISTORY_PATH):
+    latest = {}
+    for run in load_history(path=path):
+        if run.get("run_id") == exclude_run:
+            continue
+        for name, report in run.get("spiders", {}).items():
+            latest.setdefault(name, report)
+    return latest
@@ -1,5 +1,7 @@
-import time, sys, subprocess
+import sys, json, shutil, subprocess
+from datetime import datetime
 from pathlib import Path
+import run_store
 from scrapy.crawler import CrawlerRunner, CrawlerProcess
 from scrapy.utils.project import get_project_settings
 from moviescraper.spiders import amba, showTimes, sk, vs, venice, sbc
@@ -14,22 +16,80 @@ SPIDER_MAP = {
 }
 
 class SpiderExecutor:
-    def __init__(self):
+    def __init__(self, incremental=False, data_dir="data", stream=None, export=True, profile=None, replay=None):
         self.report = {}
+        self.incremental = incremental
+        self.data_dir = str(data_dir)
+        self.stream = stream # {"target": FastAPI 網址或本機目錄, "session": 執行 id}
+        self.export = export
+        self.profile = profile # None / "callbacks" / "sample"（另取樣呼叫堆疊）
+        self.replay = replay # {"mode": "record"/"replay", "dir": 封存目錄, "latency": 秒, "error_rate": 比例}
+
+    def run(self, mode="cli", spiders=None, days=1):
+        selected = [name for name in spiders or SPIDER_MAP.keys() if name in SPIDER_MAP]
+        self._clear_reports(selected)
 
-    def run(self, mode="cli", spiders=None):
         if mode == "cli":
-            self.run_cli(spiders)
+            self.run_cli(spiders, days)
         elif mode == "async":
-            self.run_async(spiders)
+            self.run_async(spiders, days)
         elif mode == "subprocess":
-            self.run_subprocess(spiders)
+            self.run_subprocess(spiders, days)
         else:
             raise ValueError(f"❌ 不支援的執行模式：{mode}")
 
-    def run_cli(self, spiders=None):
+        # subprocess 模式由子行程彙整並寫入 run_report.json，父行程直接讀取（子行程異常結束時才自行彙整）
+        self.report = run_store.load_run_report(self.data_dir) if mode == "subprocess" else None
+        if not self.report:
+            self.report = self._finish_report(selected, mode, days)
+
+        # 重播是離線、可重現的執行：不讀也不覆寫正式的 last_good/，沒有資料就照實留空
+        if self.export and not self.replaying:
+            self.apply_fallbacks(spiders or list(SPIDER_MAP.keys()), folder=self.data_dir)
+
+    @property
+    def replaying(self):
+        return bool(self.replay) and self.replay["mode"] == "replay"
+
+    # 斷路器開啟或輸出為空 → 以上次成功的輸出（標記 stale）代替；成功則更新 last_good 備份
+    def apply_fallbacks(self, spiders, folder="data", last_good="last_good"):
+        Path(last_good).mkdir(exist_ok=True)
+
+        for name in spiders:
+            output = Path(folder) / f"{name}_formated.json"
+            breaker = Path(folder) / f"{name}_breaker.json"
+            backup = Path(last_good) / output.name
+            items = self._load_items(output)
+
+            fresh = items and not any(item.get("stale") for item in items)
+            if fresh and not breaker.exists():
+                shutil.copyfile(output, backup)
+                continue
+
+            reason = "斷路器開啟" if breaker.exists() else "無資料"
+            stale_items = self._load_items(backup)
+            if not stale_items:
+                print(f"⚠️ {name}: {reason}，且沒有可用的舊資料")
+                continue
+
+            for item in stale_items:
+                item["stale"] = True
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(stale_items, f, indent=4, ensure_ascii=False)
+            print(f"♻️ {name}: {reason} → 改用上次成功的資料（{len(stale_items)} 筆，標記 stale）")
+
+    @staticmethod
+    def _load_items(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except Exception:
+            return []
+
+    def run_cli(self, spiders=None, days=1):
         print("🖥️ CLI 模式 → 使用 CrawlerProcess")
-        process = CrawlerProcess(get_project_settings())
+        process = CrawlerProcess(self._settings())
 
         selected = spiders or list(SPIDER_MAP.keys())
         for name in selected:
@@ -37,8 +97,7 @@ class SpiderExecutor:
             if not spider_cls:
                 print(f"⚠️ 未知爬蟲名稱：{name}")
                 continue
-            self.report[name] = {'start': time.time()}
-            process.crawl(spider_cls)
+            process.crawl(spider_cls, days=days)
             print(f"🕷️ 已註冊爬蟲：{name}")
 
         try:
@@ -48,9 +107,7 @@ class SpiderExecutor:
         except Exception as e:
             print(f"⚠️ CLI模式 執行失敗：{e}")
 
-        self._finish_report()
-
-    def run_async(self, spiders=None):
+    def run_async(self, spiders=None, days=1):
         print("🌐 非同步模式 → 使用 CrawlerRunner")
         from scrapy.utils.reactor import install_reactor
         install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
@@ -60,46 +117,110 @@ class SpiderExecutor:
 
         @defer.inlineCallbacks
         def _run():
-            runner = CrawlerRunner(get_project_settings())
+            runner = CrawlerRunner(self._settings())
 
             for name in selected:
                 spider_cls = SPIDER_MAP.get(name)
                 if not spider_cls:
                     print(f"⚠️ 未知爬蟲名稱：{name}")
                     continue
-                self.report[name] = {'start': time.time()}
                 try:
-                    yield runner.crawl(spider_cls)
+                    yield runner.crawl(spider_cls, days=days)
                     print(f"✅ {name} 執行完成")
                 except Exception as e:
                     print(f"⚠️ async模式 {name} 執行失敗: {e}")
 
-            self._finish_report()
             reactor.callLater(30, reactor.stop)  # 最多執行 30 秒 # 排程停止
 
         reactor.callWhenRunning(_run) # 註冊 callback (註冊所有非同步任務)
         reactor.run() # 啟動事件循環 → 開始執行 _run() 裡的 yield 任務
 
 
-    def run_subprocess(self, spiders=None):
+    def run_subprocess(self, spiders=None, days=1):
         print("🌐 使用 subprocess 包裝 CLI")
         spider_path = Path(__file__)
-        args = ["--mode=cli"]
+        args = ["--mode=cli", f"--days={days}", f"--data-dir={self.data_dir}"]
         if spiders:
             args.append("--targets=" + ",".join(spiders))
+        if self.incremental:
+            args.append("--incremental")
+        if self.stream:
+            args += [f"--stream-target={self.stream['target']}", f"--stream-session={self.stream['session']}"]
+        if not self.export:
+            args.append("--no-export")
+        if self.profile:
+            args.append(f"--profile={self.profile}")
+        if self.replay:
+            args.append(f"--{self.replay['mode']}={self.replay['dir']}")
+            args += [f"--replay-latency={self.replay.get('latency', 0)}", f"--replay-error-rate={self.replay.get('error_rate', 0)}"]
         result = subprocess.run([sys.executable, str(spider_path)] + args)
         if result.returncode != 0:
             print(f"⚠️ subprocess returncode 非 0：{result.returncode}")
         else:
             print("✅ subprocess 執行成功")
 
-    def _finish_report(self):
-        print("\n✅ 所有爬蟲完成，執行時間如下：")
-        for name, info in self.report.items():
-            end = time.time()
-            duration = end - info['start']
-            minutes, seconds = divmod(duration, 60)
-            print(f"- {name}: {int(minutes)} 分 {int(seconds)} 秒")
+    def _settings(self):
+        settings = get_project_settings()
+        settings.set("DATA_DIR", self.data_dir)
+        if self.incremental:
+            settings.set("INCREMENTAL_ENABLED", True)
+        if self.stream:
+            settings.set("STREAM_ENABLED", True)
+            settings.set("STREAM_TARGET", self.stream["target"])
+            settings.set("STREAM_SESSION", self.stream["session"])
+        if not self.export:
+            settings.set("JSON_EXPORT_ENABLED", False)
+        if self.profile:
+            settings.set("PROFILING_ENABLED", True)
+            settings.set("PROFILING_SAMPLER", self.profile == "sample")
+        if self.replay:
+            settings.set("REPLAY_MODE", self.replay["mode"])
+            settings.set("REPLAY_DIR", self.replay["dir"])
+            settings.set("REPLAY_LATENCY", self.replay.get("latency", 0))
+            settings.set("REPLAY_ERROR_RATE", self.replay.get("error_rate", 0))
+            # 錄製要拿到網站當下的回應，重播的結果也不能被快取取代
+            settings.set("HTTPCACHE_ENABLED", False)
+        return settings
+
+    # 重複使用同一個輸出目錄時，避免把上一次的報告當成這次的結果
+    def _clear_reports(self, spiders):
+        folder = Path(self.data_dir)
+        (folder / run_store.RUN_REPORT_NAME).unlink(missing_ok=True)
+        for name in spiders:
+            (folder / f"{name}_report.json").unlink(missing_ok=True)
+
+    # 彙整各爬蟲的 {spider}_report.json → run_report.json，並附加到執行歷史
+    def _finish_report(self, spiders, mode, days):
+        reports = {name: run_store.load_spider_report(self.data_dir, name) for name in spiders}
+        run_id = Path(self.data_dir).name
+        previous = run_store.last_spider_reports(exclude_run=run_id)
+
+        print("\n✅ 所有爬蟲完成，執行報告如下：")
+        for name, report in reports.items():
+            if report is None:
+                print(f"- {name}: ⚠️ 沒有執行報告（未啟動或異常結束）")
+                continue
+            minutes, seconds = divmod(report["duration"], 60)
+            line = (
+                f"- {name}: {int(minutes)} 分 {int(seconds)} 秒 / {report['items']} 筆 / {report['requests']} 請求 / "
+                f"{report['response_bytes'] / 1024:.0f} KB / 錯誤 {report['errors']} / {report['close_reason']}"
+            )
+            last = previous.get(name)
+            if last:
+                line += f"（上次 {last['duration']:.0f} 秒 / {last['items']} 筆）"
+            print(line)
+
+        run_report = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "mode": mode,
+            "days": days,
+            "spiders": {name: report for name, report in reports.items() if report is not None},
+            "missing": [name for name, report in reports.items() if report is None],
+        }
+        run_store.write_run_report(self.data_dir, run_report)
+        run_store.append_history(run_report)
+        return run_report
 
 # ✅ subprocess 呼叫入口
 if __name__ == "__main__":
@@ -107,8 +228,36 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="執行 Scrapy 爬蟲")
     parser.add_argument("--mode", default="cli", choices=["cli", "async", "subprocess"])
     parser.add_argument("--targets", type=str, help="指定爬蟲名稱（用逗號分隔）")
+    parser.add_argument("--days", type=int, default=1, help="擷取天數")
+    parser.add_argument("--incremental", action="store_true", help="增量模式：略過未變動的詳細頁")
+    parser.add_argument("--data-dir", default="data", help="輸出目錄")
+    parser.add_argument("--stream-target", help="串流上傳目標（FastAPI 網址或本機目錄）")
+    parser.add_argument("--stream-session", help="串流上傳 session id")
+    parser.add_argument("--no-export", action="store_true", help="不輸出 *_formated.json")
+    parser.add_argument("--profile", nargs="?", const="callbacks", choices=["callbacks", "sample"], help="callback 效能分析")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument("--record", metavar="DIR", help="錄製所有回應到 DIR/{spider}.zip")
+    recording.add_argument("--replay", metavar="DIR", help="離線重播 DIR/{spider}.zip，不連網")
+    parser.add_argument("--replay-latency", type=float, default=0.0, help="重播時每個回應的延遲（秒）")
+    parser.add_argument("--replay-error-rate", type=float, default=0.0, help="重播時注入 503 的比例")
     args = parser.parse_args()
 
     spiders = args.targets.split(",") if args.targets else None
-    SpiderExecutor().run(mode=args.mode, spiders=spiders)
+    stream = {"target": args.stream_target, "session": args.stream_session} if args.stream_target else None
+    replay = None
+    if args.record or args.replay:
+        replay = {
+            "mode": "record" if args.record else "replay",
+            "dir": args.record or args.replay,
+            "latency": args.replay_latency,
+            "error_rate": args.replay_error_rate,
+        }
+    SpiderExecutor(
+        incremental=args.incremental,
+        data_dir=args.data_dir,
+        stream=stream,
+        export=not args.no_export,
+        profile=args.profile,
+        replay=replay
+    ).run(mode=args.mode, spiders=spiders, days=args.days)
 